@@ -0,0 +1,151 @@
+# answers.py
+"""
+챗봇 의미 기반 답변 캐시 (semantic answer cache).
+
+같은 자료를 올린 학생들은 표현만 조금 다른 같은 질문("이 개념이 뭐예요?")을 자주 한다.
+응답 캐시(llm.py)는 요청이 글자 그대로 같아야 적중하므로, 자료(묶음)마다
+질문 임베딩과 답변을 모아 두고 새 질문과 코사인 유사도가 threshold 이상인
+이전 질문이 있으면 그 답변을 그대로 돌려준다.
+
+- 질문 벡터는 자료별로 (N, dim) 행렬 하나(AnswerBook)에 모아 두고 행렬곱 한 번으로 전체 유사도를 계산한다.
+- 저장한 지 ttl이 지난 답변은 버리고, 자료당 max_entries를 넘으면 가장 오래 안 쓴 답변부터 버린다.
+- 대화 맥락에 따라 답이 달라지는 후속 질문은 넣지 않는다. (어떤 질문을 넣을지는 호출하는 쪽에서 정한다)
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from cache import TieredCache
+from metrics import increment, observe
+
+# numpy는 처음 조회/저장할 때 불러온다. (챗봇 페이지 첫 로딩을 가볍게)
+if TYPE_CHECKING:
+    import numpy as np
+
+# 이 유사도 이상이면 같은 질문으로 본다.
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("YOYAK_ANSWER_CACHE_THRESHOLD", "0.92"))
+# 답변 보관 기간 (자료가 그대로여도 오래된 답변은 새로 만든다)
+ANSWER_CACHE_TTL = int(os.environ.get("YOYAK_ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+# 자료(묶음)당 보관할 답변 수
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("YOYAK_ANSWER_CACHE_MAX_ENTRIES", "200"))
+
+_books = TieredCache("answer_cache", max_items=64, max_bytes=256 * 1024 * 1024, ttl=ANSWER_CACHE_TTL)
+_lock = threading.Lock()
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    created: float
+    last_used: float
+    seconds: float = 0.0  # 처음 답변을 만드는 데 걸린 시간 (적중하면 이만큼 아낀 것으로 센다)
+    hits: int = 0
+
+
+class AnswerBook:
+    """자료(묶음) 하나의 질문 임베딩 행렬과 답변들"""
+
+    def __init__(self):
+        self.entries = []
+        self.vectors = None  # (len(entries), dim) float32, 행마다 L2 정규화됨
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, vector: "np.ndarray") -> tuple:
+        """가장 비슷한 질문의 (유사도, 위치). 비어 있으면 (0.0, -1)"""
+        import numpy as np
+
+        if not self.entries:
+            return 0.0, -1
+        scores = self.vectors @ vector
+        best = int(np.argmax(scores))
+        return float(scores[best]), best
+
+    def add(self, entry: CachedAnswer, vector: "np.ndarray"):
+        import numpy as np
+
+        row = vector.reshape(1, -1)
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        self.entries.append(entry)
+
+    def evict(self, now: float, ttl: float, max_entries: int) -> int:
+        """만료된 답변과 max_entries를 넘는 (가장 오래 안 쓴) 답변을 버리고 버린 수를 반환"""
+        keep = [i for i, entry in enumerate(self.entries) if now - entry.created <= ttl]
+        if len(keep) > max_entries:
+            keep = sorted(sorted(keep, key=lambda i: self.entries[i].last_used)[-max_entries:])
+        removed = len(self.entries) - len(keep)
+        if removed:
+            self.entries = [self.entries[i] for i in keep]
+            self.vectors = self.vectors[keep] if keep else None
+        return removed
+
+
+def answer_key(doc_ids: list, model: str, prompt: str, embedding_model: str) -> str:
+    """
+    답변 캐시를 나누는 key. (자료 묶음 + 답변 모델 + 시스템 프롬프트 + 임베딩 모델)
+    자료 순서는 답변에 영향이 거의 없으므로 정렬해서 쓴다.
+    """
+    hasher = hashlib.sha256(prompt.encode("utf-8"))
+    for doc_id in sorted(doc_ids):
+        hasher.update(doc_id.encode("utf-8"))
+    return f"{model}-{embedding_model}-{hasher.hexdigest()}"
+
+
+def lookup_answer(key: str, vector: "np.ndarray", threshold: float = ANSWER_CACHE_THRESHOLD) -> tuple:
+    """
+    vector(embed_texts로 만든 정규화된 질문 벡터)와 가장 비슷한 이전 질문이 threshold 이상이면
+    (유사도, CachedAnswer), 아니면 (유사도, None)
+    """
+    import numpy as np
+
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    now = time.time()
+    with _lock:
+        book = _books.get(key)
+        score, position = 0.0, -1
+        if book is not None:
+            evicted = book.evict(now, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES)
+            if evicted:
+                increment("answer_cache_evictions_total", evicted, reason="lookup")
+            score, position = book.search(vector)
+        if position < 0 or score < threshold:
+            increment("answer_cache_total", result="miss")
+            if position >= 0:
+                observe("answer_cache_similarity", score, result="miss")
+            return score, None
+        # 적중 횟수와 사용 시각은 메모리에서만 고친다. (디스크는 다음 저장 때 함께 기록)
+        entry = book.entries[position]
+        entry.hits += 1
+        entry.last_used = now
+    increment("answer_cache_total", result="hit")
+    observe("answer_cache_similarity", score, result="hit")
+    increment("answer_cache_saved_seconds_total", entry.seconds)
+    return score, entry
+
+
+def store_answer(key: str, question: str, vector: "np.ndarray", answer: str, seconds: float,
+                 threshold: float = ANSWER_CACHE_THRESHOLD) -> bool:
+    """답변을 저장한다. 그사이 다른 세션이 같은 질문을 먼저 저장했으면 False"""
+    import numpy as np
+
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    now = time.time()
+    with _lock:
+        book = _books.get(key)
+        if book is None:
+            book = AnswerBook()
+        score, position = book.search(vector)
+        if position >= 0 and score >= threshold:
+            return False
+        book.add(CachedAnswer(question, answer, created=now, last_used=now, seconds=seconds), vector)
+        evicted = book.evict(now, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES)
+        if evicted:
+            increment("answer_cache_evictions_total", evicted, reason="store")
+        _books.set(key, book)
+    increment("answer_cache_stored_total")
+    return True
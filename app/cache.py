@@ -0,0 +1,235 @@
+# cache.py
+"""
+여러 페이지가 함께 쓰는 캐시 모음.
+
+- LRUCache   : 프로세스 메모리 안의 LRU 캐시 (스레드 안전)
+- DiskCache  : 디스크 저장소. 전체 용량이 max_bytes를 넘으면 오래 안 쓴 항목부터 삭제
+- TieredCache: 메모리 → 디스크 순서로 조회하고, 없으면 한 번만 계산해서 양쪽에 저장
+               (ttl을 주면 저장 후 ttl초가 지난 항목은 없는 것으로 취급)
+
+Streamlit은 세션마다 스크립트를 별도 스레드에서 돌리기 때문에
+모든 캐시는 락으로 보호한다.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import increment
+
+# 캐시 루트 디렉터리 (환경변수로 변경 가능)
+CACHE_ROOT = os.environ.get(
+    "YOYAK_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "yoyakhaejo"),
+)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """개수 기준으로 오래 안 쓴 항목부터 버리는 메모리 캐시."""
+
+    def __init__(self, max_items=32):
+        self.max_items = max_items
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class DiskCache:
+    """
+    key → pickle 파일로 저장하는 디스크 캐시.
+    전체 용량이 max_bytes를 넘으면 마지막 접근 시간이 오래된 파일부터 지운다.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError:
+            # 디렉터리를 만들 수 없으면 set()에서 OSError가 나고, 상위에서 메모리 캐시만 쓴다.
+            pass
+
+    def _path(self, key):
+        # key는 사용자 입력(영상 ID, 파일 이름 등)에서 올 수 있으므로 해시해서 파일 이름으로 쓴다.
+        # (어떤 key도 캐시 디렉터리 밖을 가리킬 수 없다)
+        name = hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except Exception:
+            # 깨진 파일은 지우고 없는 것으로 취급
+            self._remove(path)
+            return default
+
+        # 접근 시간 갱신 (LRU 방식 삭제에 사용)
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        # 임시 파일에 먼저 쓰고 교체해서, 읽는 쪽이 반쯤 쓰인 파일을 보지 않게 한다.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+    def pop(self, key):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for entry in self._entries():
+            self._remove(entry[2])
+
+    def _entries(self):
+        """(mtime, size, path) 목록"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                self._remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class TieredCache:
+    """
+    메모리 LRU + 디스크 캐시를 묶은 캐시.
+    get_or_set()은 같은 key를 여러 세션이 동시에 요청해도 factory를 한 번만 실행한다.
+    값은 (저장 시각, 값) 형태로 저장해서 ttl(초) 만료를 판단한다.
+    """
+
+    def __init__(self, namespace, max_items=32, max_bytes=512 * 1024 * 1024, ttl=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.memory = LRUCache(max_items=max_items)
+        self.disk = DiskCache(os.path.join(CACHE_ROOT, namespace), max_bytes=max_bytes)
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+
+    def _get_entry(self, key):
+        entry = self.memory.get(key, _MISSING)
+        if entry is not _MISSING:
+            return entry, "memory"
+        entry = self.disk.get(key, _MISSING)
+        if entry is not _MISSING:
+            self.memory.set(key, entry)
+            return entry, "disk"
+        return entry, "miss"
+
+    def get(self, key, default=None):
+        entry, tier = self._get_entry(key)
+        if entry is not _MISSING:
+            stored_at, value = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                self.pop(key)
+                entry, tier = _MISSING, "expired"
+        increment("cache_lookups_total", cache=self.namespace, result=tier)
+        if entry is _MISSING:
+            return default
+        return value
+
+    def set(self, key, value):
+        entry = (time.time(), value)
+        self.memory.set(key, entry)
+        try:
+            self.disk.set(key, entry)
+        except OSError:
+            # 디스크에 못 쓰는 환경(읽기 전용 등)에서는 메모리 캐시만 사용
+            pass
+
+    def pop(self, key):
+        self.memory.pop(key)
+        self.disk.pop(key)
+
+    def get_or_set(self, key, factory):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._key_locks_lock:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:
+            # 락을 기다리는 동안 다른 스레드가 계산했을 수 있다.
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = factory()
+                self.set(key, value)
+        with self._key_locks_lock:
+            self._key_locks.pop(key, None)
+        return value
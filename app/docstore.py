@@ -0,0 +1,135 @@
+# docstore.py
+"""
+업로드 문서 저장소 (내용 기반 주소).
+
+업로드 파일(UploadedFile)을 세션에 그대로 들고 있으면 세션마다 파일 전체가 메모리에 남는다.
+그래서 업로드를 확정하면 내용을 sha256 이름의 파일로 디스크에 옮겨 두고,
+세션에는 작은 DocumentHandle(해시, 파일명, 형식, 크기)만 저장한다.
+
+- 같은 파일을 여러 학생이 올려도 디스크에는 한 벌만 저장된다.
+- 파서는 저장된 파일을 경로로 직접 열어 필요한 부분만 읽으므로 .getvalue() 같은 전체 복사가 없고,
+  여러 세션이 같은 문서를 읽을 때는 OS 페이지 캐시를 함께 쓴다.
+- 전체 용량이 max_bytes를 넘으면 오래 안 쓴 문서부터 지운다.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+
+from cache import CACHE_ROOT
+
+DOCUMENT_ROOT = os.path.join(CACHE_ROOT, "documents")
+DOCUMENT_STORE_MAX_BYTES = int(os.environ.get("YOYAK_DOCUMENT_STORE_BYTES", str(10 * 1024 ** 3)))
+# 업로드를 디스크로 옮길 때 한 번에 읽는 크기
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class DocumentMissingError(Exception):
+    """저장소에서 문서가 지워졌을 때 (용량 정리 등) 사용자에게 보여줄 메시지를 담는 예외"""
+
+
+@dataclass(frozen=True)
+class DocumentHandle:
+    """세션에 저장하는 문서 참조. 파일 내용은 들고 있지 않는다."""
+    digest: str
+    name: str
+    content_type: str
+    size: int
+
+
+class DocumentStore:
+    """sha256 → 파일 하나로 저장하는 문서 저장소"""
+
+    def __init__(self, directory: str = DOCUMENT_ROOT, max_bytes: int = DOCUMENT_STORE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError:
+            # 디렉터리를 만들 수 없으면 put()에서 OSError가 나고, 업로드 페이지가 안내한다.
+            pass
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def put(self, fileobj, name: str, content_type: str) -> DocumentHandle:
+        """
+        파일 객체(UploadedFile 등)를 조금씩 읽어 임시 파일에 쓰면서 해시를 계산하고,
+        같은 내용이 이미 있으면 새로 쓴 파일은 버린다.
+        """
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = fileobj.read(COPY_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            path = self._path(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                os.utime(path, None)
+            else:
+                os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._evict(keep=digest)
+        return DocumentHandle(digest=digest, name=name, content_type=content_type, size=size)
+
+    def exists(self, handle: DocumentHandle) -> bool:
+        return os.path.exists(self._path(handle.digest))
+
+    def path(self, handle: DocumentHandle) -> str:
+        """문서 파일 경로. 지워졌으면 DocumentMissingError"""
+        path = self._path(handle.digest)
+        try:
+            # 접근 시간 갱신 (오래 안 쓴 문서부터 지우는 데 사용)
+            os.utime(path, None)
+        except FileNotFoundError:
+            raise DocumentMissingError(
+                f"'{handle.name}' 파일이 저장소에서 정리되었습니다. 다시 업로드해주세요."
+            )
+        return path
+
+    def _evict(self, keep: str = None):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".tmp") or name == keep:
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            if keep:
+                try:
+                    total += os.path.getsize(self._path(keep))
+                except OSError:
+                    pass
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+
+document_store = DocumentStore()
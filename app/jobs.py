@@ -0,0 +1,218 @@
+# jobs.py
+"""
+백그라운드 작업 큐.
+
+노트/퀴즈/채팅 생성은 오래 걸리는데, Streamlit은 위젯을 건드릴 때마다
+스크립트를 처음부터 다시 실행하므로 버튼 핸들러 안에서 돌리면 결과가 날아간다.
+그래서 생성 작업은 프로세스 전체가 공유하는 워커 풀에 넘기고,
+세션에는 작업 id만 저장해 둔 뒤 재실행 때마다 상태/부분 결과를 읽어 온다.
+
+- API Key별 동시 실행 수 제한 (한 사람이 워커를 독점하지 않도록)
+- 스트리밍 부분 결과 (job.text)
+- 취소 (job.cancel() → 작업 함수가 job.cancelled를 보고 멈춤)
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import increment, observe
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+JOB_WORKERS = int(os.environ.get("YOYAK_JOB_WORKERS", "16"))
+JOBS_PER_KEY = int(os.environ.get("YOYAK_JOBS_PER_KEY", "2"))
+# 끝난 작업을 보관하는 시간(초)
+JOB_RETENTION = 3600
+
+
+class Job:
+    """작업 하나의 상태와 (부분) 결과"""
+
+    def __init__(self, kind: str, owner: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.meta = {}  # 작업 함수가 남기는 부가 정보 (토큰 사용량 등)
+        self._parts = []
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    # --- 부분 결과 ---
+    def append(self, delta: str):
+        with self._lock:
+            self._parts.append(delta)
+
+    @property
+    def text(self) -> str:
+        """지금까지 쌓인 부분 결과 텍스트"""
+        with self._lock:
+            return "".join(self._parts)
+
+    # --- 상태 ---
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def elapsed(self) -> float:
+        start = self.started_at or self.created_at
+        return (self.finished_at or time.time()) - start
+
+
+def run_stream(job: Job, chunks) -> str:
+    """
+    텍스트 조각 제너레이터를 job의 부분 결과로 흘려보내고 전체 텍스트를 반환.
+    취소되면 제너레이터를 닫아서 API 스트림도 끊는다.
+    """
+    try:
+        for delta in chunks:
+            if job.cancelled:
+                break
+            job.append(delta)
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+    return job.text
+
+
+class JobManager:
+    """
+    프로세스 전체가 공유하는 작업 관리자.
+    API Key마다 per_key_limit개까지만 워커 풀에 넘기고, 나머지는 그 키의 대기열에 두었다가
+    앞 작업이 끝나 자리가 나면 넘긴다. (대기 중인 작업이 워커 스레드를 잡고 있지 않도록)
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, per_key_limit: int = JOBS_PER_KEY):
+        self.per_key_limit = per_key_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._running = {}  # owner → 워커 풀에 넘긴 작업 수
+        self._pending = {}  # owner → 자리를 기다리는 (job, fn, args, kwargs) 대기열
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, api_key: str, fn, *args, **kwargs) -> str:
+        """
+        fn(job, *args, **kwargs)를 백그라운드에서 실행하고 작업 id를 반환.
+        fn의 반환값은 job.result가 된다.
+        """
+        owner = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        job = Job(kind, owner)
+        with self._lock:
+            self._jobs[job.id] = job
+            # 같은 API Key의 작업이 이미 per_key_limit개 돌고 있으면 차례를 기다린다.
+            start = self._running.get(owner, 0) < self.per_key_limit
+            if start:
+                self._running[owner] = self._running.get(owner, 0) + 1
+            else:
+                self._pending.setdefault(owner, deque()).append((job, fn, args, kwargs))
+        self._cleanup()
+        if start:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    @staticmethod
+    def _finish(job: Job, status: str):
+        # finished_at을 먼저 정해야 다른 스레드가 끝난 작업을 볼 때 늘 값이 있다. (_cleanup)
+        job.finished_at = time.time()
+        job.status = status
+
+    def _run(self, job: Job, fn, args, kwargs):
+        try:
+            if job.cancelled:
+                self._finish(job, CANCELLED)
+                return
+            job.started_at = time.time()
+            job.status = RUNNING
+            observe("job_queue_seconds", job.started_at - job.created_at, kind=job.kind)
+            job.result = fn(job, *args, **kwargs)
+            self._finish(job, CANCELLED if job.cancelled else DONE)
+        except Exception as e:
+            job.error = e
+            self._finish(job, FAILED)
+            logger.exception("작업 실패 [%s] %s", job.kind, job.id)
+        finally:
+            if job.started_at is not None:
+                observe("job_seconds", job.finished_at - job.started_at, kind=job.kind, status=job.status)
+            increment("jobs_total", kind=job.kind, status=job.status)
+            self._release(job.owner)
+
+    def _release(self, owner: str):
+        """작업 하나가 끝나 자리가 나면 그 키의 대기열에서 (취소되지 않은) 다음 작업을 넘긴다."""
+        with self._lock:
+            queue = self._pending.get(owner)
+            while queue:
+                job, fn, args, kwargs = queue.popleft()
+                if job.cancelled:
+                    self._finish(job, CANCELLED)
+                    increment("jobs_total", kind=job.kind, status=CANCELLED)
+                    continue
+                self._executor.submit(self._run, job, fn, args, kwargs)
+                return
+            self._pending.pop(owner, None)
+            self._running[owner] -= 1
+            if not self._running[owner]:
+                del self._running[owner]
+
+    def _drop_cancelled(self, job: Job):
+        """대기열에서 취소된 작업은 자리가 나기를 기다리지 않고 바로 끝낸다."""
+        with self._lock:
+            queue = self._pending.get(job.owner)
+            entry = next((entry for entry in queue or () if entry[0] is job), None)
+            if entry is None:
+                return
+            queue.remove(entry)
+            self._finish(job, CANCELLED)
+        increment("jobs_total", kind=job.kind, status=CANCELLED)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        # 페이지가 job.cancel()로 직접 취소한 대기 작업도 다음 조회 때 끝난 것으로 보여준다.
+        if job is not None and job.status == QUEUED and job.cancelled:
+            self._drop_cancelled(job)
+        return job
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+            if job.status == QUEUED:
+                self._drop_cancelled(job)
+
+    def _cleanup(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished and job.finished_at is not None and now - job.finished_at > JOB_RETENTION
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,271 @@
+# llm.py
+"""
+OpenAI Chat Completions 호출을 감싸는 공용 함수 모음.
+
+같은 요청(시스템 프롬프트 + 메시지 + 모델 + temperature/max_tokens 등)은
+응답 캐시에서 바로 돌려준다. 여러 학생이 같은 강의자료로 같은 버튼을 누를 때
+지연과 비용을 한 번만 치르기 위함이다. 매번 새 결과가 필요하면 use_cache=False.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from cache import LRUCache, TieredCache
+from metrics import increment, observe, span
+from ratelimit import BULK, estimate_chat_tokens, scheduler
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# 클라이언트 설정 (환경변수로 조정 가능)
+OPENAI_TIMEOUT = float(os.environ.get("YOYAK_OPENAI_TIMEOUT", "120"))
+OPENAI_MAX_RETRIES = int(os.environ.get("YOYAK_OPENAI_MAX_RETRIES", "2"))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("YOYAK_OPENAI_MAX_CONNECTIONS", "20"))
+# OpenAI 호환 서버 주소 (벤치마크용 모의 서버 등). 비워 두면 공식 API
+OPENAI_BASE_URL = os.environ.get("YOYAK_OPENAI_BASE_URL") or None
+
+# API Key별 클라이언트 풀 (key 원문 대신 해시를 key로 보관)
+_clients = LRUCache(max_items=256)
+_clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key: str, timeout: float = OPENAI_TIMEOUT,
+                      max_retries: int = OPENAI_MAX_RETRIES, base_url: str = OPENAI_BASE_URL) -> "OpenAI":
+    """
+    API Key별로 하나의 OpenAI 클라이언트를 만들어 재사용한다.
+    httpx.Client를 직접 만들어 넘기므로 keep-alive 연결 풀이 유지되고,
+    openai 내부에서 httpx.Client를 만들 때의 proxies 인자 문제도 생기지 않는다.
+
+    openai 패키지는 불러오는 데만 0.5초 가까이 걸리므로, 모듈 맨 위가 아니라
+    클라이언트를 처음 만들 때 import 한다. (API Key를 입력하기 전 페이지는 openai를 불러오지 않음)
+    """
+    key = (hashlib.sha256(api_key.encode("utf-8")).hexdigest(), timeout, max_retries, base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import httpx
+            from openai import OpenAI
+
+            http_client = httpx.Client(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                    keepalive_expiry=60,
+                ),
+            )
+            client = OpenAI(
+                api_key=api_key,
+                timeout=timeout,
+                max_retries=max_retries,
+                base_url=base_url,
+                http_client=http_client,
+            )
+            _clients.set(key, client)
+        return client
+
+
+# 응답 캐시 백엔드: "tiered"(메모리+디스크, 기본) / "memory" / "off"
+COMPLETION_CACHE_BACKEND = os.environ.get("YOYAK_COMPLETION_CACHE", "tiered")
+
+
+class CompletionCache:
+    """
+    요청 파라미터 해시 → 응답 텍스트 캐시.
+    backend는 get(key, default) / set(key, value)만 있으면 된다. (LRUCache, TieredCache 등)
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, request: dict):
+        value = self.backend.get(self.make_key(request))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        increment("completion_cache_total", result="miss" if value is None else "hit")
+        return value
+
+    def set(self, request: dict, text: str):
+        self.backend.set(self.make_key(request), text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+def _make_default_cache():
+    if COMPLETION_CACHE_BACKEND == "off":
+        return None
+    if COMPLETION_CACHE_BACKEND == "memory":
+        return CompletionCache(LRUCache(max_items=256))
+    return CompletionCache(TieredCache("completions", max_items=256, max_bytes=256 * 1024 * 1024))
+
+
+completion_cache = _make_default_cache()
+
+
+def record_token_usage(usage, model: str):
+    """응답의 usage(prompt/completion 토큰 수)를 카운터에 더한다. (usage가 없으면 무시)"""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            increment("openai_tokens_total", tokens, model=model, kind=kind)
+
+
+def _usage_tokens(usage):
+    total = getattr(usage, "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
+def _send_chat(client, request: dict, priority: int, **extra):
+    """
+    ratelimit 스케줄러를 거쳐 chat.completions.create를 보낸다. (한도 대기 / 429 재시도 / 우선순위)
+    반환: (응답 객체, 미리 잡은 토큰 수 또는 None)
+    """
+    if scheduler is None:
+        return client.chat.completions.create(**extra, **request), None
+    tokens = estimate_chat_tokens(request)
+    raw = scheduler.call(
+        client, request.get("model", ""), tokens,
+        lambda c: c.chat.completions.with_raw_response.create(**extra, **request),
+        priority=priority,
+    )
+    return raw.parse(), tokens
+
+
+def _settle(client, request: dict, estimated, usage):
+    if scheduler is not None and estimated is not None:
+        scheduler.settle(client, request.get("model", ""), estimated, _usage_tokens(usage))
+
+
+def create_chat_completion(client, use_cache: bool = True, cache=None, priority: int = BULK,
+                           cache_check=None, **kwargs) -> str:
+    """
+    스트리밍 없이 한 번에 응답 텍스트를 받아온다.
+    use_cache=True이면 같은 요청의 이전 응답을 재사용한다. (cache를 주면 그 캐시 사용)
+    priority: 한도에 걸려 기다릴 때의 순서 (ratelimit.INTERACTIVE가 BULK보다 먼저 나감)
+    cache_check(text): False를 반환하면 응답을 캐시에 저장하지 않는다. (형식 검증에 실패한 응답 등)
+    """
+    cache = cache or completion_cache
+    if use_cache and cache is not None:
+        cached = cache.get(kwargs)
+        if cached is not None:
+            return cached
+
+    model = kwargs.get("model", "")
+    with span("openai_chat", model=model, stream="false"):
+        completion, estimated = _send_chat(client, kwargs, priority)
+    usage = getattr(completion, "usage", None)
+    record_token_usage(usage, model)
+    _settle(client, kwargs, estimated, usage)
+    text = completion.choices[0].message.content or ""
+
+    if use_cache and cache is not None and text and (cache_check is None or cache_check(text)):
+        cache.set(kwargs, text)
+    return text
+
+
+def stream_chat_completion(client, use_cache: bool = True, cache=None, priority: int = BULK,
+                           cache_check=None, **kwargs):
+    """
+    stream=True로 호출해서 토큰(텍스트 조각)이 도착하는 대로 yield 한다.
+    캐시에 같은 요청이 있으면 저장된 응답을 한 번에 yield 하고,
+    없으면 끝까지 받은 뒤에 캐시에 저장한다. (중간에 끊기거나 cache_check를 통과하지 못하면 저장하지 않음)
+    """
+    cache = cache or completion_cache
+    if use_cache and cache is not None:
+        cached = cache.get(kwargs)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    usage = None
+    model = kwargs.get("model", "")
+    start = time.perf_counter()
+    with span("openai_chat", model=model, stream="true"):
+        stream, estimated = _send_chat(client, kwargs, priority, stream=True)
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                    record_token_usage(usage, model)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        observe("openai_chat_first_token_seconds", time.perf_counter() - start, model=model)
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # 중간에 끊겼을 때(취소) 응답을 바로 닫아서 연결을 풀에 돌려준다.
+            # 닫지 않고 GC에 맡기면 다른 스레드가 연결 풀 락을 잡은 채 정리하다가 교착될 수 있다.
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            _settle(client, kwargs, estimated, usage)
+
+    if use_cache and cache is not None and parts:
+        text = "".join(parts)
+        if cache_check is None or cache_check(text):
+            cache.set(kwargs, text)
+
+
+def describe_error(error) -> str:
+    """작업 오류를 사용자에게 보여줄 메시지로. (OpenAI 오류는 원인별 안내, 그 밖에는 오류 문자열)"""
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        if getattr(error, "code", None) == "insufficient_quota":
+            return "OpenAI 계정의 사용 한도(크레딧)가 모두 소진되었습니다. OpenAI 결제/사용량 설정을 확인해주세요."
+        return "지금 요청이 많아 OpenAI 사용 한도에 걸렸습니다. 잠시 후 다시 시도해주세요."
+    if isinstance(error, openai.AuthenticationError):
+        return "API Key가 올바르지 않습니다. 1번 페이지에서 API Key를 다시 확인해주세요."
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return "OpenAI 서버에 연결하지 못했습니다. 잠시 후 다시 시도해주세요."
+    return str(error) or type(error).__name__
+
+
+def accumulate(chunks, interval: float = 0.05):
+    """
+    텍스트 조각을 이어 붙이면서 '지금까지의 전체 텍스트'를 yield 한다.
+    화면 갱신이 너무 잦지 않도록 interval 초마다 한 번씩만 내보내고,
+    마지막 전체 텍스트는 항상 내보낸다.
+    """
+    parts = []
+    last_emit = 0.0
+    dirty = False
+    for chunk in chunks:
+        parts.append(chunk)
+        dirty = True
+        now = time.monotonic()
+        if now - last_emit >= interval:
+            last_emit = now
+            dirty = False
+            yield "".join(parts)
+    if dirty or not parts:
+        yield "".join(parts)
@@ -1,8 +1,13 @@
 # main page
 import streamlit as st
 
+from metrics import start_metrics_server
+
 st.set_page_config(page_title="요약해조", page_icon="📝")
 
+# YOYAK_METRICS_PORT가 있으면 /metrics 엔드포인트를 띄운다. (프로세스당 한 번, 재실행 때는 그대로 둠)
+start_metrics_server()
+
 st.title("요약해조 📝")
 st.write("강의자료(PPT · 영상 · 링크) 요약 & 문제 생성 서비스")
 st.write("당신의 시간을 아껴주는 똑똑한 학습 요약 파트너!")
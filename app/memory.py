@@ -0,0 +1,113 @@
+# memory.py
+"""
+챗봇 대화 기록 압축 (rolling summary).
+
+대화가 길어지면 오래된 턴을 '지금까지의 대화 요약' 하나로 접어서
+매 턴 보내는 프롬프트 크기를 일정하게 유지한다.
+요약은 답변을 화면에 보여준 뒤 백그라운드 스레드에서 계산하므로
+사용자가 기다리는 시간에는 영향을 주지 않는다.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llm import DEFAULT_MODEL, create_chat_completion
+from prompting import TOKENS_PER_MESSAGE, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# 요약하지 않고 그대로 보낼 최근 메시지 수 (user/assistant 합산)
+KEEP_RECENT_MESSAGES = 6
+# 요약되지 않은 오래된 메시지가 이 토큰 수를 넘으면 압축
+COMPACT_THRESHOLD_TOKENS = int(os.environ.get("YOYAK_CHAT_COMPACT_TOKENS", "1500"))
+
+SUMMARY_SYSTEM_PROMPT = (
+    "너는 학생과 AI 튜터의 대화를 정리하는 도우미야.\n"
+    "기존 요약과 새로 이어진 대화를 합쳐서, 이후 대화에 필요한 내용"
+    "(학생이 물어본 개념, 튜터가 설명한 핵심, 학생이 헷갈려한 부분)을 "
+    "한국어로 간결하게 하나의 요약으로 정리해줘."
+)
+
+# 모든 세션이 함께 쓰는 요약 작업용 스레드 풀
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-memory")
+
+
+class ConversationMemory:
+    """
+    세션별 대화 요약 상태. st.session_state에 그대로 보관한다.
+    messages[:summarized_upto]는 summary에 접혀 있고, 그 뒤만 원문으로 보낸다.
+    """
+
+    def __init__(self, keep_recent: int = KEEP_RECENT_MESSAGES,
+                 threshold_tokens: int = COMPACT_THRESHOLD_TOKENS):
+        self.keep_recent = keep_recent
+        self.threshold_tokens = threshold_tokens
+        self.summary = ""
+        self.summarized_upto = 0
+        self._future = None
+        self._lock = threading.Lock()
+
+    def history(self, messages: list) -> list:
+        """프롬프트에 넣을 대화 기록: [요약 메시지] + 아직 요약되지 않은 메시지들"""
+        with self._lock:
+            summary, upto = self.summary, self.summarized_upto
+        recent = messages[upto:]
+        if not summary:
+            return list(recent)
+        return [{"role": "system", "content": f"[이전 대화 요약]\n{summary}"}, *recent]
+
+    @property
+    def busy(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def schedule_compaction(self, client, messages: list, model: str = DEFAULT_MODEL) -> bool:
+        """
+        요약할 만큼 오래된 대화가 쌓였으면 백그라운드 요약을 예약한다.
+        이미 요약 중이면 아무것도 하지 않는다. 예약했으면 True
+        """
+        if self.busy:
+            return False
+
+        with self._lock:
+            upto = self.summarized_upto
+            summary = self.summary
+        cut = len(messages) - self.keep_recent
+        if cut <= upto:
+            return False
+
+        old_messages = list(messages[upto:cut])
+        old_tokens = sum(TOKENS_PER_MESSAGE + count_tokens(m["content"], model) for m in old_messages)
+        if old_tokens < self.threshold_tokens:
+            return False
+
+        self._future = _executor.submit(self._compact, client, summary, old_messages, cut, model)
+        return True
+
+    def _compact(self, client, summary: str, old_messages: list, cut: int, model: str):
+        transcript = "\n".join(
+            f"{'학생' if m['role'] == 'user' else '튜터'}: {m['content']}" for m in old_messages
+        )
+        user_content = (
+            f"[기존 요약]\n{summary or '(없음)'}\n\n"
+            f"[이어진 대화]\n{transcript}"
+        )
+        try:
+            new_summary = create_chat_completion(
+                client,
+                model=model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content},
+                ],
+                temperature=0.2,
+                max_tokens=600,
+            )
+        except Exception:
+            # 요약에 실패해도 대화는 계속된다. (다음 턴에 다시 시도)
+            logger.exception("대화 요약 실패")
+            return
+
+        with self._lock:
+            self.summary = new_summary
+            self.summarized_upto = cut
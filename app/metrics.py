@@ -0,0 +1,216 @@
+# metrics.py
+"""
+가벼운 계측(instrumentation) 모듈.
+
+- span(name, **labels)     : with 블록의 소요 시간을 기록 (성공/오류/취소 상태 포함)
+- observe(name, value, ...) : 값 하나를 직접 기록 (첫 토큰까지 걸린 시간 등)
+- increment(name, value, ...): 카운터 (캐시 적중, 토큰 수 등)
+
+측정값은 (이름, 라벨) 별로 누적 count/sum과 최근 SAMPLE_WINDOW개 샘플을 들고 있어서
+p50/p90/p99를 바로 계산할 수 있다. 외부 라이브러리 없이 락 하나로만 보호한다.
+
+내보내기
+- snapshot(): 관리자 페이지(pages/9_Metrics.py)용 dict
+- render_prometheus(): Prometheus 텍스트 형식 (summary / counter)
+- start_metrics_server(): YOYAK_METRICS_PORT를 주면 그 포트에 /metrics HTTP 엔드포인트를 띄운다.
+  import만으로는 포트를 열지 않고, 앱 진입점(main.py)과 pipeline.main()이 직접 부른다.
+- YOYAK_METRICS_LOG=1 이면 측정마다 JSON 한 줄 로그를 남긴다. (로거: metrics)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# 백분위 계산에 쓰는 최근 샘플 수 (측정 항목별)
+SAMPLE_WINDOW = int(os.environ.get("YOYAK_METRICS_WINDOW", "1024"))
+PERCENTILES = (0.5, 0.9, 0.99)
+METRICS_PORT = int(os.environ.get("YOYAK_METRICS_PORT", "0"))
+METRICS_LOG = os.environ.get("YOYAK_METRICS_LOG", "") not in ("", "0", "false")
+METRIC_PREFIX = "yoyak_"
+
+_lock = threading.Lock()
+_summaries = {}  # (name, labels) -> {"count", "sum", "samples"}
+_counters = {}   # (name, labels) -> value
+_started_at = time.time()
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _log(kind: str, name: str, value, labels: dict):
+    if METRICS_LOG or logger.isEnabledFor(logging.DEBUG):
+        record = {"ts": round(time.time(), 3), "kind": kind, "name": name, "value": value, **labels}
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def observe(name: str, value: float, **labels):
+    """값 하나를 기록 (초 단위 시간 등)"""
+    key = _key(name, labels)
+    with _lock:
+        summary = _summaries.get(key)
+        if summary is None:
+            summary = _summaries[key] = {"count": 0, "sum": 0.0, "samples": deque(maxlen=SAMPLE_WINDOW)}
+        summary["count"] += 1
+        summary["sum"] += value
+        summary["samples"].append(value)
+    _log("observe", name, round(value, 6), labels)
+
+
+def increment(name: str, value: float = 1, **labels):
+    """카운터를 value만큼 올린다."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _log("count", name, value, labels)
+
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    with span("openai_chat", model=...): ...
+    소요 시간을 '<name>_seconds'로 기록하고, status 라벨로 ok / error / cancelled를 구분한다.
+    (제너레이터 안에서 쓰다가 중간에 닫히면 cancelled)
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        observe(f"{name}_seconds", time.perf_counter() - start, status=status, **labels)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """정렬된 값에서 q(0~1) 백분위 (선형 보간)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def snapshot() -> dict:
+    """
+    현재까지의 측정값.
+    {"uptime", "summaries": [{"name", "labels", "count", "sum", "mean", "p50", "p90", "p99", "max"}],
+     "counters": [{"name", "labels", "value"}]}
+    """
+    with _lock:
+        summaries = [(key, s["count"], s["sum"], sorted(s["samples"])) for key, s in _summaries.items()]
+        counters = list(_counters.items())
+
+    result = {"uptime": time.time() - _started_at, "summaries": [], "counters": []}
+    for (name, labels), count, total, samples in sorted(summaries):
+        row = {"name": name, "labels": dict(labels), "count": count, "sum": total,
+               "mean": total / count if count else 0.0, "max": samples[-1] if samples else 0.0}
+        for q in PERCENTILES:
+            row[f"p{int(q * 100)}"] = percentile(samples, q)
+        result["summaries"].append(row)
+    for (name, labels), value in sorted(counters):
+        result["counters"].append({"name": name, "labels": dict(labels), "value": value})
+    return result
+
+
+def reset():
+    """측정값을 모두 지운다. (벤치마크/관리자 페이지용)"""
+    with _lock:
+        _summaries.clear()
+        _counters.clear()
+
+
+def _format_labels(labels: dict, **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items.items()
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """Prometheus 텍스트 형식 (version 0.0.4)"""
+    data = snapshot()
+    lines = []
+    seen = set()
+    for row in data["summaries"]:
+        name = METRIC_PREFIX + row["name"]
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {name} summary")
+        for q in PERCENTILES:
+            labels = _format_labels(row["labels"], quantile=q)
+            lines.append(f"{name}{labels} {row[f'p{int(q * 100)}']:.6f}")
+        labels = _format_labels(row["labels"])
+        lines.append(f"{name}_sum{labels} {row['sum']:.6f}")
+        lines.append(f"{name}_count{labels} {row['count']}")
+    for row in data["counters"]:
+        name = METRIC_PREFIX + row["name"]
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(row['labels'])} {row['value']}")
+    lines.append(f"# TYPE {METRIC_PREFIX}uptime_seconds gauge")
+    lines.append(f"{METRIC_PREFIX}uptime_seconds {data['uptime']:.1f}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------
+# /metrics HTTP 엔드포인트 (Streamlit 서버와 별도 포트)
+# -------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 스크랩 요청마다 stderr에 찍히지 않게 한다.
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0"):
+    """port에 /metrics 서버를 띄운다. (port=0이면 아무것도 하지 않음, 프로세스당 한 번)"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                logger.warning("metrics 서버를 %s:%s에 띄우지 못했습니다.", host, port)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
+
+
+if METRICS_LOG and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
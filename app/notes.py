@@ -0,0 +1,524 @@
+# notes.py
+"""
+강의노트 생성 (map-reduce).
+
+긴 자막/문서를 한 번에 보내면 컨텍스트를 넘기거나 품질이 떨어지므로
+1) 원문을 구간(section)으로 나누고
+2) 구간별 요약을 스레드 풀에서 동시에 만든 뒤 (map)
+3) 부분 요약들을 합쳐서 기존 4단 형식의 강의노트로 정리한다. (reduce)
+
+전체 소요 시간은 '가장 긴 구간 하나 + reduce 한 번' 정도가 된다.
+
+원문이 조각으로 조금씩 도착하는 경우(영상 음성 인식 등)에는 generate_notes_pipelined()가
+구간 길이만큼 모일 때마다 구간 요약을 바로 시작해서, 인식과 요약이 겹쳐서 진행된다.
+
+긴 PDF/PPTX는 generate_notes_incremental()이 페이지 경계에서 구간을 나누고 기록(revisions.py)을 남겨서,
+수정된 자료를 다시 올리면 바뀐 구간만 다시 요약하고 기존 노트에 반영한다.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from llm import DEFAULT_MODEL, create_chat_completion, get_openai_client, stream_chat_completion
+from metrics import increment
+from prompting import NOTE_SINGLE_PASS_TOKENS, count_tokens, request_usage
+from retrieval import chunk_text
+from transcribe import MEDIA_TYPES, get_media_transcript, iter_media_transcript
+from revisions import NoteRecord, load_record, page_fingerprint, plan_sections, record_key, save_record, \
+    section_text
+from utils import PAGE_LABELS, content_hash, extract_document_pages, extract_document_text, \
+    load_youtube_transcript
+
+NOTE_SYSTEM_PROMPT = (
+    "너는 대학 강의를 정리해 주는 조교야.\n"
+    "사용자가 업로드한 강의자료(텍스트, 유튜브 링크, PDF/PPT 등)를 기반으로 "
+    "다음 형식의 강의노트를 만들어줘.\n\n"
+    "1. 강의 개요\n"
+    "   - 이 강의의 주제 한 줄 요약\n"
+    "   - 강의에서 다루는 핵심 질문/목표\n\n"
+    "2. 핵심 개념 정리\n"
+    "   - 개념 1: 정의 + 중요 포인트\n"
+    "   - 개념 2: 정의 + 중요 포인트\n"
+    "   - … (필요한 만큼)\n\n"
+    "3. 예시 및 응용\n"
+    "   - 강의에서 나올 법한 대표 예시나 사례 정리\n"
+    "   - 학생이 실무/현실에서 어떻게 써먹을 수 있는지\n\n"
+    "4. 강의 체크리스트\n"
+    "   - 복습할 때 스스로 물어볼 만한 질문 3~5개\n\n"
+    "문장은 한국어로, 너무 장황하지 않게 A4 1~2장 분량 느낌으로 정리해줘."
+)
+
+SECTION_SYSTEM_PROMPT = (
+    "너는 대학 강의를 정리해 주는 조교야.\n"
+    "지금 받는 텍스트는 긴 강의자료의 일부 구간이다.\n"
+    "이 구간에 나오는 개념, 정의, 예시, 중요한 설명을 빠짐없이 "
+    "한국어 bullet 목록으로 간결하게 정리해줘.\n"
+    "구간 밖의 내용을 추측해서 덧붙이지 마.\n"
+    "[mm:ss] 같은 시간 표시가 있으면 해당 bullet 끝에 시간을 남겨줘."
+)
+
+NOTE_UPDATE_INSTRUCTIONS = (
+    "다음은 {source_label}의 이전 버전으로 만든 강의노트와, 자료가 수정되면서 바뀐 구간들의 요약이다.\n"
+    "기존 노트의 형식과 표현은 최대한 그대로 두고, 삭제되거나 바뀌기 전 내용은 빼고\n"
+    "새로 추가되거나 바뀐 내용을 알맞은 자리에 반영해서 전체 강의노트를 다시 써줘.\n"
+    "바뀌지 않은 부분은 새로 지어내지 말고 기존 노트를 그대로 옮겨 적어."
+)
+
+# 원문이 이 토큰 수를 넘으면 map-reduce로 처리
+MAP_REDUCE_THRESHOLD = NOTE_SINGLE_PASS_TOKENS
+# 구간 하나의 최대 길이(글자 수)
+SECTION_CHARS = 8000
+# 계층적 reduce 최대 단계 수
+MAX_REDUCE_LEVELS = 3
+# 구간 요약 동시 요청 수 (환경변수로 조정 가능)
+DEFAULT_CONCURRENCY = int(os.environ.get("YOYAK_NOTE_CONCURRENCY", "4"))
+# 다시 요약한 구간이 이 비율 이하이면 기존 노트를 고쳐 쓰고, 넘으면 구간 요약 전체로 다시 합친다.
+INCREMENTAL_UPDATE_RATIO = 0.5
+
+
+def needs_map_reduce(source_text: str, threshold: int = MAP_REDUCE_THRESHOLD,
+                     model: str = DEFAULT_MODEL) -> bool:
+    return count_tokens(source_text, model) > threshold
+
+
+def split_sections(source_text: str, section_chars: int = SECTION_CHARS) -> list:
+    """원문(문자열 또는 Transcript)을 section_chars 안팎의 구간으로 나눈다. (구간 사이 약간 겹침)"""
+    from transcript import Transcript
+
+    if isinstance(source_text, Transcript):
+        # 자막은 문자열을 다시 자르지 않고 문장 경계에서 나누고, 구간마다 시간 범위를 붙인다.
+        return [chunk.labeled_text for chunk in
+                source_text.chunks(max_chars=section_chars, overlap=section_chars // 20)]
+    return chunk_text(source_text, chunk_size=section_chars, overlap=section_chars // 20)
+
+
+def summarize_section(client, section: str, index: int, total: int, model: str = DEFAULT_MODEL,
+                      use_cache: bool = True) -> str:
+    # total=None: 전체 구간 수를 아직 모를 때 (조각이 도착하는 대로 요약하는 경우)
+    label = f"[구간 {index}/{total}]" if total else f"[구간 {index}]"
+    return create_chat_completion(
+        client,
+        use_cache=use_cache,
+        model=model,
+        messages=[
+            {"role": "system", "content": SECTION_SYSTEM_PROMPT},
+            {"role": "user", "content": f"{label}\n\n{section}"},
+        ],
+        temperature=0.3,
+    )
+
+
+def summarize_sections(client, sections: list, max_workers: int = DEFAULT_CONCURRENCY,
+                       model: str = DEFAULT_MODEL, use_cache: bool = True) -> list:
+    """구간 요약을 최대 max_workers개씩 동시에 요청한다. 결과 순서는 구간 순서와 같다."""
+    total = len(sections)
+    max_workers = max(1, min(max_workers, total))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(summarize_section, client, section, i, total, model, use_cache)
+            for i, section in enumerate(sections, start=1)
+        ]
+        return [future.result() for future in futures]
+
+
+def build_reduce_input(partial_notes: list, source_label: str) -> str:
+    parts = "\n\n".join(
+        f"--- [구간 {i} 요약] ---\n{note}" for i, note in enumerate(partial_notes, start=1)
+    )
+    return (
+        f"다음은 {source_label}을(를) 여러 구간으로 나눠 구간별로 정리한 부분 노트들이다.\n"
+        "구간 순서가 곧 강의 진행 순서이다. 중복되는 내용은 합치고,\n"
+        "전체 흐름이 드러나도록 하나의 강의노트로 정리해줘.\n\n"
+        f"{parts}"
+    )
+
+
+def generate_notes_map_reduce(client, source_text: str, source_label: str = "강의자료",
+                              stream: bool = False, max_workers: int = DEFAULT_CONCURRENCY,
+                              section_chars: int = SECTION_CHARS, model: str = DEFAULT_MODEL,
+                              use_cache: bool = True):
+    """
+    긴 원문(문자열 또는 Transcript)을 map-reduce로 요약해서 강의노트를 만든다.
+    stream=True이면 reduce 단계의 텍스트 조각을 yield 하는 제너레이터를 반환한다.
+    """
+    sections = split_sections(source_text, section_chars=section_chars)
+    partial_notes = summarize_sections(client, sections, max_workers=max_workers, model=model,
+                                       use_cache=use_cache)
+    return reduce_partial_notes(client, partial_notes, source_label, stream=stream,
+                                max_workers=max_workers, section_chars=section_chars,
+                                model=model, use_cache=use_cache)
+
+
+def reduce_partial_notes(client, partial_notes: list, source_label: str = "강의자료",
+                         stream: bool = False, max_workers: int = DEFAULT_CONCURRENCY,
+                         section_chars: int = SECTION_CHARS, model: str = DEFAULT_MODEL,
+                         use_cache: bool = True):
+    """구간별 부분 노트를 하나의 강의노트로 합친다. (reduce 단계)"""
+    # 부분 노트를 합쳐도 너무 길면 한 단계 더 묶어서 요약한다. (계층적 reduce)
+    merged = "\n\n".join(partial_notes)
+    level = 1
+    while level < MAX_REDUCE_LEVELS and len(partial_notes) > 1 and needs_map_reduce(merged, model=model):
+        level += 1
+        sections = split_sections(merged, section_chars=section_chars)
+        partial_notes = summarize_sections(client, sections, max_workers=max_workers, model=model,
+                                       use_cache=use_cache)
+        merged = "\n\n".join(partial_notes)
+
+    request = dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": NOTE_SYSTEM_PROMPT},
+            {"role": "user", "content": build_reduce_input(partial_notes, source_label)},
+        ],
+        temperature=0.3,
+    )
+    request_usage("note-reduce", request["messages"], model)
+    if stream:
+        return stream_chat_completion(client, use_cache=use_cache, **request)
+    return create_chat_completion(client, use_cache=use_cache, **request)
+
+
+def generate_notes_pipelined(client, text_pieces, single_pass, source_label: str = "강의자료",
+                             stream: bool = False, max_workers: int = DEFAULT_CONCURRENCY,
+                             section_chars: int = SECTION_CHARS, model: str = DEFAULT_MODEL,
+                             use_cache: bool = True):
+    """
+    원문 조각(text_pieces 이터레이터)이 도착하는 대로 map 단계를 시작하는 map-reduce.
+    누적 원문이 map-reduce 기준을 넘는 순간부터, 구간 길이만큼 모일 때마다 구간 요약을 바로 제출한다.
+    끝까지 기준을 넘지 않으면(짧은 원문) single_pass(전체 텍스트)의 결과를 그대로 반환한다.
+    """
+    pieces = []
+    tokens = 0
+    buffer = ""
+    index = 0
+    futures = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        def submit(section):
+            nonlocal index
+            index += 1
+            futures.append(pool.submit(summarize_section, client, section, index, None, model, use_cache))
+
+        for piece in text_pieces:
+            pieces.append(piece)
+            if not futures and not buffer:
+                tokens += count_tokens(piece, model)
+                if tokens <= MAP_REDUCE_THRESHOLD:
+                    continue
+                buffer = " ".join(pieces)
+            else:
+                buffer = f"{buffer} {piece}"
+
+            # 마지막 구간은 뒤에 이어질 조각과 합치기 위해 남겨 둔다.
+            if len(buffer) >= section_chars * 3 // 2:
+                *ready, buffer = split_sections(buffer, section_chars=section_chars)
+                for section in ready:
+                    submit(section)
+
+        if not futures and not buffer:
+            return single_pass(" ".join(pieces))
+        if buffer.strip():
+            submit(buffer)
+        partial_notes = [future.result() for future in futures]
+
+    return reduce_partial_notes(client, partial_notes, source_label, stream=stream,
+                                max_workers=max_workers, section_chars=section_chars,
+                                model=model, use_cache=use_cache)
+
+
+def build_update_input(note: str, removed: list, changed: list, source_label: str) -> str:
+    removed_text = "\n\n".join(removed) or "(없음)"
+    changed_text = "\n\n".join(changed) or "(없음)"
+    return (
+        NOTE_UPDATE_INSTRUCTIONS.format(source_label=source_label) + "\n\n"
+        f"=== [기존 강의노트] ===\n{note}\n\n"
+        f"=== [삭제되거나 바뀌기 전 구간 요약] ===\n{removed_text}\n\n"
+        f"=== [새로 추가되거나 바뀐 구간 요약] ===\n{changed_text}"
+    )
+
+
+def _save_when_done(result, save):
+    """최종 노트(문자열 또는 스트림)를 끝까지 받으면 save(note)를 부른다. (중간에 끊기면 저장하지 않음)"""
+    if isinstance(result, str):
+        save(result)
+        return result
+
+    def chunks():
+        parts = []
+        for chunk in result:
+            parts.append(chunk)
+            yield chunk
+        save("".join(parts))
+
+    return chunks()
+
+
+def generate_notes_incremental(client, pages: list, content_type: str, key=None, digest: str = "",
+                               source_label: str = "강의자료", stream: bool = False,
+                               max_workers: int = DEFAULT_CONCURRENCY, section_chars: int = SECTION_CHARS,
+                               model: str = DEFAULT_MODEL, use_cache: bool = True, on_plan=None):
+    """
+    PDF/PPTX 페이지 목록으로 map-reduce 강의노트를 만든다. 구간은 페이지 경계에서 나눈다.
+    key(revisions.record_key)로 이전 버전 기록이 있으면
+      - 페이지가 그대로인 구간은 이전 요약을 다시 쓰고 바뀐/새 페이지 구간만 요약한 뒤,
+      - 바뀐 구간이 적으면 기존 노트에 바뀐 내용만 반영하고, 많으면 전체 구간 요약으로 다시 합친다.
+    끝까지 만든 노트는 다음 버전을 위해 기록으로 남긴다. use_cache=False이면 기록을 쓰지 않고 새로 만든다.
+    on_plan({"sections", "reused", "summarized", "changed_pages", "pages"}): 구간 계획이 정해지면 호출
+    """
+    label = PAGE_LABELS[content_type]
+    fingerprints = [page_fingerprint(text) for text in pages]
+    previous = load_record(key) if use_cache else None
+    if previous is not None and previous.digest == digest and previous.note:
+        # 같은 버전: 이전 노트 그대로
+        if on_plan:
+            on_plan({"sections": len(previous.sections), "reused": len(previous.sections), "summarized": 0,
+                     "changed_pages": 0, "pages": len(pages)})
+        return iter([previous.note]) if stream else previous.note
+
+    sections, removed = plan_sections(pages, fingerprints, label, previous, section_chars=section_chars)
+    pending = [(i, section) for i, section in enumerate(sections, start=1) if not section.summary]
+    total = len(sections)
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as pool:
+            futures = [
+                pool.submit(summarize_section, client, section_text(pages, section, label, section_chars),
+                            i, total, model, use_cache)
+                for i, section in pending
+            ]
+            for (_, section), future in zip(pending, futures):
+                section.summary = future.result()
+    pending = [section for _, section in pending]
+
+    reused = total - len(pending)
+    changed_pages = len({i for section in pending for i in range(section.start, section.end)})
+    increment("note_sections_total", reused, result="reused")
+    increment("note_sections_total", len(pending), result="summarized")
+    if on_plan:
+        on_plan({"sections": total, "reused": reused, "summarized": len(pending),
+                 "changed_pages": changed_pages, "pages": len(pages)})
+
+    def save(note: str):
+        save_record(key, NoteRecord(digest=digest, fingerprints=fingerprints, sections=sections, note=note))
+
+    if previous is not None and previous.note and not pending and not removed:
+        # 파일만 새로 저장됐고 페이지 내용은 그대로: 이전 노트 그대로
+        save(previous.note)
+        return iter([previous.note]) if stream else previous.note
+
+    update_input = None
+    if previous is not None and previous.note and reused and len(pending) <= total * INCREMENTAL_UPDATE_RATIO:
+        update_input = build_update_input(previous.note, [s.summary for s in removed],
+                                          [s.summary for s in pending], source_label)
+        if needs_map_reduce(update_input, model=model):
+            update_input = None
+
+    if update_input is None:
+        result = reduce_partial_notes(client, [section.summary for section in sections], source_label,
+                                      stream=stream, max_workers=max_workers, section_chars=section_chars,
+                                      model=model, use_cache=use_cache)
+        return _save_when_done(result, save)
+
+    request = dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": NOTE_SYSTEM_PROMPT},
+            {"role": "user", "content": update_input},
+        ],
+        temperature=0.3,
+    )
+    request_usage("note-update", request["messages"], model)
+    if stream:
+        return _save_when_done(stream_chat_completion(client, use_cache=use_cache, **request), save)
+    return _save_when_done(create_chat_completion(client, use_cache=use_cache, **request), save)
+
+
+# -------------------------------------------------
+# 자료 → 강의노트
+#  노트 페이지와 일괄 생성 CLI(pipeline.py)가 함께 쓰는 진입점
+# -------------------------------------------------
+def load_source_text(uploaded_content, content_type: str):
+    """
+    자료의 원문 텍스트를 가져온다.
+    반환: (text_or_None, error_message_or_None)
+    원문을 읽을 수 없는 형식(PPT 등)은 (None, None)
+    """
+    # (1) 텍스트 직접 입력
+    if content_type == "text":
+        return uploaded_content, None
+
+    # (2) 유튜브 링크: utils.py에서 만든 함수로 자막(script)을 뽑아옵니다.
+    #     1분마다 [mm:ss] 시간 표시를 넣어서 노트에 시간을 남길 수 있게 한다.
+    if content_type == "youtube":
+        transcript, error_msg = load_youtube_transcript(uploaded_content)
+        if error_msg:
+            return None, error_msg
+        return transcript.timestamped_text(), None
+
+    # (3) 영상 파일: 서버에서 음성 인식한 결과 (유튜브 자막과 같은 캐시 사용)
+    if content_type in MEDIA_TYPES:
+        return get_media_transcript(uploaded_content)
+
+    # (4) PDF/PPTX: 공용 추출 캐시에서 본문 텍스트를 가져온다.
+    if content_type in PAGE_LABELS:
+        try:
+            # uploaded_content는 문서 저장소 핸들: 파일을 복사하지 않고 디스크에서 바로 읽는다.
+            doc_text = extract_document_text(uploaded_content, content_type, page_headers=True)
+        except Exception as e:
+            return None, f"{content_type.upper()} 텍스트를 추출하는 데 실패했습니다. ({e})"
+        return (doc_text if doc_text.strip() else None), None
+
+    return None, None
+
+
+def build_user_input(uploaded_content, content_type: str, source=None) -> str:
+    """
+    1번 페이지에서 저장한 uploaded_content와 content_type을 받아
+    모델에 넘길 user 메시지 텍스트를 만들어준다.
+    source: 이미 읽어 둔 load_source_text() 결과 (없으면 여기서 읽는다)
+    """
+    text, error_msg = source if source is not None else load_source_text(uploaded_content, content_type)
+
+    # (1) 텍스트 직접 입력
+    if content_type == "text":
+        return (
+            "다음 텍스트는 한 편의 강의 내용을 옮겨 적은 것이다.\n"
+            "이 텍스트 전체를 기반으로 강의노트를 작성해줘.\n\n"
+            f"{text}"
+        )
+
+    # (2) 유튜브 링크
+    if content_type == "youtube":
+        # 만약 자막을 못 가져왔다면 에러 메시지를 반환합니다.
+        if error_msg:
+            return f"시스템 알림: 유튜브 자막을 가져오는 데 실패했습니다. ({error_msg})"
+
+        # 자막을 성공적으로 가져왔다면, AI에게 자막 내용을 던져줍니다.
+        return (
+            "다음은 사용자가 제공한 유튜브 영상의 '자막 스크립트'이다.\n"
+            "영상 화면은 볼 수 없으니, 오직 아래 텍스트 내용을 바탕으로 강의노트를 작성해라.\n"
+            "내용을 빠짐없이 분석해서 개요, 핵심 개념, 예시 등을 정리해줘.\n\n"
+            f"--- [강의 자막 시작] ---\n{text}\n--- [강의 자막 끝] ---"
+        )
+
+    # (3) 영상 파일
+    if content_type in MEDIA_TYPES:
+        if error_msg:
+            return f"시스템 알림: 영상 음성 인식에 실패했습니다. ({error_msg})"
+        return (
+            "다음은 사용자가 업로드한 강의 영상의 음성을 인식한 '자막 스크립트'이다.\n"
+            "음성 인식 결과라 오타나 띄어쓰기 오류가 있을 수 있으니 문맥에 맞게 이해하고,\n"
+            "아래 텍스트 내용을 바탕으로 개요, 핵심 개념, 예시 등을 정리해줘.\n\n"
+            f"--- [강의 자막 시작] ---\n{text}\n--- [강의 자막 끝] ---"
+        )
+
+    # (4) PDF/PPTX
+    if content_type in PAGE_LABELS:
+        label = PAGE_LABELS[content_type]
+        if error_msg:
+            return f"시스템 알림: {error_msg}"
+        if text:
+            return (
+                f"다음은 사용자가 업로드한 강의자료 {content_type.upper()}에서 추출한 텍스트이다.\n"
+                f"구분선(--- {label} N ---)을 참고해서 강의노트를 작성해줘.\n\n"
+                f"--- [강의자료 시작] ---\n{text}\n--- [강의자료 끝] ---"
+            )
+
+    # (5) 그 외 파일(PPT 등)
+    file_name = getattr(uploaded_content, "name", "알 수 없는 파일명")
+    return (
+        "사용자가 대학 강의자료 파일을 업로드했다.\n"
+        "현재 앱에서는 파일의 원문 텍스트를 직접 읽어오지는 못하지만,\n"
+        "일반적인 대학 강의 슬라이드/자료라고 가정하고 강의노트를 작성해줘.\n\n"
+        f"파일 이름: {file_name}\n"
+        f"파일 타입(확장자): {content_type}\n\n"
+        "※ 실제 슬라이드 내용을 모르는 상태이므로, 과도하게 구체적인 예시는 피하고,\n"
+        "대학생 대상의 일반적인 강의 구조(개요-핵심 개념-예시/응용-체크리스트)에 맞게 작성해줘."
+    )
+
+
+SOURCE_LABELS = {
+    "text": "강의 텍스트",
+    "youtube": "유튜브 강의 자막",
+    "pdf": "강의자료 PDF",
+    "pptx": "강의 슬라이드(PPTX)",
+    "mp4": "강의 영상 음성 인식 자막",
+    "mov": "강의 영상 음성 인식 자막",
+    "avi": "강의 영상 음성 인식 자막",
+}
+
+
+def generate_lecture_notes(api_key: str, uploaded_content, content_type: str, stream: bool = False,
+                           max_workers: int = DEFAULT_CONCURRENCY, use_cache: bool = True,
+                           on_segment=None, on_plan=None):
+    """
+    OpenAI Chat Completions API를 이용해서 강의노트를 생성한다.
+    stream=True이면 완성된 문자열 대신 텍스트 조각을 yield 하는 제너레이터를 반환한다.
+    원문이 길면 구간별 요약을 max_workers개씩 동시에 만든 뒤 합친다. (map-reduce)
+    영상은 음성 인식이 끝난 구간부터 바로 요약을 시작한다. (on_segment(n): n번째 구간 인식 완료)
+    긴 PDF/PPTX는 같은 API key로 같은 이름을 올린 이전 버전과 비교해서 바뀐 구간만 다시 요약한다.
+    (on_plan: 구간 계획 보고)
+    use_cache=False이면 같은 자료라도 캐시를 쓰지 않고 새로 생성한다.
+    """
+    client = get_openai_client(api_key)
+    source_label = SOURCE_LABELS.get(content_type, "강의자료")
+
+    def single_pass(source):
+        user_input = build_user_input(uploaded_content, content_type, source=source)
+        request = dict(
+            model=DEFAULT_MODEL,  # 모델은 필요하면 gpt-4o 등으로 변경 가능
+            messages=[
+                {"role": "system", "content": NOTE_SYSTEM_PROMPT},
+                {"role": "user", "content": user_input},
+            ],
+            temperature=0.3,
+        )
+        request_usage("note", request["messages"], DEFAULT_MODEL)
+
+        if stream:
+            return stream_chat_completion(client, use_cache=use_cache, **request)
+        return create_chat_completion(client, use_cache=use_cache, **request)
+
+    if content_type in MEDIA_TYPES:
+        def transcript_segments():
+            for n, text in enumerate(iter_media_transcript(uploaded_content), start=1):
+                if on_segment:
+                    on_segment(n)
+                yield text
+
+        return generate_notes_pipelined(
+            client,
+            transcript_segments(),
+            single_pass=lambda text: single_pass((text, None)),
+            source_label=source_label,
+            stream=stream,
+            max_workers=max_workers,
+            use_cache=use_cache,
+        )
+
+    source = load_source_text(uploaded_content, content_type)
+    source_text = source[0]
+    if source_text and needs_map_reduce(source_text):
+        if content_type in PAGE_LABELS:
+            digest = getattr(uploaded_content, "digest", None) or content_hash(uploaded_content)
+            return generate_notes_incremental(
+                client,
+                extract_document_pages(uploaded_content, content_type),
+                content_type,
+                key=record_key(uploaded_content, content_type, DEFAULT_MODEL, owner=api_key),
+                digest=digest,
+                source_label=source_label,
+                stream=stream,
+                max_workers=max_workers,
+                use_cache=use_cache,
+                on_plan=on_plan,
+            )
+        if content_type == "youtube":
+            # 자막은 Transcript 그대로 넘겨서 시간 범위가 붙은 구간으로 나눈다. (캐시에서 불러옴)
+            source_text, _ = load_youtube_transcript(uploaded_content)
+        return generate_notes_map_reduce(
+            client,
+            source_text,
+            source_label=source_label,
+            stream=stream,
+            max_workers=max_workers,
+            use_cache=use_cache,
+        )
+    return single_pass(source)
@@ -1,8 +1,15 @@
 import streamlit as st
+import sys
 import os
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from docstore import document_store
+from metrics import increment
+from workspace import session_workspace
+
 # 페이지 설정 (가장 윗부분에 위치해야 함)
 st.set_page_config(page_title="강의자료 업로드 - 요약해줘", layout="wide")
+increment("page_runs_total", page="upload")
 
 # --- 1. Session State 초기화 (데이터 영구 저장을 위한 설정) ---
 # API Key가 없으면 초기화
@@ -17,6 +24,9 @@ if 'uploaded_content' not in st.session_state:
 if 'content_type' not in st.session_state:
     st.session_state['content_type'] = None
 
+# 지금까지 올린 자료 모음 (여러 강의자료를 함께 사용)
+workspace = session_workspace(st.session_state)
+
 # --- 2. 사이드바: API Key 입력 (전역 설정) ---
 with st.sidebar:
     st.header("⚙️ 설정")
@@ -57,11 +67,18 @@ with tab1:
         
         # 버튼을 눌러야 처리가 확정되도록 (불필요한 리로드 방지)
         if st.button("파일 업로드 확정", key="btn_file"):
-            # 실제 파일 처리 로직은 여기서 (예: 텍스트 추출 함수 호출)
-            # 여기서는 예시로 파일 객체 자체를 저장합니다.
-            st.session_state['uploaded_content'] = uploaded_file
-            st.session_state['content_type'] = file_ext.replace('.', '') # pdf, pptx 등
-            st.success(f"'{uploaded_file.name}' 파일이 성공적으로 업로드되었습니다!")
+            # 파일 내용은 디스크의 문서 저장소로 옮기고, 세션에는 작은 핸들만 저장합니다.
+            # (같은 파일을 여러 명이 올려도 저장소에는 한 벌만 남습니다)
+            content_type = file_ext.replace('.', '') # pdf, pptx 등
+            try:
+                handle = document_store.put(uploaded_file, uploaded_file.name, content_type)
+            except OSError as e:
+                st.error(f"파일을 저장하지 못했습니다: {e}")
+            else:
+                st.session_state['uploaded_content'] = handle
+                st.session_state['content_type'] = content_type
+                workspace.add(handle, content_type, name=uploaded_file.name)
+                st.success(f"'{uploaded_file.name}' 파일이 성공적으로 업로드되었습니다!")
 
 # --- Tab 2: 유튜브 링크 ---
 with tab2:
@@ -73,6 +90,7 @@ with tab2:
         if st.button("유튜브 링크 확정", key="btn_youtube"):
             st.session_state['uploaded_content'] = youtube_url
             st.session_state['content_type'] = 'youtube'
+            workspace.add(youtube_url, 'youtube')
             st.success("유튜브 링크가 저장되었습니다! 분석 준비 완료.")
 
 # --- Tab 3: 텍스트 직접 입력 ---
@@ -83,8 +101,27 @@ with tab3:
         if st.button("텍스트 저장", key="btn_text"):
             st.session_state['uploaded_content'] = raw_text
             st.session_state['content_type'] = 'text'
+            workspace.add(raw_text, 'text')
             st.success("텍스트가 저장되었습니다.")
 
-# --- 4. 다음 단계로 넘어가기 안내 ---
+# --- 4. 내 자료 목록 (워크스페이스) ---
+if len(workspace):
+    st.subheader(f"📚 내 자료 ({len(workspace)}개)")
+    st.caption("챗봇과 퀴즈는 여기 있는 자료 전체를 함께 사용합니다. 새로 올린 자료만 추가로 처리합니다.")
+    for doc in workspace:
+        col_name, col_type, col_remove = st.columns([6, 1, 1])
+        col_name.write(doc.name if len(doc.name) <= 80 else doc.name[:80] + "…")
+        col_type.write(f"`{doc.content_type}`")
+        if col_remove.button("삭제", key=f"remove_{doc.doc_id}"):
+            workspace.remove(doc.doc_id)
+            # 방금 지운 자료가 '현재 자료'였다면 남은 자료 중 마지막 것으로 바꾼다.
+            if st.session_state['uploaded_content'] is not None and \
+                    doc.content == st.session_state['uploaded_content']:
+                remaining = list(workspace)
+                st.session_state['uploaded_content'] = remaining[-1].content if remaining else None
+                st.session_state['content_type'] = remaining[-1].content_type if remaining else None
+            st.rerun()
+
+# --- 5. 다음 단계로 넘어가기 안내 ---
 if st.session_state['uploaded_content'] and st.session_state['user_api_key']:
     st.info("모든 준비가 완료되었습니다! 왼쪽 메뉴에서 '강의노트 생성' 또는 '퀴즈 풀기' 페이지로 이동하세요.")
\ No newline at end of file
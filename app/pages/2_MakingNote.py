@@ -1,45 +1,32 @@
 import streamlit as st
 import sys
 import os
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils import get_youtube_transcript
+from metrics import increment
+
+increment("page_runs_total", page="note")
 
 st.title("2. 강의노트 만들기")
 st.write("업로드한 자료를 요약해서 강의노트를 생성하는 페이지입니다.")
 
 # -------------------------------------------------
-# 0. httpx.Client 패치 (proxies 인자 무시용)
-#    이전에 생기던 "unexpected keyword argument 'proxies'" 방지
-# -------------------------------------------------
-try:
-    import httpx as _httpx
-
-    _OriginalClient = _httpx.Client
-
-    class _PatchedClient(_OriginalClient):
-        def __init__(self, *args, **kwargs):
-            # openai 내부에서 넘기는 proxies 인자를 무시
-            kwargs.pop("proxies", None)
-            super().__init__(*args, **kwargs)
-
-    _httpx.Client = _PatchedClient
-
-except Exception:
-    # httpx가 없거나, 다른 이유로 실패해도 앱은 계속 동작하게 둔다.
-    pass
-
-# -------------------------------------------------
-# 1. OpenAI 임포트
+# 1. 모듈 임포트
+#    클라이언트는 llm.get_openai_client()가 API Key별로 하나씩만 만들어
+#    연결(keep-alive)을 재사용한다. (httpx 전역 패치 없음)
+#    자료 → 강의노트 생성 로직은 notes.py에 있다. (CLI pipeline.py와 공유)
 # -------------------------------------------------
 try:
-    from openai import OpenAI
-except ImportError:
+    from llm import describe_error
+    from notes import DEFAULT_CONCURRENCY, generate_lecture_notes
+    from jobs import CANCELLED, FAILED, job_manager, run_stream
+    from workspace import session_workspace
+except ImportError as e:
+    # openai 등 무거운 의존성은 쓰는 순간에 불러오므로 어느 패키지가 빠졌는지는 오류 메시지로 보여준다.
     st.error(
-        "⚠️ openai 패키지가 설치되어 있지 않습니다.\n\n"
-        "requirements.txt 에 아래 항목이 있는지 확인하세요.\n\n"
-        "    streamlit\n"
-        "    openai\n"
-        "    httpx\n"
+        f"⚠️ 필요한 패키지를 불러오지 못했습니다: {e}\n\n"
+        "requirements.txt 의 패키지가 모두 설치되어 있는지 확인하세요.\n\n"
+        "    pip install -r requirements.txt\n"
     )
     st.stop()
 
@@ -60,97 +47,22 @@ if not api_key or uploaded_content is None or content_type is None:
     )
     st.stop()
 
-# -------------------------------------------------
-# 3. 업로드 타입에 따라 user 메시지 생성
-# -------------------------------------------------
-def build_user_input(uploaded_content, content_type: str) -> str:
-    """
-    1번 페이지에서 저장한 uploaded_content와 content_type을 받아
-    모델에 넘길 user 메시지 텍스트를 만들어준다.
-    """
-
-    # (1) 텍스트 직접 입력
-    if content_type == "text":
-        return (
-            "다음 텍스트는 한 편의 강의 내용을 옮겨 적은 것이다.\n"
-            "이 텍스트 전체를 기반으로 강의노트를 작성해줘.\n\n"
-            f"{uploaded_content}"
-        )
-
-    # (2) 유튜브 링크
-    if content_type == "youtube":
-        # 1. utils.py에서 만든 함수로 자막(script)을 뽑아옵니다.
-        script, error_msg = get_youtube_transcript(uploaded_content)
-        
-        # 2. 만약 자막을 못 가져왔다면 에러 메시지를 반환합니다.
-        if error_msg:
-            return f"시스템 알림: 유튜브 자막을 가져오는 데 실패했습니다. ({error_msg})"
-            
-        # 3. 자막을 성공적으로 가져왔다면, AI에게 자막 내용을 던져줍니다.
-        return (
-            "다음은 사용자가 제공한 유튜브 영상의 '자막 스크립트'이다.\n"
-            "영상 화면은 볼 수 없으니, 오직 아래 텍스트 내용을 바탕으로 강의노트를 작성해라.\n"
-            "내용을 빠짐없이 분석해서 개요, 핵심 개념, 예시 등을 정리해줘.\n\n"
-            f"--- [강의 자막 시작] ---\n{script}\n--- [강의 자막 끝] ---"
-        )
-
-    # (3) 파일(PDF/PPT/영상 등)
-    file_name = getattr(uploaded_content, "name", "알 수 없는 파일명")
-    return (
-        "사용자가 대학 강의자료 파일을 업로드했다.\n"
-        "현재 앱에서는 파일의 원문 텍스트를 직접 읽어오지는 못하지만,\n"
-        "일반적인 대학 강의 슬라이드/자료라고 가정하고 강의노트를 작성해줘.\n\n"
-        f"파일 이름: {file_name}\n"
-        f"파일 타입(확장자): {content_type}\n\n"
-        "※ 실제 슬라이드 내용을 모르는 상태이므로, 과도하게 구체적인 예시는 피하고,\n"
-        "대학생 대상의 일반적인 강의 구조(개요-핵심 개념-예시/응용-체크리스트)에 맞게 작성해줘."
-    )
-
-# -------------------------------------------------
-# 4. OpenAI Chat Completions API로 강의노트 생성
-#    (responses.create 대신 chat.completions.create 사용)
-# -------------------------------------------------
-def generate_lecture_notes(api_key: str, uploaded_content, content_type: str) -> str:
-    """
-    OpenAI Chat Completions API를 이용해서 강의노트를 생성한다.
-    """
-    client = OpenAI(api_key=api_key)
-
-    system_prompt = (
-        "너는 대학 강의를 정리해 주는 조교야.\n"
-        "사용자가 업로드한 강의자료(텍스트, 유튜브 링크, PDF/PPT 등)를 기반으로 "
-        "다음 형식의 강의노트를 만들어줘.\n\n"
-        "1. 강의 개요\n"
-        "   - 이 강의의 주제 한 줄 요약\n"
-        "   - 강의에서 다루는 핵심 질문/목표\n\n"
-        "2. 핵심 개념 정리\n"
-        "   - 개념 1: 정의 + 중요 포인트\n"
-        "   - 개념 2: 정의 + 중요 포인트\n"
-        "   - … (필요한 만큼)\n\n"
-        "3. 예시 및 응용\n"
-        "   - 강의에서 나올 법한 대표 예시나 사례 정리\n"
-        "   - 학생이 실무/현실에서 어떻게 써먹을 수 있는지\n\n"
-        "4. 강의 체크리스트\n"
-        "   - 복습할 때 스스로 물어볼 만한 질문 3~5개\n\n"
-        "문장은 한국어로, 너무 장황하지 않게 A4 1~2장 분량 느낌으로 정리해줘."
+# 자료를 여러 개 올렸으면 노트를 만들 자료를 고른다. (노트는 자료 하나 = 강의 하나 기준)
+workspace = session_workspace(st.session_state)
+if len(workspace) > 1:
+    documents = list(workspace)
+    current = next(
+        (i for i, doc in enumerate(documents) if doc.content == uploaded_content),
+        len(documents) - 1,
     )
-
-    user_input = build_user_input(uploaded_content, content_type)
-
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",  # 모델은 필요하면 gpt-4o 등으로 변경 가능
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_input},
-        ],
-        temperature=0.3,
+    chosen = st.selectbox(
+        "노트를 만들 자료", documents, index=current,
+        format_func=lambda doc: f"{doc.name} ({doc.content_type})",
     )
-
-    # chat.completions의 기본 출력 형식
-    return completion.choices[0].message.content
+    uploaded_content, content_type = chosen.content, chosen.content_type
 
 # -------------------------------------------------
-# 5. UI 안내 + 버튼
+# 3. UI 안내 + 버튼
 # -------------------------------------------------
 if content_type != "text":
     st.info(
@@ -162,16 +74,83 @@ if content_type != "text":
     )
 
 st.write("버튼을 누르면 1번 페이지에서 업로드한 자료를 기반으로 강의노트를 자동으로 생성합니다.")
+use_streaming = st.toggle("실시간 출력 (스트리밍)", value=True, help="생성되는 내용을 바로바로 보여줍니다.")
+with st.expander("고급 설정"):
+    max_workers = st.slider(
+        "긴 자료 동시 요약 수",
+        min_value=1, max_value=8, value=DEFAULT_CONCURRENCY,
+        help="긴 자료는 구간별로 나눠 동시에 요약한 뒤 합칩니다. 값이 클수록 빠르지만 API 요청이 몰립니다.",
+    )
+    use_cache = st.checkbox(
+        "같은 자료·설정이면 이전 결과 재사용",
+        value=True,
+        help="끄면 매번 새로 생성합니다. (시간과 비용이 더 듭니다)",
+    )
+
+# -------------------------------------------------
+# 4. 백그라운드 작업으로 생성
+#    생성은 작업 큐에서 돌고 세션에는 작업 id만 저장하므로,
+#    생성 도중 다른 위젯을 건드려도 작업이 끊기지 않는다.
+# -------------------------------------------------
+JOB_POLL_INTERVAL = 0.5
+
+
+def run_note_job(job, api_key, uploaded_content, content_type, max_workers, use_cache):
+    chunks = generate_lecture_notes(
+        api_key, uploaded_content, content_type, stream=True,
+        max_workers=max_workers, use_cache=use_cache,
+        on_segment=lambda n: job.meta.__setitem__("transcribed_segments", n),
+        on_plan=lambda plan: job.meta.__setitem__("note_plan", plan),
+    )
+    return run_stream(job, chunks)
+
 
 if st.button("📚 강의노트 생성하기"):
-    try:
-        with st.spinner("강의노트를 생성하는 중입니다..."):
-            notes = generate_lecture_notes(api_key, uploaded_content, content_type)
-    except Exception as e:
-        st.error(f"강의노트 생성 중 오류가 발생했습니다:\n\n{e}")
-    else:
-        st.subheader("✅ 생성된 강의노트")
-        st.text_area("강의노트", value=notes, height=400)
+    # 이전 작업이 아직 돌고 있으면 취소하고 새로 시작
+    if st.session_state.get("note_job_id"):
+        job_manager.cancel(st.session_state["note_job_id"])
+    st.session_state["note_job_id"] = job_manager.submit(
+        "note", api_key, run_note_job,
+        api_key, uploaded_content, content_type, max_workers, use_cache,
+    )
 
-        st.session_state["lecture_notes"] = notes
+note_job = job_manager.get(st.session_state.get("note_job_id") or "")
+
+if note_job is not None and not note_job.finished:
+    st.subheader("✍️ 강의노트 작성 중...")
+    if st.button("⏹ 생성 취소"):
+        note_job.cancel()
+    partial = note_job.text
+    if use_streaming and partial:
+        st.markdown(partial)
+    elif note_job.meta.get("transcribed_segments"):
+        st.info(
+            f"영상 음성 인식 {note_job.meta['transcribed_segments']}구간 완료, "
+            f"인식된 부분부터 요약하는 중입니다... ({note_job.elapsed:.0f}초)"
+        )
+    else:
+        st.info(f"강의노트를 생성하는 중입니다... ({note_job.elapsed:.0f}초)")
+    # 작업이 끝날 때까지 주기적으로 다시 그린다.
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
+
+if note_job is not None:
+    st.session_state.pop("note_job_id", None)
+    if note_job.status == FAILED:
+        st.error(f"강의노트 생성 중 오류가 발생했습니다:\n\n{describe_error(note_job.error)}")
+    elif note_job.status == CANCELLED:
+        st.warning("강의노트 생성을 취소했습니다.")
+    else:
+        st.session_state["lecture_notes"] = note_job.result
         st.success("강의노트가 생성되어 세션에 저장되었습니다!")
+        plan = note_job.meta.get("note_plan")
+        if plan and plan["reused"]:
+            # 같은 API key로 같은 이름을 올린 이전 버전이 있으면 바뀐 구간만 다시 요약한다. (notes.generate_notes_incremental)
+            st.caption(
+                f"♻️ 이전 버전과 비교해서 바뀐 구간 {plan['summarized']}/{plan['sections']}개"
+                f"(페이지 {plan['changed_pages']}/{plan['pages']}장)만 다시 요약했습니다."
+            )
+
+if st.session_state.get("lecture_notes"):
+    st.subheader("✅ 생성된 강의노트")
+    st.text_area("강의노트", value=st.session_state["lecture_notes"], height=400)
@@ -1,9 +1,30 @@
 import streamlit as st
-from openai import OpenAI
-import fitz  # PyMuPDF
 import tempfile
+import time
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from llm import DEFAULT_MODEL, describe_error, get_openai_client, stream_chat_completion
+from workspace import run_transcription_job, session_workspace
+from answers import answer_key, lookup_answer, store_answer
+from retrieval import EMBEDDING_MODEL, embed_texts
+from memory import ConversationMemory
+from jobs import CANCELLED, DONE, FAILED, job_manager, run_stream
+from metrics import increment, span
+from ratelimit import INTERACTIVE
+from prompting import (
+    CHAT_CONTEXT_TOKENS,
+    CHAT_PROMPT_TOKENS,
+    build_chat_messages,
+    count_tokens,
+    format_usage,
+    pack_chunks,
+    pack_text,
+)
 
 st.set_page_config(page_title="Chat - 요약해줘", layout="wide")
+increment("page_runs_total", page="chat")
 
 # --- Session state 기본값 보장 ---
 st.session_state.setdefault("user_api_key", "")
@@ -28,76 +49,139 @@ if not api_key:
     st.error("🚨 API Key가 없습니다. 1_FileUpload 페이지에서 OpenAI API Key를 입력해주세요.")
     st.stop()
 
-client = OpenAI(api_key=api_key)
+# API Key별로 공유되는 클라이언트 (재실행마다 새 연결을 만들지 않음)
+client = get_openai_client(api_key)
 
 
 # ------------------------
-# 업로드 파일 확인 (API Key 통과 후)
+# 자료 확인 (API Key 통과 후)
+#  워크스페이스에 올린 자료 전체를 함께 사용한다.
 # ------------------------
-uploaded_content = st.session_state.get("uploaded_content", None)
-content_type = st.session_state.get("content_type", None)
+workspace = session_workspace(st.session_state)
 
-if uploaded_content is None or content_type is None:
+if not len(workspace):
     st.warning("⚠ 아직 학습 자료가 업로드되지 않았습니다. 1_FileUpload에서 파일 또는 링크를 등록하세요.")
     st.stop()
 
-
 # ------------------------
-# 자료 → 텍스트 변환 함수
+# 영상 음성 인식 (백그라운드 작업)
+#  아직 인식되지 않은 영상이 있으면 페이지에서 기다리지 않고 작업으로 돌려서 진행 상황을 보여준다.
+#  같은 영상을 노트 페이지가 인식 중이면 그 인식을 함께 기다린다. (transcribe.py)
+#  실패/취소한 영상은 이 세션에서 다시 시도하기 전까지 빼고 진행한다.
 # ------------------------
-def extract_text_from_pdf(file_bytes):
-    text = ""
-    try:
-        with fitz.open(stream=file_bytes, filetype="pdf") as pdf:
-            for page_num, page in enumerate(pdf):
-                text += f"--- Page {page_num + 1} ---\n"
-                text += page.get_text()
-                text += "\n"
-    except Exception as e:
-        text = f"[PDF 추출 오류] {str(e)}"
-    return text
+TRANSCRIBE_POLL_INTERVAL = 1.0
+
+transcription_errors = st.session_state.setdefault("transcription_errors", {})
+pending_videos = [doc for doc in workspace.pending_transcriptions()
+                  if doc.doc_id not in transcription_errors]
+transcribe_job = job_manager.get(st.session_state.get("transcribe_job_id") or "")
+if pending_videos and transcribe_job is None:
+    st.session_state["transcribe_job_id"] = job_manager.submit(
+        "transcribe", api_key, run_transcription_job, pending_videos
+    )
+    transcribe_job = job_manager.get(st.session_state["transcribe_job_id"])
+
+if transcribe_job is not None and not transcribe_job.finished:
+    progress = transcribe_job.meta.get("transcribing")
+    if progress and progress["total"]:
+        st.progress(
+            progress["done"] / progress["total"],
+            text=f"🎙 '{progress['name']}' 음성 인식 중... ({progress['index']}/{progress['count']}번째 영상, "
+                 f"{progress['done']}/{progress['total']}구간, {transcribe_job.elapsed:.0f}초)",
+        )
+    else:
+        st.info(f"🎙 영상 음성 인식을 준비하는 중입니다... ({transcribe_job.elapsed:.0f}초)")
+    if st.button("⏹ 음성 인식 취소"):
+        job_manager.cancel(transcribe_job.id)
+    time.sleep(TRANSCRIBE_POLL_INTERVAL)
+    st.rerun()
 
+if transcribe_job is not None:
+    st.session_state.pop("transcribe_job_id", None)
+    for doc, error in transcribe_job.result or []:
+        transcription_errors[doc.doc_id] = error
+    # 취소/실패로 인식을 끝내지 못한 영상은 빼고 진행한다.
+    if transcribe_job.status == CANCELLED:
+        unfinished = "음성 인식을 취소했습니다."
+    elif transcribe_job.status == FAILED:
+        unfinished = f"음성 인식을 끝내지 못했습니다. ({describe_error(transcribe_job.error)})"
+    else:
+        unfinished = "음성 인식 결과를 찾지 못했습니다."
+    for doc in pending_videos:
+        if doc.doc_id in transcribe_job.meta.get("doc_ids", ()):
+            transcription_errors.setdefault(doc.doc_id, unfinished)
+    # 작업 도중 새로 추가된 영상이 있으면 다음 실행에서 이어서 인식한다.
+    st.rerun()
 
-def extract_material_text(uploaded_content, content_type: str) -> str:
+if transcription_errors and st.button("🎙 영상 음성 인식 다시 시도"):
+    transcription_errors.clear()
+    st.rerun()
 
-    if content_type == "text":
-        return uploaded_content
-    
-    elif content_type == "youtube":
-        return f"""
-📌 유튜브 링크: {uploaded_content}
+# 자료별 텍스트 (PDF/PPTX 파싱과 유튜브 자막은 utils의 공용 캐시를 거치므로
+# 재실행 때마다, 또 자료를 새로 추가할 때마다 이전 자료를 다시 처리하지 않는다)
+loaded_documents, document_errors = workspace.load_texts()
 
-⚠ 영상 내용은 직접 접근할 수 없으므로 일반적인 유튜브 강의 형식을 기반으로 답변합니다.
-"""
-    
-    elif content_type == "pdf":
-        try:
-            pdf_text = extract_text_from_pdf(uploaded_content.getvalue())
-            return pdf_text[:8000]  # 토큰 제한 고려
-        except Exception as e:
-            return f"PDF 추출 실패: {str(e)}"
-    
-    elif content_type in ("ppt", "pptx"):
-        return "⚠ PPT 파일 자동 텍스트 추출은 아직 지원되지 않습니다. 슬라이드 내용을 기반으로 응답하겠습니다."
-    
-    elif content_type in ("mp4", "mov", "avi"):
-        return "⚠ 영상 파일은 자동 분석이 불가능합니다. 영상 내용을 질문해주시면 일반적 내용을 바탕으로 답변합니다."
+if loaded_documents:
+    # 전체 텍스트를 돌려주고, 프롬프트에는 검색된 청크만 넣는다.
+    material_text = workspace.combine(loaded_documents) if len(loaded_documents) > 1 else loaded_documents[0][1]
+else:
+    material_text = "⚠ 자동으로 읽을 수 있는 자료가 없습니다. 질문해주시면 일반적인 내용을 바탕으로 답변합니다."
 
-    return "알 수 없는 자료 형식입니다."
+
+# ------------------------
+# 검색 인덱스 (문서당 한 번만 임베딩)
+# ------------------------
+RETRIEVAL_TOP_K = 4
+RETRIEVAL_CHUNK_SIZE = 1000
+CHAT_MAX_TOKENS = 1500
+
+
+def get_material_index(material_text: str):
+    """
+    자료가 자료 예산(토큰) 안에 들어가면 None(전체 사용), 길면 임베딩 인덱스를 반환.
+    여러 자료는 자료별 인덱스를 이어 붙이고, 새로 추가된 자료만 임베딩한다.
+    """
+    if not loaded_documents or count_tokens(material_text, DEFAULT_MODEL) <= CHAT_CONTEXT_TOKENS:
+        return None
+    try:
+        return workspace.build_index(client, loaded_documents, chunk_size=RETRIEVAL_CHUNK_SIZE)
+    except Exception as e:
+        st.warning(f"자료 검색 인덱스를 만들지 못해 앞부분만 사용합니다. ({e})")
+        return None
+
+
+def select_context(query: str, query_vector=None) -> str:
+    """질문과 관련된 자료 부분만 자료 예산(토큰) 안에서 골라 반환"""
+    if material_index is None:
+        return pack_text(material_text, CHAT_CONTEXT_TOKENS, DEFAULT_MODEL)
+    try:
+        chunks = material_index.retrieve(client, query, k=RETRIEVAL_TOP_K, query_vector=query_vector)
+    except Exception:
+        # 임베딩을 쓸 수 없으면 예전처럼 앞부분만 사용
+        return pack_text(material_text, CHAT_CONTEXT_TOKENS, DEFAULT_MODEL)
+    return pack_chunks(chunks, CHAT_CONTEXT_TOKENS, DEFAULT_MODEL)
 
 
-material_text = extract_material_text(uploaded_content, content_type)
+material_index = get_material_index(material_text)
 
-st.info(f"📚 현재 자료 유형: **{content_type}**")
+st.info(f"📚 현재 자료 {len(workspace)}개: " + ", ".join(f"**{doc.name}**" for doc in workspace))
+for doc, error in document_errors:
+    st.caption(f"⚠ '{doc.name}'은(는) 답변에 사용하지 못합니다. ({error})")
 
 
 # ------------------------
 # 초기화 버튼
 # ------------------------
 if st.button("대화 초기화"):
+    job_manager.cancel(st.session_state.pop("chat_job_id", None) or "")
     st.session_state.pop("messages", None)
+    st.session_state.pop("chat_memory", None)
     st.rerun()
 
+use_streaming = st.toggle("실시간 출력 (스트리밍)", value=True)
+use_cache = st.checkbox("같은 질문이면 이전 답변 재사용", value=True,
+                        help="같은 자료에 대해 누군가 비슷하게 물어본 첫 질문이면 그때 답변을 바로 보여줍니다.")
+
 st.divider()
 
 
@@ -107,6 +191,10 @@ st.divider()
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# 오래된 대화를 요약으로 접어 두는 메모리 (프롬프트 크기를 일정하게 유지)
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = ConversationMemory()
+
 
 # 이전 메시지 출력
 for msg in st.session_state.messages:
@@ -116,24 +204,18 @@ for msg in st.session_state.messages:
 
 
 # ------------------------
-# 질문 처리
+# 질문 처리 (백그라운드 작업)
+#  답변 생성은 작업 큐에서 돌고, 세션에는 작업 id만 저장한다.
+#  생성 도중 다른 위젯을 건드려 재실행돼도 답변이 끊기지 않는다.
 # ------------------------
-query = st.chat_input("질문을 입력하세요.")
-
-if query:
-    with st.chat_message("user"):
-        st.markdown(query)
-
-    st.session_state.messages.append({"role": "user", "content": query})
-
-    with st.spinner("답변 생성 중..."):
+JOB_POLL_INTERVAL = 0.3
 
-        system_prompt = f"""
+SYSTEM_PROMPT_TEMPLATE = """
 너는 사용자가 업로드한 강의 자료 기반으로 학습을 돕는 AI 튜터이다.
 
-자료 내용:
+자료 내용 (질문과 관련된 부분):
 ---
-{material_text}
+{context_text}
 ---
 
 규칙:
@@ -141,21 +223,106 @@ if query:
 2. 없을 경우 일반 지식으로 보완
 3. 한국어로 답변
 4. 명확 · 친절 · 짧게
+5. 자료에 [mm:ss] 같은 영상 시간 표시가 있으면, 근거가 된 부분의 시간을 답변에 함께 적기
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                *st.session_state.messages,
-            ],
-            max_tokens=1500,
-            temperature=0.7
-        )
 
-        answer = response.choices[0].message.content
+def run_chat_job(job, query, history, use_cache, answer_cache_key=None):
+    """
+    (백그라운드 작업) 관련 자료를 찾고 답변을 스트리밍으로 받는다.
+    answer_cache_key가 있으면 먼저 의미 기반 답변 캐시(answers.py)에서 비슷한 질문의 답변을 찾는다.
+    """
+    query_vector = None
+    if answer_cache_key:
+        try:
+            with span("answer_cache_lookup"):
+                query_vector = embed_texts(client, [query], model=EMBEDDING_MODEL, priority=INTERACTIVE)[0]
+                score, cached = lookup_answer(answer_cache_key, query_vector)
+        except Exception:
+            # 임베딩을 쓸 수 없으면 캐시 없이 답변한다.
+            cached = None
+        if cached is not None:
+            job.meta["answer_cache"] = {"question": cached.question, "score": score}
+            return run_stream(job, iter([cached.answer]))
+
+    # 캐시 조회 때 만든 질문 벡터는 자료 검색에도 그대로 쓴다.
+    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(context_text=select_context(query, query_vector))
+
+    # 응답 몫(max_tokens)을 남겨 두고, 대화 기록은 오래된 것부터 잘라 예산에 맞춘다.
+    messages, usage = build_chat_messages(
+        system_prompt,
+        history,
+        DEFAULT_MODEL,
+        max_tokens=CHAT_MAX_TOKENS,
+        prompt_budget=CHAT_PROMPT_TOKENS,
+    )
+    job.meta["usage"] = usage
+
+    request = dict(
+        model=DEFAULT_MODEL,
+        messages=messages,
+        max_tokens=CHAT_MAX_TOKENS,
+        temperature=0.7
+    )
+    # 챗봇 답변은 사용자가 기다리는 요청이라, 한도에 걸리면 노트/퀴즈 일괄 작업보다 먼저 보낸다.
+    start = time.perf_counter()
+    answer = run_stream(job, stream_chat_completion(client, use_cache=use_cache, priority=INTERACTIVE, **request))
+    if query_vector is not None and answer and not job.cancelled:
+        store_answer(answer_cache_key, query, query_vector, answer, time.perf_counter() - start)
+    return answer
+
+
+chat_job = job_manager.get(st.session_state.get("chat_job_id") or "")
+query = st.chat_input("질문을 입력하세요.", disabled=chat_job is not None and not chat_job.finished)
+
+if query:
+    with st.chat_message("user"):
+        st.markdown(query)
 
-        with st.chat_message("assistant"):
-            st.markdown(answer)
+    st.session_state.messages.append({"role": "user", "content": query})
+    history = st.session_state.chat_memory.history(st.session_state.messages)
+
+    # 의미 기반 답변 캐시는 대화의 첫 질문에만 쓴다. (후속 질문은 앞 대화에 따라 답이 달라진다)
+    answer_cache_key = None
+    if use_cache and loaded_documents and len(st.session_state.messages) == 1:
+        answer_cache_key = answer_key([doc.doc_id for doc, _ in loaded_documents], DEFAULT_MODEL,
+                                      SYSTEM_PROMPT_TEMPLATE, EMBEDDING_MODEL)
+
+    st.session_state["chat_job_id"] = job_manager.submit(
+        "chat", api_key, run_chat_job, query, history, use_cache, answer_cache_key
+    )
+    chat_job = job_manager.get(st.session_state["chat_job_id"])
+
+if chat_job is not None and not chat_job.finished:
+    with st.chat_message("assistant"):
+        partial = chat_job.text
+        if use_streaming and partial:
+            # 토큰이 도착하는 대로 말풍선에 이어서 표시
+            st.markdown(partial + "▌")
+        else:
+            st.markdown("답변 생성 중...")
+    if st.button("⏹ 답변 중단"):
+        chat_job.cancel()
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
 
-        st.session_state.messages.append({"role": "assistant", "content": answer})
+if chat_job is not None:
+    st.session_state.pop("chat_job_id", None)
+    if chat_job.status == FAILED:
+        st.error(f"답변 생성 중 오류가 발생했습니다: {describe_error(chat_job.error)}")
+    else:
+        # 취소된 경우에도 그때까지 받은 부분 답변은 남긴다.
+        answer = chat_job.result if chat_job.status == DONE else chat_job.text
+        if answer:
+            with st.chat_message("assistant"):
+                st.markdown(answer)
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+        if chat_job.meta.get("answer_cache"):
+            cached = chat_job.meta["answer_cache"]
+            st.caption(f"♻️ 비슷한 질문(“{cached['question']}”)의 이전 답변을 재사용했습니다. "
+                       f"(유사도 {cached['score']:.2f})")
+        elif chat_job.meta.get("usage"):
+            st.caption(f"🔢 {format_usage(chat_job.meta['usage'])}")
+
+        # 답변을 보여준 뒤, 오래된 대화가 쌓였으면 백그라운드에서 요약해 둔다.
+        st.session_state.chat_memory.schedule_compaction(client, st.session_state.messages)
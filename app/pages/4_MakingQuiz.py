@@ -1,22 +1,44 @@
 import streamlit as st
-from openai import OpenAI
+import logging
 import tempfile
-import traceback
-import fitz  # PyMuPDF
+import time
 import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils import get_youtube_transcript
+from llm import DEFAULT_MODEL, describe_error, get_openai_client, stream_chat_completion
+from quiz import (
+    BATCH_CONCURRENCY,
+    DIFFICULTIES,
+    QUIZ_TYPES,
+    build_quiz_prompt,
+    build_structured_request,
+    complete_quiz_check,
+    export_question_bank,
+    format_question,
+    generate_quiz_batch,
+    generate_structured_quiz,
+    items_from_blocks,
+    pack_quiz_material,
+    parse_quiz,
+    parse_quiz_json,
+)
+from jobs import CANCELLED, FAILED, job_manager, run_stream
+from metrics import increment
+from prompting import QUIZ_MATERIAL_TOKENS, count_tokens, format_usage, request_usage
+from workspace import run_transcription_job, session_workspace
 
 # 페이지 설정
 st.set_page_config(page_title="퀴즈 생성 - 요약해줘", layout="wide")
+increment("page_runs_total", page="quiz")
+logger = logging.getLogger("pages.quiz")
 
 # --- Session state 기본값 보장 ---
 st.session_state.setdefault("user_api_key", "")
 st.session_state.setdefault("uploaded_content", None)
 st.session_state.setdefault("content_type", None)
 st.session_state.setdefault("generated_quiz", None)
+st.session_state.setdefault("quiz_bank", None)
 
 st.title("📝 AI 기반 연습 문제 생성")
 st.markdown("업로드된 강의자료를 바탕으로 AI가 연습 문제를 생성합니다.")
@@ -26,87 +48,119 @@ if not st.session_state["user_api_key"]:
     st.warning("⚠️ 먼저 왼쪽 설정에서 OpenAI API Key를 입력해주세요!")
     st.stop()
 
-if st.session_state["uploaded_content"] is None:
+workspace = session_workspace(st.session_state)
+if not len(workspace):
     st.warning("📂 먼저 '강의 자료 업로드' 페이지에서 자료를 업로드해주세요!")
     st.stop()
 
-content_type = st.session_state["content_type"]
-st.info(f"업로드된 자료 유형: **{content_type}**")
-
 
 # -------------------------------
-# PDF 텍스트 추출 함수
+# 사용할 자료 선택 (워크스페이스의 여러 자료를 함께 사용 가능)
 # -------------------------------
-def extract_text_from_pdf(file_bytes):
-    text = ""
-    with fitz.open(stream=file_bytes, filetype="pdf") as pdf:
-        for page in pdf:
-            text += page.get_text()
-    return text
-
+documents = list(workspace)
+selected_ids = st.multiselect(
+    "퀴즈에 사용할 자료",
+    options=[doc.doc_id for doc in documents],
+    default=[doc.doc_id for doc in documents],
+    format_func=lambda doc_id: f"{workspace.get(doc_id).name} ({workspace.get(doc_id).content_type})",
+)
 
 # -------------------------------
-# 업로드 자료 텍스트 추출 (이제 (text, error) 반환)
+# 영상 음성 인식 (백그라운드 작업)
+#  아직 인식되지 않은 영상이 있으면 페이지에서 기다리지 않고 작업으로 돌려서 진행 상황을 보여준다.
+#  같은 영상을 노트 페이지가 인식 중이면 그 인식을 함께 기다린다. (transcribe.py)
+#  실패/취소한 영상은 이 세션에서 다시 시도하기 전까지 빼고 진행한다.
 # -------------------------------
-def extract_text_from_uploaded():
-    """
-    반환: (text_or_None, error_message_or_None)
-    text_or_None: 실제 사용할 텍스트 (문제 생성에 쓸 수 있음)
-    error_message_or_None: 문제가 있으면 문자열 반환 (예: "자막 없음")
-    """
-    data = st.session_state["uploaded_content"]
-    ctype = st.session_state["content_type"]
-
-    if ctype == "text":
-        if not data or str(data).strip() == "":
-            return None, "저장된 텍스트가 비어 있습니다."
-        return data, None
-
-    if ctype == "youtube":
-        # utils.get_youtube_transcript()는 (script, error) 반환으로 가정
-        script, error_msg = get_youtube_transcript(data)
-        if error_msg:
-            # 상세한 에러 메시지는 UI로 보여주고, 프롬프트에는 절대 포함하지 않음
-            return None, f"유튜브 자막을 가져오지 못했습니다: {error_msg}"
-        if not script or script.strip() == "":
-            return None, "유튜브 자막이 비어있습니다."
-        return script, None
-
-    if ctype == "pdf":
-        try:
-            pdf_bytes = data.getvalue()
-            text = extract_text_from_pdf(pdf_bytes)
-            if not text or text.strip() == "":
-                return None, "PDF에서 텍스트를 추출할 수 없거나 내용이 비어 있습니다."
-            return text, None
-        except Exception as e:
-            return None, f"PDF 텍스트 추출 오류: {e}"
-
-    if ctype in ("ppt", "pptx", "mp4", "mov", "avi"):
-        # 현재는 추출 기능 미구현이므로 사용자에게 안내
-        return None, f"{ctype} 파일은 현재 자동 텍스트 추출이 지원되지 않습니다. 텍스트를 직접 붙여넣거나 PDF로 변환해 업로드해주세요."
-
-    return None, "알 수 없는 자료 형식입니다."
-
-
-# material_text은 실제 텍스트 또는 None, 그리고 error_msg
-material_text, material_error = extract_text_from_uploaded()
-
-# 오류가 있으면 화면에 보여주고 더 이상 진행하지 않음
-if material_error:
-    st.error(f"자료 처리 문제: {material_error}")
+TRANSCRIBE_POLL_INTERVAL = 1.0
+
+transcription_errors = st.session_state.setdefault("transcription_errors", {})
+pending_videos = [doc for doc in workspace.pending_transcriptions(selected_ids)
+                  if doc.doc_id not in transcription_errors]
+transcribe_job = job_manager.get(st.session_state.get("transcribe_job_id") or "")
+if pending_videos and transcribe_job is None:
+    st.session_state["transcribe_job_id"] = job_manager.submit(
+        "transcribe", st.session_state["user_api_key"], run_transcription_job, pending_videos
+    )
+    transcribe_job = job_manager.get(st.session_state["transcribe_job_id"])
+
+if transcribe_job is not None and not transcribe_job.finished:
+    progress = transcribe_job.meta.get("transcribing")
+    if progress and progress["total"]:
+        st.progress(
+            progress["done"] / progress["total"],
+            text=f"🎙 '{progress['name']}' 음성 인식 중... ({progress['index']}/{progress['count']}번째 영상, "
+                 f"{progress['done']}/{progress['total']}구간, {transcribe_job.elapsed:.0f}초)",
+        )
+    else:
+        st.info(f"🎙 영상 음성 인식을 준비하는 중입니다... ({transcribe_job.elapsed:.0f}초)")
+    if st.button("⏹ 음성 인식 취소"):
+        job_manager.cancel(transcribe_job.id)
+    time.sleep(TRANSCRIBE_POLL_INTERVAL)
+    st.rerun()
+
+if transcribe_job is not None:
+    st.session_state.pop("transcribe_job_id", None)
+    for doc, error in transcribe_job.result or []:
+        transcription_errors[doc.doc_id] = error
+    # 취소/실패로 인식을 끝내지 못한 영상은 빼고 진행한다.
+    if transcribe_job.status == CANCELLED:
+        unfinished = "음성 인식을 취소했습니다."
+    elif transcribe_job.status == FAILED:
+        unfinished = f"음성 인식을 끝내지 못했습니다. ({describe_error(transcribe_job.error)})"
+    else:
+        unfinished = "음성 인식 결과를 찾지 못했습니다."
+    for doc in pending_videos:
+        if doc.doc_id in transcribe_job.meta.get("doc_ids", ()):
+            transcription_errors.setdefault(doc.doc_id, unfinished)
+    # 작업 도중 새로 추가된 영상이 있으면 다음 실행에서 이어서 인식한다.
+    st.rerun()
+
+if transcription_errors and st.button("🎙 영상 음성 인식 다시 시도"):
+    transcription_errors.clear()
+    st.rerun()
+
+# 자료별 텍스트 (문서/자막은 공용 캐시에서 가져오므로 이전에 올린 자료를 다시 파싱하지 않음)
+loaded_documents, document_errors = workspace.load_texts(selected_ids)
+for doc, error in document_errors:
+    st.warning(f"'{doc.name}': {error}")
+
+# 읽을 수 있는 자료가 없으면 더 이상 진행하지 않음
+if not loaded_documents:
+    st.error("자료 처리 문제: 퀴즈를 만들 수 있는 자료가 없습니다.")
     st.info("해결 방법 예시:\n• 영상의 자막(한국어/영어)이 있는지 확인\n• PDF의 경우 텍스트가 포함된 파일인지 확인\n• 또는 텍스트를 직접 붙여넣기(업로드 페이지)를 사용")
     st.stop()
 
+material_text = workspace.combine(loaded_documents) if len(loaded_documents) > 1 else loaded_documents[0][1]
+
 
 # -------------------------------
 # 퀴즈 옵션 UI
 # -------------------------------
 st.subheader("🎯 생성할 퀴즈 설정")
-quiz_type = st.selectbox(
-    "문제 유형", ["객관식 5문항", "단답형 5문항", "서술형 3문항", "혼합형 5문항"],
+batch_mode = st.radio(
+    "생성 방식", ["한 세트", "일괄 생성 (문제 은행)"], horizontal=True,
+    help="일괄 생성은 고른 유형 × 난이도 조합을 한 번에 만들어 하나의 문제 은행으로 합칩니다.",
+) != "한 세트"
+if batch_mode:
+    batch_types = st.multiselect("문제 유형", QUIZ_TYPES, default=QUIZ_TYPES)
+    batch_difficulties = st.multiselect("난이도", DIFFICULTIES, default=DIFFICULTIES)
+    batch_workers = st.slider(
+        "동시 요청 수", min_value=1, max_value=12, value=BATCH_CONCURRENCY,
+        help="조합별 요청을 동시에 몇 개까지 보낼지 정합니다. 요청 한도(rate limit)에 걸리면 줄여주세요.",
+    )
+else:
+    quiz_type = st.selectbox("문제 유형", QUIZ_TYPES)
+    difficulty = st.select_slider("난이도", DIFFICULTIES, value="보통")
+use_streaming = st.toggle("실시간 출력 (스트리밍)", value=True, help="문제가 완성되는 대로 하나씩 보여줍니다.")
+use_structured = st.toggle(
+    "구조화 출력 (JSON)", value=True,
+    help="문항을 JSON 형식으로 받아 하나씩 검증합니다. 형식이 어긋난 문항만 다시 요청합니다.",
+)
+use_cache = st.checkbox(
+    "같은 자료·설정이면 이전 결과 재사용",
+    value=True,
+    help="끄면 같은 조건이라도 매번 새로운 문제를 생성합니다.",
 )
-difficulty = st.select_slider("난이도", ["쉬움", "보통", "어려움"], value="보통")
 st.markdown("---")
 st.write("버튼을 누르면 OpenAI Chat Completions API가 호출됩니다. (에러 메시지는 프롬프트에 포함되지 않습니다.)")
 
@@ -114,81 +168,227 @@ st.write("버튼을 누르면 OpenAI Chat Completions API가 호출됩니다. (
 # ==========================================================
 # 퀴즈 생성
 # ==========================================================
-if st.button("🚀 퀴즈 생성하기"):
-    try:
-        # OpenAI 클라이언트는 버튼 클릭 시점에만 생성
-        client = OpenAI(api_key=st.session_state["user_api_key"])
-
-        # 안전한 프롬프트: material_text(실제 콘텐츠)만 포함, 에러 텍스트는 절대 포함하지 않음
-        prompt = f"""
-아래 강의자료를 바탕으로 {quiz_type} 퀴즈를 생성해줘.
-난이도: {difficulty}
-
---- 강의자료 (요약/본문) ---
-{material_text}
-------------------
-
-출력 형식 규칙:
-1. 문제 유형:
-   - 객관식: 문제 + 보기 4개(A,B,C,D) + "//정답: 정답문자"
-   - 단답형: 문제만 작성 후 반드시 별도 줄에 "//정답: 정답" 작성
-   - 서술형: 문제 작성 후 별도 줄에 "//정답: 정답 내용"
-   - 혼합형: 유형 섞어서 5문항
-2. 문제 번호 포함 금지 (문제 앞에 "문제 1:" 같은 텍스트는 빼기)
-3. 문제와 정답은 항상 별도 줄로 구분
-4. 불필요한 안내 문구 금지
-"""
-
-        with st.spinner("AI가 퀴즈를 생성 중입니다..."):
-            # 최신 SDK에서 chat completions 사용 형태에 따라 조정 가능
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=2500,
-            )
+def show_quiz_block(question_count, item):
+    st.write(f"**문제 {question_count}:**")
+    st.write(format_question(item).replace("\n", "  \n"))
+
+    with st.expander("정답 보기", expanded=False):
+        st.success(item.answer)
+        if item.source:
+            st.caption(f"근거: {item.source}")
+
 
-            # 응답 추출
-            quiz_text = response.choices[0].message.content
-            st.session_state["generated_quiz"] = quiz_text
+def show_quiz(items):
+    for question_count, item in enumerate(items, start=1):
+        show_quiz_block(question_count, item)
 
-            st.success("퀴즈 생성 완료!")
-            st.markdown("### 📘 생성된 퀴즈")
 
-            # 문제/정답 분리 + UI 표시
-            lines = quiz_text.split("\n")
-            buffer = []
-            question_count = 1
+def partial_quiz_items(quiz_text, structured, quiz_type=""):
+    """생성 중인 응답에서 지금까지 완성된 문항만 골라낸다."""
+    if structured:
+        return parse_quiz_json(quiz_text, complete=False, quiz_type=quiz_type)[0]
+    return items_from_blocks(parse_quiz(quiz_text, complete=False))
 
-            for line in lines:
-                if "//정답:" in line:
-                    question = "\n".join(buffer).strip()
-                    answer = line.replace("//정답:", "").strip()
 
-                    st.write(f"**문제 {question_count}:**")
-                    st.write(question)
+def run_quiz_job(job, api_key, request, use_cache, quiz_type, difficulty, structured, material):
+    """
+    (백그라운드 작업) 스트리밍으로 받으면서 부분 결과를 job에 쌓고, 끝나면 QuizItem 리스트를 반환.
+    구조화 출력이면 형식이 어긋난 문항만 골라 다시 요청한다.
+    """
+    client = get_openai_client(api_key)
+    job.meta["structured"] = structured  # 부분 결과를 어떤 파서로 읽을지
+    job.meta["quiz_type"] = quiz_type
+    # 구조화 출력은 형식이 온전한 응답만 캐시에 남긴다. (깨진 응답이 재생성 때 다시 나오지 않도록)
+    cache_check = complete_quiz_check(quiz_type) if structured else None
+    text = run_stream(job, stream_chat_completion(client, use_cache=use_cache, cache_check=cache_check, **request))
+    if job.cancelled:
+        return None
+    if not structured:
+        return items_from_blocks(parse_quiz(text), quiz_type, difficulty)
+    items, job.meta["repaired"] = generate_structured_quiz(
+        client, material, quiz_type, difficulty, use_cache=use_cache, text=text,
+    )
+    return items
 
-                    with st.expander("정답 보기", expanded=False):
-                        st.success(answer)
 
-                    buffer = []
-                    question_count += 1
-                else:
-                    buffer.append(line)
+def run_quiz_batch_job(job, api_key, material, combos, max_workers, use_cache, structured):
+    """(백그라운드 작업) 유형 × 난이도 조합을 동시에 생성해서 문제 은행으로 합친다."""
+    client = get_openai_client(api_key)
+    job.meta["total"] = len(combos)
+    job.meta["done"] = 0
+
+    def on_result(quiz_type, difficulty, items):
+        job.meta["done"] += 1
+        job.append(f"{quiz_type} · {difficulty}: {len(items)}문항\n")
+
+    return generate_quiz_batch(
+        client, material, combos,
+        max_workers=max_workers, use_cache=use_cache, structured=structured,
+        on_result=on_result, should_stop=lambda: job.cancelled,
+    )
+
+
+def pack_material():
+    """자료를 토큰 예산 안에 담고, 잘렸으면 안내한다."""
+    quiz_material = pack_quiz_material(loaded_documents)
+    if count_tokens(quiz_material, DEFAULT_MODEL) < count_tokens(material_text, DEFAULT_MODEL):
+        st.caption(
+            f"자료가 길어 {'자료마다 앞부분을 나눠' if len(loaded_documents) > 1 else '앞부분'} "
+            f"약 {QUIZ_MATERIAL_TOKENS:,} 토큰만 사용합니다. "
+            f"(전체 {count_tokens(material_text, DEFAULT_MODEL):,} 토큰)"
+        )
+    return quiz_material
+
+
+def show_question_bank(bank):
+    items = bank["items"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("문항 수", f"{len(items)}개")
+    col2.metric("중복 제거", f"{bank['duplicates']}개",
+                help=f"형식 오류로 다시 요청한 문항 {bank.get('repaired', 0)}개, "
+                     f"내용이 없어 버린 문항 {bank.get('rejected', 0)}개")
+    col3.metric("처리량", f"{bank['questions_per_sec']:.2f} 문항/초", help=f"전체 {bank['elapsed']:.1f}초")
+    if bank["failed"]:
+        st.warning("생성에 실패한 조합: " + ", ".join(f"{t} · {d}" for t, d in bank["failed"]))
+
+    current = None
+    question_count = 0
+    for item in items:
+        group = (item.quiz_type, item.difficulty)
+        if group != current:
+            current = group
+            question_count = 0
+            st.markdown(f"#### {item.quiz_type} · {item.difficulty}")
+        question_count += 1
+        show_quiz_block(question_count, item)
+
+    col1, col2, col3 = st.columns(3)
+    for col, fmt, mime in ((col1, "txt", "text/plain"), (col2, "csv", "text/csv"),
+                           (col3, "json", "application/json")):
+        col.download_button(
+            f"🔽 문제 은행 다운로드 (.{fmt})",
+            export_question_bank(items, fmt),
+            file_name=f"question_bank.{fmt}",
+            mime=mime,
+        )
+
+
+JOB_POLL_INTERVAL = 0.5
+
+if batch_mode and st.button("🚀 문제 은행 만들기"):
+    combos = [(t, d) for t in batch_types for d in batch_difficulties]
+    if not combos:
+        st.warning("문제 유형과 난이도를 하나 이상 골라주세요.")
+    else:
+        # 자료는 한 번만 잘라 두고 모든 조합이 같은 텍스트(같은 프롬프트 앞부분)를 공유한다.
+        quiz_material = pack_material()
+        if st.session_state.get("quiz_job_id"):
+            job_manager.cancel(st.session_state["quiz_job_id"])
+        st.session_state["quiz_job_id"] = job_manager.submit(
+            "quiz-batch", st.session_state["user_api_key"], run_quiz_batch_job,
+            st.session_state["user_api_key"], quiz_material, combos, batch_workers, use_cache,
+            use_structured,
+        )
+
+if not batch_mode and st.button("🚀 퀴즈 생성하기"):
+    try:
+        quiz_material = pack_material()
+
+        if use_structured:
+            request = build_structured_request(quiz_material, quiz_type, difficulty)
+        else:
+            prompt = build_quiz_prompt(quiz_material, quiz_type, difficulty)
+            request = dict(
+                model=DEFAULT_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                max_tokens=2500,
+            )
+        st.session_state["quiz_usage"] = request_usage(
+            "quiz", request["messages"], DEFAULT_MODEL, max_tokens=request["max_tokens"]
+        )
+
+        # 생성은 백그라운드 작업으로: 난이도 등을 바꿔 재실행돼도 끊기지 않는다.
+        if st.session_state.get("quiz_job_id"):
+            job_manager.cancel(st.session_state["quiz_job_id"])
+        st.session_state["quiz_job_id"] = job_manager.submit(
+            "quiz", st.session_state["user_api_key"], run_quiz_job,
+            st.session_state["user_api_key"], request, use_cache, quiz_type, difficulty,
+            use_structured, quiz_material,
+        )
 
     except Exception as exc:
-        st.error("퀴즈 생성 중 오류가 발생했습니다.")
-        st.exception(exc)
-        traceback.print_exc()
+        st.error(f"퀴즈 생성 중 오류가 발생했습니다: {describe_error(exc)}")
+        logger.exception("퀴즈 생성 요청 실패")
+
+quiz_job = job_manager.get(st.session_state.get("quiz_job_id") or "")
+
+if quiz_job is not None and not quiz_job.finished and quiz_job.kind == "quiz-batch":
+    if st.button("⏹ 생성 취소"):
+        quiz_job.cancel()
+    total = quiz_job.meta.get("total") or 1
+    done = quiz_job.meta.get("done", 0)
+    st.progress(done / total, text=f"조합 {done}/{total}개 완료 ({quiz_job.elapsed:.0f}초)")
+    if quiz_job.text:
+        st.text(quiz_job.text)
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
+
+if quiz_job is not None and not quiz_job.finished:
+    st.markdown("### 📘 생성된 퀴즈")
+    if st.button("⏹ 생성 취소"):
+        quiz_job.cancel()
+    if use_streaming:
+        # 완성된('//정답:' 줄 또는 JSON 문항 객체가 닫힌) 문제만 먼저 보여준다.
+        show_quiz(partial_quiz_items(quiz_job.text, quiz_job.meta.get("structured"),
+                                     quiz_job.meta.get("quiz_type", "")))
+    st.info(f"AI가 퀴즈를 생성 중입니다... ({quiz_job.elapsed:.0f}초)")
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
+
+if quiz_job is not None:
+    st.session_state.pop("quiz_job_id", None)
+    if quiz_job.status == FAILED:
+        # 서버 로그(traceback)는 jobs.JobManager가 남긴다.
+        st.error(f"퀴즈 생성 중 오류가 발생했습니다: {describe_error(quiz_job.error)}")
+    elif quiz_job.status == CANCELLED:
+        st.warning("퀴즈 생성을 취소했습니다.")
+    elif quiz_job.kind == "quiz-batch":
+        st.session_state["quiz_bank"] = quiz_job.result
+        st.success("문제 은행 생성 완료!")
+    else:
+        st.session_state["generated_quiz"] = quiz_job.result
+        st.success("퀴즈 생성 완료!")
+        if quiz_job.meta.get("repaired"):
+            st.caption(f"형식이 어긋난 문항 {quiz_job.meta['repaired']}개는 다시 요청해서 채웠습니다.")
+
+if batch_mode:
+    if st.session_state.get("quiz_bank"):
+        st.markdown("### 📚 문제 은행")
+        show_question_bank(st.session_state["quiz_bank"])
+    st.stop()
+
+if st.session_state.get("generated_quiz"):
+    if st.session_state.get("quiz_usage"):
+        st.caption(f"🔢 {format_usage(st.session_state['quiz_usage'])}")
+    st.markdown("### 📘 생성된 퀴즈")
+    show_quiz(st.session_state["generated_quiz"])
 
 
 # ==========================================================
 # 다운로드 버튼
 # ==========================================================
 if st.session_state.get("generated_quiz"):
-    st.download_button(
+    col1, col2 = st.columns(2)
+    col1.download_button(
         "🔽 퀴즈 다운로드 (.txt)",
-        st.session_state["generated_quiz"],
+        export_question_bank(st.session_state["generated_quiz"], "txt"),
         file_name="generated_quiz.txt",
         mime="text/plain",
     )
+    col2.download_button(
+        "🔽 퀴즈 다운로드 (.json)",
+        export_question_bank(st.session_state["generated_quiz"], "json"),
+        file_name="generated_quiz.json",
+        mime="application/json",
+    )
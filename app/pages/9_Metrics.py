@@ -0,0 +1,87 @@
+import streamlit as st
+import hmac
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from metrics import render_prometheus, reset, snapshot
+
+# 관리자 전용: 서버에 YOYAK_ADMIN_TOKEN이 설정되어 있을 때만 열린다.
+ADMIN_TOKEN = os.environ.get("YOYAK_ADMIN_TOKEN", "")
+
+st.set_page_config(page_title="Metrics - 요약해줘", layout="wide")
+st.title("📊 서버 지표 (관리자)")
+
+if not ADMIN_TOKEN:
+    st.info("관리자 전용 페이지입니다. 서버에 YOYAK_ADMIN_TOKEN 환경변수를 설정하면 사용할 수 있습니다.")
+    st.stop()
+
+token = st.text_input("관리자 토큰", type="password")
+if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+    st.stop()
+
+data = snapshot()
+st.caption(f"프로세스 시작 후 {data['uptime'] / 60:.0f}분 · 항목별 최근 샘플 기준 백분위")
+
+# -------------------------------------------------
+# 1. 구간별 소요 시간 (span / observe)
+# -------------------------------------------------
+st.subheader("⏱ 소요 시간")
+rows = [
+    {
+        "항목": row["name"],
+        "라벨": " ".join(f"{k}={v}" for k, v in row["labels"].items()),
+        "횟수": row["count"],
+        "평균(초)": round(row["mean"], 3),
+        "p50": round(row["p50"], 3),
+        "p90": round(row["p90"], 3),
+        "p99": round(row["p99"], 3),
+        "최대": round(row["max"], 3),
+    }
+    for row in data["summaries"]
+]
+if rows:
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+else:
+    st.write("아직 측정된 항목이 없습니다.")
+
+# -------------------------------------------------
+# 2. 캐시 적중률
+# -------------------------------------------------
+st.subheader("🗄 캐시")
+caches = {}
+for row in data["counters"]:
+    if row["name"] in ("cache_lookups_total", "completion_cache_total", "answer_cache_total"):
+        # completion_cache_total은 응답 캐시 백엔드(memory/tiered)와 상관없이 센 값
+        # answer_cache_total은 챗봇 의미 기반 답변 캐시의 질문 단위 적중 (answers.py)
+        if row["name"] == "answer_cache_total":
+            name = "의미 기반 답변 캐시 (질문)"
+        else:
+            name = row["labels"].get("cache", "응답 캐시 (전체)")
+        caches.setdefault(name, {})[row["labels"]["result"]] = row["value"]
+if caches:
+    cache_rows = []
+    for name, results in sorted(caches.items()):
+        total = sum(results.values())
+        hits = results.get("hit", 0) + results.get("memory", 0) + results.get("disk", 0)
+        cache_rows.append({"캐시": name, "조회": total, "적중률": f"{hits / total:.0%}" if total else "-",
+                           **results})
+    st.dataframe(cache_rows, use_container_width=True, hide_index=True)
+
+# -------------------------------------------------
+# 3. 카운터 (토큰 수, 작업 수 등)
+# -------------------------------------------------
+st.subheader("🔢 카운터")
+counter_rows = [
+    {"항목": row["name"], "라벨": " ".join(f"{k}={v}" for k, v in row["labels"].items()), "값": row["value"]}
+    for row in data["counters"]
+]
+if counter_rows:
+    st.dataframe(counter_rows, use_container_width=True, hide_index=True)
+
+col_download, col_reset = st.columns(2)
+col_download.download_button("Prometheus 형식으로 내려받기", render_prometheus(),
+                             file_name="metrics.txt", mime="text/plain")
+if col_reset.button("지표 초기화"):
+    reset()
+    st.rerun()
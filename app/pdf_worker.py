@@ -0,0 +1,14 @@
+# pdf_worker.py
+"""
+PDF 병렬 추출용 프로세스 워커.
+
+spawn으로 뜬 워커는 이 모듈만 import 하므로
+utils.py의 무거운 의존성(pptx, youtube 등)을 다시 불러오지 않는다.
+"""
+import fitz  # PyMuPDF
+
+
+def extract_pdf_range(path: str, start: int, stop: int) -> list:
+    """path의 PDF에서 [start, stop) 페이지 텍스트를 추출"""
+    with fitz.open(path) as pdf:
+        return [pdf[i].get_text() for i in range(start, stop)]
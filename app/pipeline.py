@@ -0,0 +1,366 @@
+# pipeline.py
+"""
+강의자료 일괄 처리 파이프라인 (Streamlit 없이 실행).
+
+한 학기 강의자료 폴더를 밤사이 미리 노트/퀴즈로 만들어 둘 때 쓴다.
+
+    python app/pipeline.py lectures/ --urls playlist.txt --out output/ --workers 4
+
+- 입력: 디렉터리(하위 폴더 포함) / 파일 / 유튜브 URL, --urls 파일(한 줄에 URL 하나, #은 주석)
+- 자료마다 출력 폴더 아래 <이름>-<해시>/ 에 notes.md, quiz.json, quiz.txt를 쓴다.
+- 자료 하나가 끝날 때마다 출력 폴더의 manifest.json에 기록(체크포인트)하므로,
+  중간에 멈춰도 다시 실행하면 끝난 자료는 건너뛰고 나머지부터 이어서 처리한다.
+- 자료 workers개를 동시에 처리하고, 끝나면 분당 처리 문서 수를 보고한다.
+
+노트/퀴즈 생성은 페이지와 같은 함수(notes.generate_lecture_notes, quiz.generate_quiz_batch)를 쓴다.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from docstore import document_store
+from llm import get_openai_client
+from metrics import start_metrics_server
+from notes import DEFAULT_CONCURRENCY, generate_lecture_notes
+from quiz import BATCH_CONCURRENCY, DIFFICULTIES, QUIZ_TYPES, export_question_bank, generate_quiz_batch, \
+    pack_quiz_material
+from utils import extract_video_id
+from workspace import UNSUPPORTED_TYPES, WorkspaceDocument, document_id, load_document_text
+
+# 확장자 → content_type (업로드 페이지와 같은 이름)
+FILE_TYPES = {
+    ".pdf": "pdf", ".pptx": "pptx", ".ppt": "ppt",
+    ".mp4": "mp4", ".mov": "mov", ".avi": "avi",
+    ".txt": "text", ".md": "text",
+}
+MANIFEST_NAME = "manifest.json"
+PIPELINE_WORKERS = int(os.environ.get("YOYAK_PIPELINE_WORKERS", "2"))
+
+DONE = "done"
+FAILED = "failed"
+
+
+class PipelineError(Exception):
+    """자료 하나를 처리할 수 없을 때 (manifest에 기록할 메시지)"""
+
+
+@dataclass(frozen=True)
+class Source:
+    """처리할 자료 하나. location은 파일 경로 또는 유튜브 URL"""
+    name: str
+    content_type: str
+    location: str
+
+    @property
+    def key(self) -> str:
+        """manifest key (파일은 절대 경로)"""
+        if self.content_type == "youtube":
+            return self.location
+        return os.path.abspath(self.location)
+
+    def fingerprint(self) -> dict:
+        """파일이 바뀌었는지 판단할 정보 (크기, 수정 시각)"""
+        if self.content_type == "youtube":
+            return {}
+        stat = os.stat(self.location)
+        return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+@dataclass
+class PipelineOptions:
+    notes: bool = True
+    quiz: bool = True
+    combos: list = field(default_factory=lambda: [(QUIZ_TYPES[0], "보통")])
+    note_workers: int = DEFAULT_CONCURRENCY
+    quiz_workers: int = BATCH_CONCURRENCY
+    use_cache: bool = True
+
+
+# -------------------------------------------------
+# 입력 찾기
+# -------------------------------------------------
+def _is_url(text: str) -> bool:
+    return text.startswith(("http://", "https://"))
+
+
+def source_from_path(path: str):
+    content_type = FILE_TYPES.get(os.path.splitext(path)[1].lower())
+    if content_type is None:
+        return None
+    return Source(name=os.path.basename(path), content_type=content_type, location=path)
+
+
+def read_url_list(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def discover_sources(inputs: list, url_files: list = ()) -> list:
+    """
+    입력(디렉터리 / 파일 / URL)과 URL 목록 파일에서 처리할 자료를 찾는다. (같은 자료는 한 번만)
+    텍스트를 뽑을 수 없는 형식(.ppt)은 경고를 남기고 건너뛴다. (내용 없이 파일 이름만으로 노트를 만들지 않도록)
+    """
+    sources = []
+    for item in list(inputs) + [url for path in url_files for url in read_url_list(path)]:
+        if _is_url(item):
+            sources.append(Source(name=item, content_type="youtube", location=item))
+        elif os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for filename in sorted(files):
+                    source = source_from_path(os.path.join(root, filename))
+                    if source is not None:
+                        sources.append(source)
+        elif os.path.isfile(item):
+            source = source_from_path(item)
+            if source is None:
+                print(f"건너뜀 (지원하지 않는 형식): {item}", file=sys.stderr)
+            else:
+                sources.append(source)
+        else:
+            print(f"건너뜀 (없는 경로): {item}", file=sys.stderr)
+    unique = {}
+    for source in sources:
+        if source.content_type in UNSUPPORTED_TYPES:
+            print(f"건너뜀 ({source.content_type} 텍스트 추출 미지원, PDF/PPTX로 변환 필요): {source.location}",
+                  file=sys.stderr)
+            continue
+        unique.setdefault(source.key, source)
+    return list(unique.values())
+
+
+# -------------------------------------------------
+# 체크포인트
+# -------------------------------------------------
+class Manifest:
+    """
+    출력 폴더의 manifest.json. {source key: {"status", "doc_id", "outputs", "elapsed", "error", ...}}
+    기록할 때마다 임시 파일에 쓴 뒤 교체하므로, 중간에 멈춰도 파일이 깨지지 않는다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("sources", {})
+
+    def is_done(self, source: Source) -> bool:
+        entry = self.entries.get(source.key)
+        if not entry or entry.get("status") != DONE:
+            return False
+        # 파일이 바뀌었거나 결과물이 지워졌으면 다시 처리
+        if entry.get("fingerprint", {}) != source.fingerprint():
+            return False
+        return all(os.path.exists(path) for path in entry.get("outputs", {}).values())
+
+    def record(self, source: Source, entry: dict):
+        with self._lock:
+            self.entries[source.key] = entry
+            directory = os.path.dirname(self.path) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"sources": self.entries}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+# -------------------------------------------------
+# 자료 하나 처리
+# -------------------------------------------------
+def load_source(source: Source):
+    """파일은 문서 저장소에 넣어 DocumentHandle로, 텍스트 파일은 문자열로, URL은 그대로"""
+    if source.content_type == "youtube":
+        return source.location
+    if source.content_type == "text":
+        with open(source.location, encoding="utf-8") as f:
+            return f.read()
+    with open(source.location, "rb") as f:
+        return document_store.put(f, source.name, source.content_type)
+
+
+def output_dirname(source: Source, doc_id: str) -> str:
+    if source.content_type == "youtube":
+        stem = extract_video_id(source.location) or "youtube"
+    else:
+        stem = os.path.splitext(source.name)[0]
+    stem = re.sub(r"[^\w.-]+", "_", stem).strip("._")[:60] or "document"
+    return f"{stem}-{doc_id.rsplit('-', 1)[-1][:8]}"
+
+
+def _write(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def process_source(source: Source, api_key: str, out_dir: str, options: PipelineOptions) -> dict:
+    """자료 하나로 노트/퀴즈를 만들어 파일로 쓰고 manifest 항목을 반환. 실패하면 PipelineError"""
+    start = time.perf_counter()
+    content = load_source(source)
+    doc_id = document_id(content, source.content_type)
+
+    # 텍스트를 읽을 수 없는 자료는 모델을 부르기 전에 실패 처리
+    text, error = load_document_text(content, source.content_type)
+    if error:
+        raise PipelineError(error)
+    doc_dir = os.path.join(out_dir, output_dirname(source, doc_id))
+    os.makedirs(doc_dir, exist_ok=True)
+
+    outputs = {}
+    warnings = []
+    plan = {}
+    if options.notes:
+        # 같은 API key로 처리한 같은 이름의 이전 버전이 있으면 바뀐 구간만 다시 요약한다. (plan에 기록)
+        notes = generate_lecture_notes(api_key, content, source.content_type, stream=False,
+                                       max_workers=options.note_workers, use_cache=options.use_cache,
+                                       on_plan=plan.update)
+        outputs["notes"] = os.path.join(doc_dir, "notes.md")
+        _write(outputs["notes"], notes)
+
+    questions = 0
+    if options.quiz:
+        doc = WorkspaceDocument(doc_id=doc_id, name=source.name, content_type=source.content_type,
+                                content=content)
+        bank = generate_quiz_batch(get_openai_client(api_key), pack_quiz_material([(doc, text)]),
+                                   options.combos, max_workers=options.quiz_workers,
+                                   use_cache=options.use_cache)
+        questions = len(bank["items"])
+        if bank["failed"] and not questions:
+            raise PipelineError("퀴즈를 만들지 못했습니다.")
+        if bank["failed"]:
+            warnings.append("퀴즈 생성 실패 조합: " + ", ".join(f"{t} · {d}" for t, d in bank["failed"]))
+        for fmt in ("json", "txt"):
+            outputs[f"quiz_{fmt}"] = os.path.join(doc_dir, f"quiz.{fmt}")
+            _write(outputs[f"quiz_{fmt}"], export_question_bank(bank["items"], fmt))
+
+    return {
+        "status": DONE,
+        "name": source.name,
+        "content_type": source.content_type,
+        "doc_id": doc_id,
+        "fingerprint": source.fingerprint(),
+        "outputs": outputs,
+        "questions": questions,
+        "note_sections": plan,
+        "warnings": warnings,
+        "elapsed": round(time.perf_counter() - start, 2),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# -------------------------------------------------
+# 전체 실행
+# -------------------------------------------------
+def run_pipeline(sources: list, api_key: str, out_dir: str, options: PipelineOptions = None,
+                 workers: int = PIPELINE_WORKERS, resume: bool = True, on_progress=None) -> dict:
+    """
+    sources를 workers개씩 동시에 처리한다.
+    resume=True이면 manifest에 끝났다고 기록된 자료(파일 변경 없음, 결과물 있음)는 건너뛴다.
+    on_progress(index, total, source, entry): 자료 하나가 끝날 때마다 호출
+    반환: {"total", "processed", "skipped", "failed", "elapsed", "docs_per_min"}
+    """
+    options = options or PipelineOptions()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(out_dir, MANIFEST_NAME))
+
+    pending = [s for s in sources if not (resume and manifest.is_done(s))]
+    report = {"total": len(sources), "processed": 0, "skipped": len(sources) - len(pending), "failed": 0}
+    start = time.perf_counter()
+
+    def run(source):
+        try:
+            return process_source(source, api_key, out_dir, options)
+        except Exception as e:
+            return {"status": FAILED, "name": source.name, "content_type": source.content_type,
+                    "error": str(e) or type(e).__name__,
+                    "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pipeline")
+    try:
+        futures = {pool.submit(run, source): source for source in pending}
+        for index, future in enumerate(as_completed(futures), start=1):
+            source = futures[future]
+            entry = future.result()
+            manifest.record(source, entry)
+            if entry["status"] == DONE:
+                report["processed"] += 1
+            else:
+                report["failed"] += 1
+            if on_progress:
+                on_progress(index, len(pending), source, entry)
+    finally:
+        # Ctrl+C 등으로 중단되면 아직 시작하지 않은 자료는 취소한다. (다음 실행 때 이어서 처리)
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    report["elapsed"] = time.perf_counter() - start
+    report["docs_per_min"] = report["processed"] / report["elapsed"] * 60 if report["elapsed"] else 0.0
+    return report
+
+
+def _print_progress(index: int, total: int, source: Source, entry: dict):
+    if entry["status"] == DONE:
+        detail = f"{entry['elapsed']:.1f}s"
+        if entry.get("questions"):
+            detail += f", 문항 {entry['questions']}개"
+        print(f"[{index}/{total}] ✓ {source.name} ({detail})")
+        for warning in entry.get("warnings", []):
+            print(f"    ⚠ {warning}")
+    else:
+        print(f"[{index}/{total}] ✗ {source.name}: {entry['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="자료 디렉터리 / 파일 / 유튜브 URL")
+    parser.add_argument("--urls", action="append", default=[], help="유튜브 URL 목록 파일 (여러 번 지정 가능)")
+    parser.add_argument("--out", required=True, help="결과를 쓸 디렉터리 (manifest.json 포함)")
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS, help="동시에 처리할 자료 수")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""),
+                        help="OpenAI API Key (기본: OPENAI_API_KEY 환경변수)")
+    parser.add_argument("--quiz-types", nargs="+", choices=QUIZ_TYPES, default=[QUIZ_TYPES[0]])
+    parser.add_argument("--difficulties", nargs="+", choices=DIFFICULTIES, default=["보통"])
+    parser.add_argument("--no-notes", action="store_true", help="강의노트를 만들지 않음")
+    parser.add_argument("--no-quiz", action="store_true", help="퀴즈를 만들지 않음")
+    parser.add_argument("--no-cache", action="store_true", help="이전 생성 결과를 재사용하지 않음")
+    parser.add_argument("--restart", action="store_true", help="manifest를 무시하고 모든 자료를 다시 처리")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("--api-key 또는 OPENAI_API_KEY 환경변수가 필요합니다.")
+    sources = discover_sources(args.inputs, args.urls)
+    if not sources:
+        parser.error("처리할 자료가 없습니다.")
+
+    options = PipelineOptions(
+        notes=not args.no_notes,
+        quiz=not args.no_quiz,
+        combos=[(t, d) for t in args.quiz_types for d in args.difficulties],
+        use_cache=not args.no_cache,
+    )
+    print(f"자료 {len(sources)}개 · 동시 처리 {args.workers}개 · 출력 {args.out}")
+    # 밤새 도는 일괄 작업도 YOYAK_METRICS_PORT가 있으면 /metrics로 지켜볼 수 있다.
+    start_metrics_server()
+    try:
+        report = run_pipeline(sources, args.api_key, args.out, options, workers=args.workers,
+                              resume=not args.restart, on_progress=_print_progress)
+    except KeyboardInterrupt:
+        print("\n중단했습니다. 다시 실행하면 끝나지 않은 자료부터 이어서 처리합니다.", file=sys.stderr)
+        return 130
+
+    print(
+        f"\n완료 {report['processed']}개 · 건너뜀 {report['skipped']}개 · 실패 {report['failed']}개 · "
+        f"{report['elapsed']:.1f}초 ({report['docs_per_min']:.1f} 문서/분)"
+    )
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# prompting.py
+"""
+토큰 예산 기반 프롬프트 조립.
+
+- count_tokens(): 모델 토크나이저(tiktoken)로 정확한 토큰 수 계산
+  (tiktoken이 없으면 글자 수 기반 근사치로 대체)
+- pack_text() / pack_chunks(): 자료를 정해진 토큰 예산 안에 맞춰 자른다.
+- trim_history(): 대화 기록을 오래된 것부터 버려서 예산 안에 맞춘다.
+- build_chat_messages(): 위를 조합해 messages와 토큰 사용량 리포트를 만든다.
+"""
+import logging
+import os
+
+from cache import LRUCache
+from metrics import increment
+
+logger = logging.getLogger(__name__)
+
+# 모델별 컨텍스트 길이 (토큰)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 16385
+
+# 기능별 토큰 예산 (환경변수로 조정 가능)
+CHAT_CONTEXT_TOKENS = int(os.environ.get("YOYAK_CHAT_CONTEXT_TOKENS", "3000"))     # 챗봇: 자료 부분
+CHAT_PROMPT_TOKENS = int(os.environ.get("YOYAK_CHAT_PROMPT_TOKENS", "8000"))       # 챗봇: 프롬프트 전체
+QUIZ_MATERIAL_TOKENS = int(os.environ.get("YOYAK_QUIZ_MATERIAL_TOKENS", "12000"))  # 퀴즈: 자료 부분
+NOTE_SINGLE_PASS_TOKENS = int(os.environ.get("YOYAK_NOTE_SINGLE_PASS_TOKENS", "8000"))  # 노트: 한 번에 보낼 최대 원문
+
+# 메시지 하나당 붙는 형식 토큰, 응답 시작 토큰 (OpenAI 문서 기준)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_encodings = {}
+
+# 긴 자료의 토큰 수는 (모델, 텍스트)별로 기억해 둔다.
+# Streamlit은 상호작용마다 페이지 스크립트를 다시 실행하는데, 그때마다 수십만 글자 자료를
+# 다시 토큰화하지 않기 위함이다. (짧은 텍스트는 세는 비용이 작아서 기억하지 않음)
+TOKEN_COUNT_CACHE_MIN_CHARS = 20000
+_token_counts = LRUCache(max_items=32)
+
+
+def _get_encoding(model: str):
+    if model not in _encodings:
+        # tiktoken은 처음 토큰을 셀 때 불러온다. (페이지 첫 로딩을 가볍게)
+        try:
+            import tiktoken
+        except ImportError:  # tiktoken이 없으면 근사치로 계산
+            _encodings[model] = None
+            return None
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # tiktoken은 처음 쓸 때 토크나이저 파일을 내려받는다.
+            # 네트워크가 막힌 환경이면 근사치 계산으로 대체한다.
+            logger.warning("tiktoken 토크나이저를 불러오지 못해 근사치로 토큰을 계산합니다.")
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str) -> int:
+    """text의 토큰 수"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        # 근사치: 한글/영문 섞인 강의자료 기준 대략 2글자당 1토큰
+        return (len(text) + 1) // 2
+    if len(text) < TOKEN_COUNT_CACHE_MIN_CHARS:
+        return len(encoding.encode(text, disallowed_special=()))
+    key = (model, text)
+    count = _token_counts.get(key)
+    if count is None:
+        count = len(encoding.encode(text, disallowed_special=()))
+        _token_counts.set(key, count)
+    return count
+
+
+def count_message_tokens(messages: list, model: str) -> int:
+    """chat messages 전체의 프롬프트 토큰 수 (형식 토큰 포함)"""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model)
+    return total
+
+
+def context_window(model: str) -> int:
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def pack_text(text: str, budget: int, model: str) -> str:
+    """text를 budget 토큰 이하로 자른다. (앞부분 유지)"""
+    if budget <= 0 or not text:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:budget * 2]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= budget:
+        return text
+    return encoding.decode(tokens[:budget])
+
+
+def pack_chunks(chunks: list, budget: int, model: str, separator: str = "\n...\n") -> str:
+    """
+    청크를 순서대로 budget 토큰까지 담는다.
+    예산을 넘는 청크는 건너뛰고, 첫 청크가 너무 크면 잘라서라도 담는다.
+    """
+    packed = []
+    used = 0
+    separator_tokens = count_tokens(separator, model)
+    for chunk in chunks:
+        cost = count_tokens(chunk, model) + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append(chunk)
+            used += cost
+        elif not packed:
+            packed.append(pack_text(chunk, budget, model))
+            used = budget
+    return separator.join(packed)
+
+
+def trim_history(messages: list, budget: int, model: str) -> tuple:
+    """
+    대화 기록을 오래된 것부터 버려서 budget 토큰 안에 맞춘다.
+    마지막 메시지(방금 들어온 질문)는 항상 남긴다.
+    반환: (남은 messages, 버린 메시지 수)
+    """
+    kept = []
+    used = 0
+    for message in reversed(messages):
+        cost = TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model)
+        if kept and used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept, len(messages) - len(kept)
+
+
+def build_chat_messages(system_prompt: str, history: list, model: str, max_tokens: int,
+                        prompt_budget: int = None) -> tuple:
+    """
+    시스템 프롬프트 + 대화 기록으로 messages를 만든다.
+    응답용 max_tokens를 컨텍스트에서 먼저 빼 두고, 남은 예산 안에서 기록을 최신 것부터 담는다.
+    반환: (messages, usage)
+      usage = {"prompt_tokens", "system_tokens", "history_tokens", "budget",
+               "max_tokens", "dropped_messages"}
+    """
+    budget = context_window(model) - max_tokens
+    if prompt_budget is not None:
+        budget = min(budget, prompt_budget)
+
+    system_tokens = TOKENS_PER_MESSAGE + count_tokens(system_prompt, model)
+    history_budget = budget - system_tokens - TOKENS_PER_REPLY
+    kept, dropped = trim_history(history, history_budget, model)
+
+    messages = [{"role": "system", "content": system_prompt}, *kept]
+    prompt_tokens = count_message_tokens(messages, model)
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "system_tokens": system_tokens,
+        "history_tokens": prompt_tokens - system_tokens - TOKENS_PER_REPLY,
+        "budget": budget,
+        "max_tokens": max_tokens,
+        "dropped_messages": dropped,
+    }
+    log_usage("chat", model, usage)
+    return messages, usage
+
+
+def request_usage(label: str, messages: list, model: str, max_tokens: int = None) -> dict:
+    """완성된 messages의 토큰 사용량 리포트 (로그도 남김)"""
+    usage = {"prompt_tokens": count_message_tokens(messages, model)}
+    if max_tokens is not None:
+        usage["max_tokens"] = max_tokens
+    log_usage(label, model, usage)
+    return usage
+
+
+def format_usage(usage: dict) -> str:
+    """화면 표시용 한 줄 요약"""
+    text = f"프롬프트 {usage['prompt_tokens']:,} 토큰"
+    if usage.get("max_tokens"):
+        text += f" · 응답 최대 {usage['max_tokens']:,} 토큰"
+    if usage.get("dropped_messages"):
+        text += f" · 오래된 대화 {usage['dropped_messages']}개 제외"
+    return text
+
+
+def log_usage(label: str, model: str, usage: dict):
+    """요청별 토큰 사용량을 로그로 남기고, 프롬프트 토큰 수를 기능별 카운터에 더한다. (비용/지연 튜닝용)"""
+    increment("prompt_tokens_estimated_total", usage.get("prompt_tokens", 0), feature=label, model=model)
+    logger.info("prompt usage [%s] model=%s %s", label, model,
+                " ".join(f"{k}={v}" for k, v in usage.items()))
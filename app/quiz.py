@@ -0,0 +1,622 @@
+# quiz.py
+"""
+퀴즈 프롬프트 생성과 응답 파싱.
+
+텍스트 출력 형식 (기존):
+    문제 본문 (여러 줄 가능, 객관식이면 보기 포함)
+    //정답: 정답 내용
+
+구조화 출력 형식 (JSON schema):
+    {"questions": [{"question", "options", "answer", "source"}, ...]}
+    스트리밍 도중에도 문항 객체가 닫히는 대로 검증해서 QuizItem으로 만들고,
+    형식이 어긋난 문항만 골라서 그 개수만큼 다시 요청한다.
+
+일괄 생성(문제 은행):
+    유형 × 난이도 조합을 스레드 풀에서 동시에 요청하고,
+    조합끼리 겹치는 문제는 걸러낸 뒤 하나의 문제 은행으로 내보낸다.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+
+from llm import DEFAULT_MODEL, create_chat_completion
+from prompting import QUIZ_MATERIAL_TOKENS, pack_text
+from workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+ANSWER_MARKER = "//정답:"
+
+QUIZ_TYPES = ["객관식 5문항", "단답형 5문항", "서술형 3문항", "혼합형 5문항"]
+DIFFICULTIES = ["쉬움", "보통", "어려움"]
+
+# 일괄 생성 동시 요청 수 (환경변수로 조정 가능)
+BATCH_CONCURRENCY = int(os.environ.get("YOYAK_QUIZ_CONCURRENCY", "4"))
+# 두 문제의 글자 3-gram 유사도가 이 값 이상이면 중복으로 본다.
+DUPLICATE_THRESHOLD = 0.8
+# 한 세트 생성 응답 최대 토큰
+QUIZ_MAX_TOKENS = 2500
+# 형식이 어긋난 문항을 다시 요청할 때 문항당 응답 토큰
+ITEM_MAX_TOKENS = 500
+# 다시 요청하는 최대 횟수
+QUIZ_MAX_REPAIRS = 2
+OPTION_LETTERS = "ABCD"
+
+QUIZ_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "options": {"type": "array", "items": {"type": "string"}},
+                    "answer": {"type": "string"},
+                    "source": {"type": "string"},
+                },
+                "required": ["question", "options", "answer", "source"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["questions"],
+    "additionalProperties": False,
+}
+QUIZ_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "quiz", "strict": True, "schema": QUIZ_JSON_SCHEMA},
+}
+
+QUIZ_FORMAT_RULES = """출력 형식 규칙:
+1. 문제 유형:
+   - 객관식: 문제 + 보기 4개(A,B,C,D) + "//정답: 정답문자"
+   - 단답형: 문제만 작성 후 반드시 별도 줄에 "//정답: 정답" 작성
+   - 서술형: 문제 작성 후 별도 줄에 "//정답: 정답 내용"
+   - 혼합형: 유형 섞어서 5문항
+2. 문제 번호 포함 금지 (문제 앞에 "문제 1:" 같은 텍스트는 빼기)
+3. 문제와 정답은 항상 별도 줄로 구분
+4. 불필요한 안내 문구 금지
+"""
+
+QUIZ_JSON_RULES = """출력 형식 규칙 (JSON):
+1. 문항마다 question(문제), options(보기), answer(정답), source(근거)를 채운다.
+   - 객관식: options에 보기 4개를 A,B,C,D 순서로 ("A." 같은 머리표 없이), answer는 정답 문자(A~D)
+   - 단답형: options는 빈 배열, answer는 정답
+   - 서술형: options는 빈 배열, answer는 모범 답안
+   - 혼합형: 유형 섞어서 5문항
+2. source에는 문제의 근거가 된 강의자료 문장을 그대로 짧게 인용
+   (자료에 [mm:ss] 같은 영상 시간 표시가 있으면 가장 가까운 시간 표시를 인용 앞에 붙인다)
+3. question에 문제 번호 포함 금지 (문제 앞에 "문제 1:" 같은 텍스트는 빼기)
+"""
+
+
+@dataclass
+class QuizItem:
+    """문항 하나. 객관식이면 options에 보기 4개, answer는 정답 문자(A~D)"""
+    question: str
+    answer: str
+    options: list = field(default_factory=list)
+    source: str = ""
+    quiz_type: str = ""
+    difficulty: str = ""
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def pack_quiz_material(loaded: list, budget: int = QUIZ_MATERIAL_TOKENS, model: str = DEFAULT_MODEL) -> str:
+    """
+    퀴즈에 넣을 자료를 토큰 예산 안에 담는다. (응답 max_tokens는 별도로 확보)
+    loaded: [(WorkspaceDocument, text), ...]
+    자료가 여러 개면 앞 자료가 예산을 다 쓰지 않도록 자료마다 나눠 담는다.
+    """
+    if len(loaded) > 1:
+        return Workspace.pack(loaded, budget, model)
+    return pack_text(loaded[0][1], budget, model)
+
+
+def build_quiz_prompt(material_text: str, quiz_type: str, difficulty: str) -> str:
+    # 안전한 프롬프트: material_text(실제 콘텐츠)만 포함, 에러 텍스트는 절대 포함하지 않음
+    return f"""
+아래 강의자료를 바탕으로 {quiz_type} 퀴즈를 생성해줘.
+난이도: {difficulty}
+
+--- 강의자료 (요약/본문) ---
+{material_text}
+------------------
+
+{QUIZ_FORMAT_RULES}"""
+
+
+def build_quiz_messages(material_text: str, quiz_type: str, difficulty: str,
+                        structured: bool = False, request_text: str = None) -> list:
+    """
+    일괄 생성 / 구조화 출력용 messages.
+    강의자료와 형식 규칙을 system 메시지(모든 조합이 같은 앞부분)에 두고
+    유형/난이도만 user 메시지로 보내서, 서버 쪽 프롬프트 캐시가 자료 부분을 재사용하게 한다.
+    """
+    system = (
+        "아래 강의자료를 바탕으로 요청받은 유형과 난이도의 퀴즈를 생성해줘.\n\n"
+        "--- 강의자료 (요약/본문) ---\n"
+        f"{material_text}\n"
+        "------------------\n\n"
+        f"{QUIZ_JSON_RULES if structured else QUIZ_FORMAT_RULES}"
+    )
+    if request_text is None:
+        request_text = f"{quiz_type} 퀴즈를 생성해줘.\n난이도: {difficulty}"
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": request_text},
+    ]
+
+
+def expected_question_count(quiz_type: str) -> int:
+    """'객관식 5문항' → 5"""
+    match = re.search(r"(\d+)\s*문항", quiz_type)
+    return int(match.group(1)) if match else 5
+
+
+def build_structured_request(material_text: str, quiz_type: str, difficulty: str,
+                             model: str = DEFAULT_MODEL, count: int = None,
+                             exclude: list = None) -> dict:
+    """
+    구조화 출력 요청 파라미터.
+    count를 주면 그 개수만큼만 새로 요청한다. (형식이 어긋난 문항 재요청용)
+    """
+    request_text = None
+    max_tokens = QUIZ_MAX_TOKENS
+    if count is not None:
+        kind = re.sub(r"\s*\d+\s*문항", "", quiz_type)
+        request_text = f"{kind} 문제를 {count}개만 새로 생성해줘.\n난이도: {difficulty}"
+        if exclude:
+            listed = "\n".join(f"- {question}" for question in exclude)
+            request_text += f"\n\n아래 문제들과 겹치지 않게 만들어줘.\n{listed}"
+        max_tokens = ITEM_MAX_TOKENS * count
+    return dict(
+        model=model,
+        messages=build_quiz_messages(material_text, quiz_type, difficulty,
+                                     structured=True, request_text=request_text),
+        temperature=0.7,
+        max_tokens=max_tokens,
+        response_format=QUIZ_RESPONSE_FORMAT,
+    )
+
+
+class QuizStreamParser:
+    """
+    스트리밍으로 들어오는 퀴즈 텍스트를 줄 단위로 파싱한다.
+    '//정답:' 줄이 완성되는 순간 (문제, 정답) 블록을 바로 돌려준다.
+
+        parser = QuizStreamParser()
+        for delta in chunks:
+            for question, answer in parser.feed(delta):
+                ...
+        for question, answer in parser.close():
+            ...
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._pending = ""  # 아직 줄바꿈이 오지 않은 마지막 줄
+        self._buffer = []   # 현재 문제의 줄들
+
+    @property
+    def text(self) -> str:
+        """지금까지 받은 전체 원문"""
+        return "".join(self._parts)
+
+    def feed(self, delta: str) -> list:
+        self._parts.append(delta)
+        self._pending += delta
+        if "\n" not in self._pending:
+            return []
+
+        *lines, self._pending = self._pending.split("\n")
+        blocks = []
+        for line in lines:
+            block = self._consume_line(line)
+            if block:
+                blocks.append(block)
+        return blocks
+
+    def close(self) -> list:
+        """스트림이 끝났을 때 마지막 줄을 처리한다."""
+        line, self._pending = self._pending, ""
+        block = self._consume_line(line)
+        return [block] if block else []
+
+    def _consume_line(self, line: str):
+        if ANSWER_MARKER in line:
+            question = "\n".join(self._buffer).strip()
+            answer = line.replace(ANSWER_MARKER, "").strip()
+            self._buffer = []
+            return question, answer
+        self._buffer.append(line)
+        return None
+
+
+def parse_quiz(quiz_text: str, complete: bool = True) -> list:
+    """
+    퀴즈 텍스트를 (문제, 정답) 리스트로 변환.
+    complete=False이면 아직 생성 중인 텍스트로 보고, 줄바꿈이 오지 않은 마지막 줄은 버린다.
+    """
+    parser = QuizStreamParser()
+    blocks = parser.feed(quiz_text)
+    if complete:
+        blocks.extend(parser.close())
+    return blocks
+
+
+def items_from_blocks(blocks: list, quiz_type: str = "", difficulty: str = "") -> list:
+    """텍스트 형식의 (문제, 정답) 블록을 QuizItem 리스트로"""
+    return [
+        QuizItem(question=question, answer=answer, quiz_type=quiz_type, difficulty=difficulty)
+        for question, answer in blocks
+    ]
+
+
+# ==========================================================
+# 구조화 출력 (JSON)
+# ==========================================================
+def _option_rule(quiz_type: str):
+    """유형별 보기 개수 규칙: 객관식 → 4, 단답형/서술형 → 0, 혼합형·미지정 → None (0 또는 4)"""
+    if "객관식" in quiz_type:
+        return len(OPTION_LETTERS)
+    if "단답형" in quiz_type or "서술형" in quiz_type:
+        return 0
+    return None
+
+
+def validate_quiz_item(raw, quiz_type: str = "") -> tuple:
+    """
+    모델이 만든 문항 객체 하나를 검증한다.
+    quiz_type을 주면 유형에 맞는 보기 개수인지도 본다.
+    (객관식은 서로 다른 보기 4개와 그중 하나인 정답, 단답형/서술형은 보기 없음)
+    반환: (QuizItem, None) 또는 (None, 오류 설명)
+    """
+    if not isinstance(raw, dict):
+        return None, "문항이 객체가 아닙니다."
+    question = raw.get("question")
+    answer = raw.get("answer")
+    options = raw.get("options") or []
+    source = raw.get("source") or ""
+    if not isinstance(question, str) or not question.strip():
+        return None, "question이 비어 있습니다."
+    if not isinstance(answer, str) or not answer.strip():
+        return None, "answer가 비어 있습니다."
+    if not isinstance(options, list) or not all(isinstance(o, str) and o.strip() for o in options):
+        return None, "options 형식이 잘못됐습니다."
+    if not isinstance(source, str):
+        return None, "source 형식이 잘못됐습니다."
+
+    answer = answer.strip()
+    options = [o.strip() for o in options]
+    expected_options = _option_rule(quiz_type)
+    if expected_options == 0 and options:
+        return None, f"{quiz_type} 문항에 보기가 {len(options)}개 있습니다."
+    if expected_options or options:
+        if len(options) != len(OPTION_LETTERS):
+            return None, f"객관식 보기가 {len(options)}개입니다."
+        if len(set(options)) != len(options):
+            return None, "객관식 보기에 중복이 있습니다."
+        letter = answer.rstrip(".)").upper()
+        if letter not in OPTION_LETTERS:
+            # 정답 문자 대신 보기 내용을 그대로 쓴 경우
+            if answer not in options:
+                return None, f"정답({answer})이 보기에 없습니다."
+            letter = OPTION_LETTERS[options.index(answer)]
+        answer = letter
+
+    return QuizItem(question=question.strip(), answer=answer, options=options,
+                    source=source.strip()), None
+
+
+class QuizJsonStreamParser:
+    """
+    스트리밍으로 들어오는 구조화 출력(JSON)을 글자 단위로 훑어서
+    questions 배열의 문항 객체가 닫히는 순간 검증해 돌려준다.
+    전체 JSON이 끝나기 전에도 완성된 문항은 바로 쓸 수 있다.
+
+        parser = QuizJsonStreamParser(quiz_type)
+        for delta in chunks:
+            for item in parser.feed(delta):
+                ...
+        parser.close()
+        parser.items, parser.invalid
+    """
+
+    def __init__(self, quiz_type: str = ""):
+        self.quiz_type = quiz_type  # 문항 검증에 쓰는 유형 (보기 개수 규칙)
+        self._text = ""
+        self._pos = 0
+        self._stack = []        # 열려 있는 '{' / '['
+        self._in_string = False
+        self._escape = False
+        self._item_start = None  # 현재 문항 객체가 시작된 위치
+        self.items = []          # 검증을 통과한 QuizItem
+        self.invalid = []        # (원문 조각, 오류 설명)
+
+    @property
+    def text(self) -> str:
+        """지금까지 받은 전체 원문"""
+        return self._text
+
+    def feed(self, delta: str) -> list:
+        self._text += delta
+        text = self._text
+        accepted = []
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                # 최상위 객체 → questions 배열 → 문항 객체 순서로 열린다.
+                if ch == "{" and self._stack == ["{", "["]:
+                    self._item_start = i
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._item_start is not None and self._stack == ["{", "["]:
+                    item = self._accept(text[self._item_start:i + 1])
+                    self._item_start = None
+                    if item:
+                        accepted.append(item)
+        self._pos = len(text)
+        return accepted
+
+    def close(self) -> list:
+        """스트림이 끝났을 때: 닫히지 않은 문항(잘린 응답)은 오류로 기록한다."""
+        if self._item_start is not None:
+            self.invalid.append((self._text[self._item_start:], "응답이 중간에 끊겼습니다."))
+            self._item_start = None
+        return []
+
+    def _accept(self, fragment: str):
+        try:
+            raw = json.loads(fragment)
+        except ValueError as e:
+            self.invalid.append((fragment, f"JSON 파싱 실패: {e}"))
+            return None
+        item, error = validate_quiz_item(raw, self.quiz_type)
+        if error:
+            self.invalid.append((fragment, error))
+            return None
+        self.items.append(item)
+        return item
+
+
+def parse_quiz_json(quiz_text: str, complete: bool = True, quiz_type: str = "") -> tuple:
+    """
+    구조화 출력 텍스트를 검증된 QuizItem 리스트로 변환.
+    complete=False이면 아직 생성 중인 텍스트로 보고, 닫히지 않은 문항은 오류로 치지 않는다.
+    quiz_type을 주면 유형에 맞지 않는 보기 개수도 오류로 친다.
+    반환: (items, invalid)
+    """
+    parser = QuizJsonStreamParser(quiz_type)
+    parser.feed(quiz_text)
+    if complete:
+        parser.close()
+    return parser.items, parser.invalid
+
+
+def complete_quiz_check(quiz_type: str):
+    """
+    응답 캐시에 저장해도 되는 구조화 출력인지 검사하는 함수(cache_check용).
+    문항 수가 모두 맞고 형식 오류가 하나도 없을 때만 저장한다.
+    (잘리거나 깨진 응답을 저장하면 다시 만들 때마다 같은 오류가 재생된다)
+    """
+    expected = expected_question_count(quiz_type)
+
+    def check(text: str) -> bool:
+        items, invalid = parse_quiz_json(text, quiz_type=quiz_type)
+        return len(items) == expected and not invalid
+
+    return check
+
+
+def generate_structured_quiz(client, material_text: str, quiz_type: str, difficulty: str,
+                             model: str = DEFAULT_MODEL, use_cache: bool = True,
+                             text: str = None, max_repairs: int = QUIZ_MAX_REPAIRS) -> tuple:
+    """
+    구조화 출력으로 한 세트를 만든다.
+    형식이 어긋나거나 잘려서 모자란 문항은 전체를 다시 만들지 않고 모자란 개수만 다시 요청한다.
+    text를 주면 (이미 스트리밍으로 받은 응답) 그 응답부터 검증한다.
+    첫 응답은 형식이 온전할 때만 캐시에 남기고, 재요청은 캐시를 쓰지 않는다.
+    (같은 재요청이 캐시된 깨진 응답을 되풀이해 받으면 더 진행되지 않는다)
+    반환: (items, 다시 요청한 문항 수)
+    """
+    if text is None:
+        request = build_structured_request(material_text, quiz_type, difficulty, model=model)
+        text = create_chat_completion(client, use_cache=use_cache, cache_check=complete_quiz_check(quiz_type),
+                                      **request)
+    items, invalid = parse_quiz_json(text, quiz_type=quiz_type)
+    for _, error in invalid:
+        logger.warning("퀴즈 문항 형식 오류 [%s/%s]: %s", quiz_type, difficulty, error)
+
+    expected = expected_question_count(quiz_type)
+    repaired = 0
+    for _ in range(max_repairs):
+        missing = expected - len(items)
+        if missing <= 0:
+            break
+        repaired += missing
+        request = build_structured_request(
+            material_text, quiz_type, difficulty, model=model,
+            count=missing, exclude=[item.question for item in items],
+        )
+        more, invalid = parse_quiz_json(create_chat_completion(client, use_cache=False, **request),
+                                        quiz_type=quiz_type)
+        for _, error in invalid:
+            logger.warning("퀴즈 문항 재요청 형식 오류 [%s/%s]: %s", quiz_type, difficulty, error)
+        items.extend(more[:missing])
+
+    for item in items:
+        item.quiz_type = quiz_type
+        item.difficulty = difficulty
+    return items[:expected], repaired
+
+
+# ==========================================================
+# 일괄 생성 (문제 은행)
+# ==========================================================
+def _normalize_question(question: str) -> str:
+    """비교용: 공백/문장부호를 없애고 소문자로"""
+    return re.sub(r"[\W_]+", "", question).lower()
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def dedupe_questions(items: list, threshold: float = DUPLICATE_THRESHOLD) -> tuple:
+    """
+    문제 본문이 거의 같은 항목을 걸러낸다. (먼저 나온 것을 남김)
+    공백/문장부호만 있는 문제는 중복이 아니라 잘못된 문항으로 따로 센다.
+    items: QuizItem 리스트
+    반환: (남은 items, 중복으로 제거된 수, 내용이 없어 제거된 수)
+    """
+    kept = []
+    kept_shingles = []
+    seen = set()
+    empty = 0
+    for item in items:
+        normalized = _normalize_question(item.question)
+        if not normalized:
+            empty += 1
+            continue
+        if normalized in seen:
+            continue
+        shingles = _shingles(normalized)
+        duplicate = any(
+            len(shingles & other) / len(shingles | other) >= threshold
+            for other in kept_shingles
+        )
+        if duplicate:
+            continue
+        seen.add(normalized)
+        kept.append(item)
+        kept_shingles.append(shingles)
+    return kept, len(items) - len(kept) - empty, empty
+
+
+def generate_quiz_batch(client, material_text: str, combos: list,
+                        max_workers: int = BATCH_CONCURRENCY, model: str = DEFAULT_MODEL,
+                        use_cache: bool = True, structured: bool = True,
+                        on_result=None, should_stop=None) -> dict:
+    """
+    (유형, 난이도) 조합들을 동시에 요청해서 하나의 문제 은행으로 합친다.
+    material_text는 미리 예산에 맞춰 잘라 둔 자료를 모든 조합이 그대로 공유한다.
+    structured=True이면 JSON 구조화 출력으로 받고, 형식이 어긋난 문항만 다시 요청한다.
+
+    on_result(quiz_type, difficulty, items): 조합 하나가 끝날 때마다 호출 (진행 표시용)
+    should_stop(): True를 반환하면 아직 시작하지 않은 조합은 건너뛴다. (취소용)
+
+    반환: {"items", "duplicates", "rejected", "repaired", "requests", "failed", "elapsed", "questions_per_sec"}
+      items = QuizItem 리스트 (조합 순서대로)
+      rejected = 문제 본문이 공백/문장부호뿐이라 버린 문항 수
+    """
+    def run(quiz_type, difficulty):
+        if should_stop and should_stop():
+            return None
+        if structured:
+            return generate_structured_quiz(client, material_text, quiz_type, difficulty,
+                                            model=model, use_cache=use_cache)
+        text = create_chat_completion(
+            client,
+            use_cache=use_cache,
+            model=model,
+            messages=build_quiz_messages(material_text, quiz_type, difficulty),
+            temperature=0.7,
+            max_tokens=QUIZ_MAX_TOKENS,
+        )
+        return items_from_blocks(parse_quiz(text), quiz_type, difficulty), 0
+
+    started = time.perf_counter()
+    results = {}
+    failed = []
+    repaired = 0
+    max_workers = max(1, min(max_workers, len(combos)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run, *combo): combo for combo in combos}
+        for future in as_completed(futures):
+            combo = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                logger.exception("퀴즈 일괄 생성 실패 [%s/%s]", *combo)
+                failed.append(combo)
+                continue
+            if result is None:
+                continue
+            results[combo], combo_repaired = result
+            repaired += combo_repaired
+            if on_result:
+                on_result(combo[0], combo[1], results[combo])
+
+    items = [item for combo in combos for item in results.get(combo, [])]
+    items, duplicates, rejected = dedupe_questions(items)
+    elapsed = time.perf_counter() - started
+    return {
+        "items": items,
+        "duplicates": duplicates,
+        "rejected": rejected,
+        "repaired": repaired,
+        "requests": len(results),
+        "failed": failed,
+        "elapsed": elapsed,
+        "questions_per_sec": len(items) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def format_question(item: QuizItem) -> str:
+    """문제 본문 + (객관식이면) 'A. 보기' 줄들"""
+    lines = [item.question]
+    lines.extend(f"{letter}. {option}" for letter, option in zip(OPTION_LETTERS, item.options))
+    return "\n".join(lines)
+
+
+def export_question_bank(items: list, fmt: str = "txt") -> str:
+    """QuizItem 리스트를 txt(기존 '//정답:' 형식) / csv / json 문자열로 내보낸다."""
+    if fmt == "json":
+        return json.dumps([item.to_dict() for item in items], ensure_ascii=False, indent=2)
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["유형", "난이도", "문제", "보기", "정답", "근거"])
+        for item in items:
+            writer.writerow([item.quiz_type, item.difficulty, item.question,
+                             "\n".join(item.options), item.answer, item.source])
+        return buffer.getvalue()
+
+    if fmt != "txt":
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+    lines = []
+    current = None
+    for item in items:
+        group = (item.quiz_type, item.difficulty)
+        if group != current and any(group):
+            current = group
+            lines.append(f"## {item.quiz_type} · {item.difficulty}")
+            lines.append("")
+        lines.append(format_question(item))
+        lines.append(f"{ANSWER_MARKER} {item.answer}")
+        lines.append("")
+    return "\n".join(lines).strip() + "\n"
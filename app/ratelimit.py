@@ -0,0 +1,300 @@
+# ratelimit.py
+"""
+API Key별 OpenAI 요청 스케줄러 (rate limit 대응).
+
+한 반 전체가 동시에 '퀴즈 생성하기'를 누르면 같은 계정의 분당 한도(RPM/TPM)를 넘겨 429가 쏟아지고,
+클라이언트마다 제각각 재시도하면서 처리량이 오히려 무너진다.
+모든 OpenAI 호출(llm.py의 채팅, retrieval.py의 임베딩)은 이 스케줄러를 거쳐서 나간다.
+
+- (API Key, 주소, 모델)마다 요청 수 / 토큰 수 token bucket을 두고, 한도 안에서만 요청을 내보낸다.
+  토큰은 프롬프트 토큰 + max_tokens로 미리 잡고, 응답의 usage로 실제 사용량에 맞춰 돌려받는다.
+- 응답 헤더(x-ratelimit-limit-* / remaining-*)로 실제 계정 한도와 남은 양을 읽어 bucket을 맞춘다.
+  여러 서버(컨테이너)가 같은 계정을 나눠 쓰는 경우도 remaining으로 따라간다.
+- 429는 retry-after(없으면 지수 backoff + jitter)만큼 그 key 전체를 멈췄다가 다시 보낸다.
+  5xx / 연결 오류는 그 요청만 backoff 후 재시도한다. 크레딧 소진(insufficient_quota)은 재시도하지 않는다.
+- 기다리는 요청은 우선순위 순으로 나간다. 챗봇 답변(INTERACTIVE)이 노트/퀴즈 일괄 작업(BULK)보다 먼저.
+
+YOYAK_RATE_LIMIT=off 이면 스케줄러 없이 openai 클라이언트의 기본 재시도만 쓴다.
+"""
+import hashlib
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+
+from metrics import increment, observe
+from prompting import count_message_tokens, count_tokens
+
+# 우선순위 (작을수록 먼저)
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+RATE_LIMIT_ENABLED = os.environ.get("YOYAK_RATE_LIMIT", "on") != "off"
+# 응답 헤더를 받기 전까지 쓰는 기본 한도 (계정 등급에 맞춰 조정)
+DEFAULT_RPM = int(os.environ.get("YOYAK_RATE_LIMIT_RPM", "500"))
+DEFAULT_TPM = int(os.environ.get("YOYAK_RATE_LIMIT_TPM", "200000"))
+RATE_MAX_RETRIES = int(os.environ.get("YOYAK_RATE_MAX_RETRIES", "6"))
+BACKOFF_BASE = 1.0   # 초
+BACKOFF_MAX = 60.0   # 초
+# max_tokens가 없는 요청의 응답 토큰 추정치
+DEFAULT_COMPLETION_TOKENS = 1000
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value) -> float:
+    """'1s', '6m0s', '20ms', '1m30.5s' 같은 헤더 값을 초로. 읽을 수 없으면 None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after(headers) -> float:
+    """retry-after-ms / retry-after 헤더(초). 없으면 None"""
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms is not None:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+def backoff_delay(attempt: int, server_delay: float = None) -> float:
+    """
+    attempt번째 재시도 전 대기 시간.
+    서버가 알려 준 시간이 있으면 그보다 조금 더(최대 20%) 기다리고,
+    없으면 지수 backoff의 절반~전부 사이에서 고른다. (동시에 실패한 요청들이 한꺼번에 돌아오지 않게)
+    """
+    if server_delay is not None:
+        return server_delay * random.uniform(1.0, 1.2)
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def estimate_chat_tokens(request: dict) -> int:
+    """채팅 요청이 분당 토큰 한도에서 차지할 양 (프롬프트 + 최대 응답 길이)"""
+    model = request.get("model", "")
+    completion = request.get("max_completion_tokens") or request.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    return count_message_tokens(request.get("messages") or [], model) + completion
+
+
+def estimate_embedding_tokens(texts: list, model: str) -> int:
+    return sum(count_tokens(text, model) for text in texts)
+
+
+class TokenBucket:
+    """분당 capacity만큼 고르게 채워지는 bucket"""
+
+    def __init__(self, capacity: float, now: float = None):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.updated = time.monotonic() if now is None else now
+
+    @property
+    def rate(self) -> float:
+        """초당 채워지는 양"""
+        return self.capacity / 60.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount를 꺼낼 수 있을 때까지 남은 시간(초). 한도보다 큰 요청은 가득 찰 때까지만 기다린다."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate if self.rate > 0 else BACKOFF_MAX
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, limit=None, remaining=None, now: float = None):
+        """응답 헤더의 한도 / 남은 양에 맞춘다."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+        self.level = min(self.level, self.capacity)
+
+    def drain(self):
+        self.level = min(self.level, 0.0)
+
+
+def _header_number(headers, name: str):
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class KeyLimiter:
+    """(API Key, 주소, 모델) 하나의 요청 / 토큰 bucket과 우선순위 대기열"""
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self._waiting = []  # heap: (priority, 순번)
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int, priority: int = BULK) -> float:
+        """
+        요청 1개와 tokens개를 쓸 수 있을 때까지 기다렸다가 차감한다. 기다린 시간(초)을 반환.
+        대기열 맨 앞(우선순위가 가장 높고 먼저 온) 요청만 bucket에서 꺼낼 수 있다.
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._order))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._waiting[0] == ticket:
+                        wait = max(self.paused_until - now,
+                                   self.requests.wait_time(1, now),
+                                   self.tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            self.requests.take(1, now)
+                            self.tokens.take(tokens, now)
+                            return now - start
+                        self._cond.wait(timeout=wait)
+                    else:
+                        # 앞 요청이 나가면 깨운다. (혹시 놓쳐도 1초마다 다시 확인)
+                        self._cond.wait(timeout=1.0)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def settle(self, estimated: int, actual: int = None):
+        """미리 잡은 토큰 추정치와 실제 사용량의 차이를 돌려받는다."""
+        if actual is None or actual >= estimated:
+            return
+        with self._cond:
+            self.tokens.give_back(estimated - actual)
+            self._cond.notify_all()
+
+    def update(self, headers):
+        """응답 헤더의 x-ratelimit-* 값으로 한도와 남은 양을 맞춘다."""
+        if not headers:
+            return
+        with self._cond:
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                bucket.sync(limit=_header_number(headers, f"x-ratelimit-limit-{kind}"),
+                            remaining=_header_number(headers, f"x-ratelimit-remaining-{kind}"),
+                            now=now)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """429를 받으면 이 key의 모든 요청을 seconds 동안 멈춘다. (남은 양도 0으로 본다)"""
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.requests.drain()
+            self.tokens.drain()
+            self._cond.notify_all()
+
+
+def _retry_reason(error) -> str:
+    """재시도할 오류면 이유(rate_limit / server / connection), 아니면 None"""
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        # 크레딧 소진은 기다려도 풀리지 않는다.
+        if getattr(error, "code", None) == "insufficient_quota":
+            return None
+        return "rate_limit"
+    if isinstance(error, openai.InternalServerError):
+        return "server"
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return "connection"
+    return None
+
+
+class RateLimitScheduler:
+    """
+    scheduler.call(client, model, tokens, send, priority) 형태로 쓴다.
+    send(client)는 with_raw_response로 요청을 보내고 raw 응답(헤더 포함)을 돌려주는 함수.
+    넘겨받은 client는 자체 재시도를 끈 사본으로 바꿔서 보낸다. (재시도는 스케줄러가 한 곳에서 관리)
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM, max_retries: int = RATE_MAX_RETRIES):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def limiter_key(client, model: str) -> tuple:
+        api_key = getattr(client, "api_key", "") or ""
+        return (hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16],
+                str(getattr(client, "base_url", "")), model)
+
+    def limiter(self, client, model: str) -> KeyLimiter:
+        key = self.limiter_key(client, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = KeyLimiter(self.rpm, self.tpm)
+            return limiter
+
+    def call(self, client, model: str, tokens: int, send, priority: int = BULK):
+        limiter = self.limiter(client, model)
+        client = client.with_options(max_retries=0)
+        labels = {"priority": PRIORITY_NAMES.get(priority, str(priority))}
+        attempt = 0
+        while True:
+            observe("ratelimit_wait_seconds", limiter.acquire(tokens, priority), **labels)
+            try:
+                raw = send(client)
+            except Exception as e:
+                reason = _retry_reason(e)
+                if reason is None or attempt >= self.max_retries:
+                    raise
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                limiter.update(headers)
+                delay = backoff_delay(attempt, retry_after(headers))
+                increment("openai_retries_total", reason=reason, **labels)
+                if reason == "rate_limit":
+                    # 같은 key의 다른 요청들도 함께 멈춘다. (모두가 각자 다시 두드리지 않게)
+                    limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            limiter.update(raw.headers)
+            return raw
+
+    def settle(self, client, model: str, estimated: int, actual: int = None):
+        self.limiter(client, model).settle(estimated, actual)
+
+
+scheduler = RateLimitScheduler() if RATE_LIMIT_ENABLED else None
@@ -0,0 +1,203 @@
+# retrieval.py
+"""
+챗봇용 임베딩 검색 인덱스.
+
+문서 전체를 시스템 프롬프트에 넣는 대신,
+1) 문서를 겹치는 청크로 나누고
+2) 청크마다 임베딩을 한 번만 계산해서 (문서 해시 기준 캐시)
+3) 질문이 들어올 때마다 코사인 유사도 top-k 청크만 프롬프트에 넣는다.
+
+여러 자료(워크스페이스)는 자료별 인덱스를 CombinedIndex로 이어 붙여서 한 번에 검색한다.
+"""
+import hashlib
+from typing import TYPE_CHECKING
+
+from cache import TieredCache
+from metrics import increment, span
+from ratelimit import BULK, INTERACTIVE, estimate_embedding_tokens, scheduler
+
+# numpy는 임베딩/검색을 처음 할 때 불러온다. (chunk_text만 쓰는 페이지 첫 로딩을 가볍게)
+if TYPE_CHECKING:
+    import numpy as np
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+_index_cache = TieredCache("doc_index", max_items=16, max_bytes=256 * 1024 * 1024)
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list:
+    """
+    text를 chunk_size 글자 안팎의 청크로 나눈다.
+    청크 경계는 가능하면 줄바꿈/공백에 맞추고, 앞 청크와 overlap 글자만큼 겹치게 한다.
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            # 청크 뒷부분 절반 안에서 자연스러운 경계를 찾는다.
+            boundary = max(text.rfind("\n", start + chunk_size // 2, end),
+                           text.rfind(" ", start + chunk_size // 2, end))
+            if boundary > start:
+                end = boundary
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _send_embeddings(client, texts: list, model: str, priority: int):
+    """ratelimit 스케줄러를 거쳐 embeddings.create를 보낸다."""
+    if scheduler is None:
+        return client.embeddings.create(model=model, input=texts)
+    raw = scheduler.call(
+        client, model, estimate_embedding_tokens(texts, model),
+        lambda c: c.embeddings.with_raw_response.create(model=model, input=texts),
+        priority=priority,
+    )
+    return raw.parse()
+
+
+def embed_texts(client, texts: list, model: str = EMBEDDING_MODEL, batch_size: int = 96,
+                priority: int = BULK) -> "np.ndarray":
+    """texts를 배치로 임베딩해서 (len(texts), dim) float32 배열로 반환 (L2 정규화됨)"""
+    import numpy as np
+
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        with span("openai_embeddings", model=model):
+            response = _send_embeddings(client, texts[i:i + batch_size], model, priority)
+        tokens = getattr(getattr(response, "usage", None), "prompt_tokens", None)
+        if isinstance(tokens, int):
+            increment("openai_tokens_total", tokens, model=model, kind="embedding")
+        vectors.extend(item.embedding for item in response.data)
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.size == 0:
+        return matrix.reshape(0, 0)
+    return _normalize(matrix)
+
+
+def _normalize(matrix: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class DocumentIndex:
+    """청크 텍스트와 정규화된 임베딩 행렬을 함께 들고 있는 검색 인덱스"""
+
+    def __init__(self, chunks: list, vectors: "np.ndarray", model: str = EMBEDDING_MODEL):
+        self.chunks = chunks
+        self.vectors = vectors
+        self.model = model
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query_vector: "np.ndarray", k: int = 4) -> list:
+        """
+        query_vector와 코사인 유사도가 높은 청크 k개를 [(score, chunk_idx), ...]로 반환.
+        (벡터가 모두 정규화되어 있으므로 행렬곱 한 번으로 전체 유사도를 계산)
+        """
+        import numpy as np
+
+        if not self.chunks:
+            return []
+        query_vector = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+        scores = self.vectors @ query_vector
+        k = min(k, len(scores))
+        # 전체 정렬 대신 argpartition으로 top-k만 고른 뒤 그 안에서 정렬
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(i)) for i in top]
+
+    def retrieve(self, client, query: str, k: int = 4, priority: int = INTERACTIVE,
+                 query_vector: "np.ndarray" = None) -> list:
+        """
+        질문 문자열을 임베딩해서 관련 청크 텍스트 k개를 문서 순서대로 반환.
+        질문 임베딩은 사용자가 답을 기다리는 요청이라 기본 우선순위가 INTERACTIVE.
+        이미 임베딩한 질문 벡터(같은 모델)가 있으면 query_vector로 넘겨 다시 임베딩하지 않는다.
+        """
+        if query_vector is None:
+            query_vector = embed_texts(client, [query], model=self.model, priority=priority)[0]
+        hits = self.search(query_vector, k=k)
+        return [self.chunks[i] for _, i in sorted(hits, key=lambda hit: hit[1])]
+
+
+class CombinedIndex(DocumentIndex):
+    """
+    여러 문서의 인덱스를 이어 붙인 검색 인덱스.
+    add()는 새 문서의 청크/벡터만 뒤에 붙이므로 앞 문서들은 다시 처리하지 않는다.
+    청크 앞에는 어느 자료에서 나왔는지 [자료 이름]을 붙인다.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL, chunk_size: int = 1000):
+        import numpy as np
+
+        super().__init__([], np.zeros((0, 0), dtype=np.float32), model=model)
+        self.chunk_size = chunk_size
+        self.doc_ids = []
+        self._blocks = []
+
+    def add(self, doc_id: str, index: DocumentIndex, label: str):
+        self.doc_ids.append(doc_id)
+        if not len(index):
+            return
+        self.chunks.extend(f"[{label}]\n{chunk}" for chunk in index.chunks)
+        self._blocks.append(index.vectors)
+        self.vectors = None  # 다음 검색 때 한 번만 합친다.
+
+    def search(self, query_vector: "np.ndarray", k: int = 4) -> list:
+        import numpy as np
+
+        if self.vectors is None and self._blocks:
+            self.vectors = np.vstack(self._blocks)
+            self._blocks = [self.vectors]
+        return super().search(query_vector, k=k)
+
+
+def build_document_index(client, text: str, model: str = EMBEDDING_MODEL,
+                         chunk_size: int = 1000, overlap: int = 200) -> DocumentIndex:
+    """
+    문서 텍스트로 인덱스를 만든다.
+    같은 텍스트(+모델/청크 설정)는 캐시에서 바로 돌려주므로 문서당 임베딩은 한 번만 계산된다.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = f"{model}-{chunk_size}-{overlap}-{digest}"
+
+    def build():
+        chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
+        vectors = embed_texts(client, chunks, model=model)
+        return DocumentIndex(chunks, vectors, model=model)
+
+    return _index_cache.get_or_set(key, build)
+
+
+def build_transcript_index(client, transcript, model: str = EMBEDDING_MODEL,
+                           chunk_size: int = 1000, overlap: int = 200) -> DocumentIndex:
+    """
+    자막(transcript.Transcript)으로 인덱스를 만든다.
+    청크는 문장 경계에서 나누고, 앞에 '[mm:ss~mm:ss]' 시간 범위를 붙여서
+    답변이 영상의 어느 부분인지 가리킬 수 있게 한다.
+    """
+    hasher = hashlib.sha256(transcript.text.encode("utf-8"))
+    hasher.update(transcript.starts.tobytes())
+    key = f"transcript-{model}-{chunk_size}-{overlap}-{hasher.hexdigest()}"
+
+    def build():
+        chunks = [chunk.labeled_text for chunk in transcript.chunks(max_chars=chunk_size, overlap=overlap)]
+        vectors = embed_texts(client, chunks, model=model)
+        return DocumentIndex(chunks, vectors, model=model)
+
+    return _index_cache.get_or_set(key, build)
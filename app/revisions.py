@@ -0,0 +1,149 @@
+# revisions.py
+"""
+수정해서 다시 올린 강의자료(개정판)의 강의노트를 바뀐 부분만 다시 만들기 위한 기록.
+
+교수님이 매주 조금씩 고친 PDF를 다시 올리면 내용 해시가 달라져서 응답 캐시를 쓰지 못하고,
+노트를 처음부터 다시 만들게 된다. 그래서 긴 PDF/PPTX로 노트를 만들 때
+- 페이지(슬라이드)별 본문 지문(fingerprint)
+- 구간(section)마다 묶은 페이지 범위와 그 구간 요약(map 결과)
+- 최종 강의노트
+를 기록(NoteRecord)으로 남겨 둔다. 기록은 올린 사람(API key)과 파일 이름별로 나눠서,
+다른 학생이 우연히 같은 이름(lecture.pdf 등)으로 올린 자료와 섞이지 않게 한다.
+
+다시 올린 자료는 이전 기록과 페이지 지문 순서를 비교(difflib)해서,
+페이지가 하나도 바뀌지 않은 구간은 요약을 그대로 쓰고 바뀐/새 페이지만 다시 구간으로 묶는다.
+(요약과 합치기는 notes.generate_notes_incremental)
+"""
+import hashlib
+import os
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from cache import TieredCache
+from retrieval import chunk_text
+
+# 기록 보관 기간 (한 학기)
+REVISION_TTL = int(os.environ.get("YOYAK_NOTE_REVISION_TTL", str(120 * 24 * 3600)))
+
+_records = TieredCache("note_revisions", max_items=128, max_bytes=256 * 1024 * 1024, ttl=REVISION_TTL)
+
+
+@dataclass
+class NoteSection:
+    """페이지 [start, end) 를 묶은 구간 하나. 한 페이지가 너무 길면 part별로 나눈다."""
+    start: int
+    end: int
+    part: int = 0
+    summary: str = ""
+
+
+@dataclass
+class NoteRecord:
+    """자료 한 버전으로 만든 강의노트와 구간 정보"""
+    digest: str
+    fingerprints: list
+    sections: list = field(default_factory=list)
+    note: str = ""
+
+
+def page_fingerprint(text: str) -> str:
+    """공백 차이는 무시한 페이지 본문 지문"""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def record_key(content, content_type: str, model: str, owner: str):
+    """
+    같은 사람이 올린 같은 자료의 다른 버전을 찾는 key. (형식 + 모델 + 소유자 + 파일 이름)
+    owner는 기록을 나눌 소유자 식별값 (API key 등, 해시해서 쓴다)
+    이름이나 소유자가 없으면 None (이전 버전과 비교하지 않음)
+    """
+    name = getattr(content, "name", None)
+    if not name or not owner:
+        return None
+    owner_hash = hashlib.sha256(owner.encode("utf-8")).hexdigest()[:32]
+    name_hash = hashlib.sha256(name.strip().lower().encode("utf-8")).hexdigest()[:32]
+    return f"{content_type}-{model}-{owner_hash}-{name_hash}"
+
+
+def load_record(key):
+    return _records.get(key) if key else None
+
+
+def save_record(key, record: NoteRecord):
+    if key:
+        _records.set(key, record)
+
+
+def page_block(pages: list, index: int, label: str) -> str:
+    """구간 텍스트에 들어갈 페이지 하나 (extract_document_text(page_headers=True)와 같은 구분선)"""
+    return f"--- {label} {index + 1} ---\n{pages[index]}\n"
+
+
+def section_text(pages: list, section: NoteSection, label: str, section_chars: int) -> str:
+    if section.end - section.start == 1:
+        block = page_block(pages, section.start, label)
+        if len(block) > section_chars:
+            return chunk_text(block, chunk_size=section_chars, overlap=section_chars // 20)[section.part]
+    return "".join(page_block(pages, i, label) for i in range(section.start, section.end))
+
+
+def group_pages(pages: list, start: int, end: int, label: str, section_chars: int) -> list:
+    """페이지 [start, end)를 페이지 경계에서 section_chars 안팎의 구간으로 묶는다."""
+    sections = []
+    group_start, size = start, 0
+    for i in range(start, end):
+        length = len(page_block(pages, i, label))
+        if length > section_chars:
+            # 페이지 하나가 구간보다 길면 그 페이지만 글자 수로 나눈다.
+            if i > group_start:
+                sections.append(NoteSection(group_start, i))
+            parts = len(chunk_text(page_block(pages, i, label), chunk_size=section_chars,
+                                   overlap=section_chars // 20))
+            sections.extend(NoteSection(i, i + 1, part) for part in range(parts))
+            group_start, size = i + 1, 0
+            continue
+        if size and size + length > section_chars:
+            sections.append(NoteSection(group_start, i))
+            group_start, size = i, 0
+        size += length
+    if end > group_start:
+        sections.append(NoteSection(group_start, end))
+    return sections
+
+
+def plan_sections(pages: list, fingerprints: list, label: str, previous: NoteRecord = None,
+                  section_chars: int = 8000) -> tuple:
+    """
+    새 버전의 구간 계획.
+    반환: (sections, removed)
+      sections = 페이지 순서대로의 NoteSection 리스트. 이전 구간을 그대로 쓰면 summary가 채워져 있고,
+                 새로 요약해야 하는 구간은 summary가 빈 문자열
+      removed  = 새 버전에서 쓰이지 않은 이전 구간들 (삭제/수정된 내용)
+    """
+    reused = {}  # 새 버전 시작 페이지 → 그 자리에서 다시 쓰는 이전 구간들
+    removed = []
+    if previous is not None:
+        blocks = SequenceMatcher(None, previous.fingerprints, fingerprints, autojunk=False).get_matching_blocks()
+        for section in previous.sections:
+            for a, b, size in blocks:
+                if a <= section.start and section.end <= a + size:
+                    shift = b - a
+                    reused.setdefault(section.start + shift, []).append(
+                        NoteSection(section.start + shift, section.end + shift, section.part, section.summary)
+                    )
+                    break
+            else:
+                removed.append(section)
+
+    sections = []
+    i = run_start = 0
+    while i < len(pages):
+        if i in reused:
+            sections.extend(group_pages(pages, run_start, i, label, section_chars))
+            sections.extend(reused[i])
+            i = run_start = reused[i][-1].end
+        else:
+            i += 1
+    sections.extend(group_pages(pages, run_start, len(pages), label, section_chars))
+    return sections, removed
@@ -0,0 +1,440 @@
+# transcribe.py
+"""
+영상 파일(mp4 / mov / avi) 음성 인식.
+
+1) ffprobe로 길이를 재고, 영상을 SEGMENT_SECONDS 길이의 구간으로 나눈다. (구간끼리 OVERLAP_SECONDS 겹침)
+2) 구간마다 ffmpeg로 16kHz 모노 wav를 뽑아서 음성 인식 backend에 넘긴다. (스레드 풀에서 동시에)
+3) 겹친 부분은 가운데를 기준으로 한쪽 구간 결과만 남겨서 중복 문장을 없앤다.
+4) 앞 구간부터 순서대로 결과를 내보내므로, 긴 강의 녹화본도 첫 구간이 끝나는 대로 노트 생성을 시작할 수 있다.
+
+결과는 유튜브 자막과 같은 형식({"text", "start", "duration"} 리스트)으로
+utils.transcript_cache에 저장된다. (key: 업로드 파일 해시 + backend 이름)
+
+backend는 transcribe(wav_path, language) 메서드만 있으면 된다.
+- FasterWhisperBackend: faster-whisper로 CPU에서 직접 인식 (기본)
+- StubTranscriptionBackend: 정해 둔 문장을 돌려주는 테스트/벤치마크용
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+from docstore import document_store
+from metrics import span
+from utils import TranscriptError, transcript_cache
+
+MEDIA_TYPES = ("mp4", "mov", "avi")
+
+SAMPLE_RATE = 16000
+SEGMENT_SECONDS = float(os.environ.get("YOYAK_TRANSCRIBE_SEGMENT_SECONDS", "300"))
+OVERLAP_SECONDS = float(os.environ.get("YOYAK_TRANSCRIBE_OVERLAP_SECONDS", "5"))
+TRANSCRIBE_WORKERS = int(os.environ.get("YOYAK_TRANSCRIBE_WORKERS", "2"))
+# 인식 언어 (비워 두면 자동 감지)
+TRANSCRIBE_LANGUAGE = os.environ.get("YOYAK_TRANSCRIBE_LANGUAGE", "ko") or None
+WHISPER_MODEL = os.environ.get("YOYAK_WHISPER_MODEL", "small")
+
+FFMPEG = os.environ.get("YOYAK_FFMPEG", "ffmpeg")
+FFPROBE = os.environ.get("YOYAK_FFPROBE", "ffprobe")
+
+
+# -------------------------------------------------
+# 음성 인식 backend
+# -------------------------------------------------
+class FasterWhisperBackend:
+    """faster-whisper(CTranslate2)로 CPU에서 인식하는 로컬 backend. 모델은 처음 쓸 때 한 번만 불러온다."""
+
+    def __init__(self, model_size: str = WHISPER_MODEL, device: str = "cpu",
+                 compute_type: str = "int8", workers: int = TRANSCRIBE_WORKERS):
+        self.name = f"faster-whisper-{model_size}"
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.workers = workers
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError:
+                    raise TranscriptError(
+                        "영상 음성 인식에 필요한 faster-whisper 패키지가 설치되어 있지 않습니다."
+                    )
+                # num_workers: 여러 스레드가 같은 모델로 동시에 인식할 수 있게 한다.
+                self._model = WhisperModel(self.model_size, device=self.device,
+                                           compute_type=self.compute_type, num_workers=self.workers)
+            return self._model
+
+    def transcribe(self, wav_path: str, language: str = None) -> list:
+        segments, _ = self._load().transcribe(wav_path, language=language, vad_filter=True)
+        return [
+            {"text": segment.text.strip(), "start": segment.start, "duration": segment.end - segment.start}
+            for segment in segments
+        ]
+
+
+class StubTranscriptionBackend:
+    """
+    실제 인식 없이 entry_seconds마다 문장 하나를 만들어 돌려주는 backend (테스트/벤치마크용).
+    delay: 구간마다 기다릴 시간(초). 인식 시간 흉내용
+    """
+
+    def __init__(self, text: str = "음성 인식 결과", entry_seconds: float = 10.0, delay: float = 0.0):
+        self.name = "stub"
+        self.text = text
+        self.entry_seconds = entry_seconds
+        self.delay = delay
+        self.calls = 0
+
+    def transcribe(self, wav_path: str, language: str = None) -> list:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        with wave.open(wav_path, "rb") as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        entries = []
+        start = 0.0
+        while start < duration:
+            length = min(self.entry_seconds, duration - start)
+            entries.append({"text": f"{self.text} ({start:.0f}s)", "start": start, "duration": length})
+            start += self.entry_seconds
+        return entries
+
+
+_default_backend = FasterWhisperBackend()
+
+
+# -------------------------------------------------
+# ffmpeg
+# -------------------------------------------------
+def _run(command: list) -> str:
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+    except FileNotFoundError:
+        raise TranscriptError("영상에서 음성을 추출하려면 서버에 ffmpeg가 설치되어 있어야 합니다.")
+    except subprocess.CalledProcessError as e:
+        raise TranscriptError(f"영상 파일을 읽지 못했습니다. ({e.stderr.strip()[-200:]})")
+    return result.stdout
+
+
+def probe_duration(media_path: str) -> float:
+    """영상 길이(초)"""
+    output = _run([FFPROBE, "-v", "error", "-show_entries", "format=duration",
+                   "-of", "default=noprint_wrappers=1:nokey=1", media_path])
+    try:
+        return float(output.strip())
+    except ValueError:
+        raise TranscriptError("영상 길이를 알 수 없습니다.")
+
+
+def extract_audio_segment(media_path: str, start: float, duration: float, out_path: str):
+    """[start, start + duration) 구간의 음성을 16kHz 모노 wav로 저장"""
+    # -ss를 -i 앞에 두면 앞부분을 디코딩하지 않고 바로 그 위치로 건너뛴다.
+    _run([FFMPEG, "-nostdin", "-v", "error", "-y",
+          "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", media_path,
+          "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "wav", out_path])
+
+
+# -------------------------------------------------
+# 구간 나누기 / 병렬 인식
+# -------------------------------------------------
+def plan_segments(duration: float, segment_seconds: float = SEGMENT_SECONDS,
+                  overlap_seconds: float = OVERLAP_SECONDS) -> list:
+    """[(start, end), ...] 앞 구간과 overlap_seconds만큼 겹치게 나눈다."""
+    step = max(segment_seconds - overlap_seconds, 1.0)
+    segments = []
+    start = 0.0
+    while start < duration:
+        end = min(start + segment_seconds, duration)
+        segments.append((start, end))
+        if end >= duration:
+            break
+        start += step
+    return segments
+
+
+def _owned_window(index: int, segments: list, overlap_seconds: float) -> tuple:
+    """겹친 부분은 가운데를 기준으로 나눠서, 각 구간이 책임지는 시간 범위"""
+    start, end = segments[index]
+    low = start + overlap_seconds / 2 if index > 0 else float("-inf")
+    high = end - overlap_seconds / 2 if index < len(segments) - 1 else float("inf")
+    return low, high
+
+
+def _transcribe_segment(media_path: str, segments: list, index: int, backend, language: str,
+                        overlap_seconds: float, workdir: str) -> list:
+    start, end = segments[index]
+    wav_path = os.path.join(workdir, f"segment-{index:05d}.wav")
+    with span("media_audio_extract"):
+        extract_audio_segment(media_path, start, end - start, wav_path)
+    try:
+        with span("media_transcribe_segment", backend=backend.name):
+            entries = backend.transcribe(wav_path, language=language)
+    finally:
+        try:
+            os.remove(wav_path)
+        except OSError:
+            pass
+
+    low, high = _owned_window(index, segments, overlap_seconds)
+    kept = []
+    for entry in entries:
+        absolute = dict(entry, start=start + entry["start"])
+        middle = absolute["start"] + absolute.get("duration", 0.0) / 2
+        if low <= middle < high and absolute["text"]:
+            kept.append(absolute)
+    return kept
+
+
+def iter_transcribe_media(media_path: str, backend=None, language: str = TRANSCRIBE_LANGUAGE,
+                          segment_seconds: float = SEGMENT_SECONDS,
+                          overlap_seconds: float = OVERLAP_SECONDS,
+                          max_workers: int = TRANSCRIBE_WORKERS, on_plan=None):
+    """
+    영상 파일을 구간별로 동시에 인식하면서, 구간 순서대로 entry 리스트를 yield 한다.
+    중간에 제너레이터를 닫으면 아직 시작하지 않은 구간은 취소된다.
+    on_plan(n): 구간을 나눈 뒤 전체 구간 수를 알려준다. (진행 표시용)
+    """
+    backend = backend or _default_backend
+    segments = plan_segments(probe_duration(media_path), segment_seconds, overlap_seconds)
+    if on_plan:
+        on_plan(len(segments))
+    if not segments:
+        return
+
+    workdir = tempfile.mkdtemp(prefix="yoyak-transcribe-")
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segments))),
+                              thread_name_prefix="transcribe")
+    try:
+        futures = [
+            pool.submit(_transcribe_segment, media_path, segments, i, backend, language,
+                        overlap_seconds, workdir)
+            for i in range(len(segments))
+        ]
+        for future in futures:
+            yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# -------------------------------------------------
+# 업로드 문서(DocumentHandle) → 자막 텍스트 (캐시 사용)
+#  - 같은 (파일, backend)의 인식은 프로세스 전체에서 하나만 돌린다. (_SharedTranscription)
+#    노트 작업(구간별 스트리밍)과 챗봇/퀴즈 준비 작업(전체 대기)이 동시에 요청해도
+#    같은 인식 결과를 나눠 받는다.
+#  - 받는 쪽이 모두 그만두면(작업 취소 등) 진행 중인 구간까지만 하고 인식을 멈춘다.
+# -------------------------------------------------
+def _cache_key(handle, backend) -> str:
+    return f"media-{backend.name}-{handle.digest}"
+
+
+class _SharedTranscription:
+    """
+    진행 중인 음성 인식 하나. 별도 스레드에서 구간을 인식해 segments에 쌓고,
+    여러 구독자가 iter_segments()로 구간 순서대로 받아 간다. 끝까지 인식하면 캐시에 저장한다.
+    """
+
+    def __init__(self, key: str, media_path: str, backend):
+        self.key = key
+        self.segments = []       # 끝난 구간의 entry 리스트 (구간 순서)
+        self.total = None        # 전체 구간 수 (길이를 잰 뒤에 정해짐)
+        self.done = False
+        self.error = None
+        self.subscribers = 0     # _inflight_lock으로 보호
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, args=(media_path, backend),
+                                        name="transcribe-shared", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _set_total(self, total: int):
+        with self._cond:
+            self.total = total
+            self._cond.notify_all()
+
+    def _run(self, media_path: str, backend):
+        segments = iter_transcribe_media(media_path, backend=backend, on_plan=self._set_total)
+        finished = False
+        try:
+            for segment_entries in segments:
+                with self._cond:
+                    self.segments.append(segment_entries)
+                    self._cond.notify_all()
+                with _inflight_lock:
+                    if not self.subscribers:
+                        # 받는 쪽이 모두 그만뒀으면 여기서 멈춘다. (새 요청은 처음부터 다시 시작)
+                        _inflight.pop(self.key, None)
+                        return
+            finished = True
+            transcript_cache.set(self.key, [entry for entries in self.segments for entry in entries])
+        except Exception as e:
+            self.error = e
+        finally:
+            segments.close()
+            # 캐시에 저장한 뒤에 목록에서 빼야, 그사이 들어온 요청이 캐시나 이 인식 중 하나는 본다.
+            with _inflight_lock:
+                if _inflight.get(self.key) is self:
+                    del _inflight[self.key]
+            with self._cond:
+                self.done = True
+                if not finished and self.error is None:
+                    self.error = TranscriptError("음성 인식이 취소되었습니다.")
+                self._cond.notify_all()
+
+    def iter_segments(self, should_stop=None):
+        """
+        끝난 구간부터 순서대로 entry 리스트를 yield. 인식이 실패하면 그 예외를 다시 던진다.
+        should_stop()이 True가 되면 다음 구간을 기다리지 않고 TranscriptError
+        """
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.segments) and not self.done:
+                    if should_stop and should_stop():
+                        raise TranscriptError("음성 인식이 취소되었습니다.")
+                    self._cond.wait(timeout=STOP_POLL_INTERVAL if should_stop else None)
+                if index < len(self.segments):
+                    segment_entries = self.segments[index]
+                    index += 1
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            yield segment_entries
+
+    def progress(self) -> tuple:
+        """(끝난 구간 수, 전체 구간 수 또는 None)"""
+        with self._cond:
+            return len(self.segments), self.total
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+# 기다리는 쪽이 취소됐는지 확인하는 간격(초)
+STOP_POLL_INTERVAL = 0.5
+
+
+def _subscribe(handle, backend):
+    """
+    캐시에 있으면 (None, entries), 없으면 (진행 중인 인식, None).
+    진행 중인 인식이 없으면 새로 시작한다. 받은 인식은 다 쓴 뒤 _unsubscribe 해야 한다.
+    """
+    key = _cache_key(handle, backend)
+    cached = transcript_cache.get(key)
+    if cached is not None:
+        return None, cached
+    with _inflight_lock:
+        shared = _inflight.get(key)
+        if shared is None:
+            # 목록에서 빠지기 전에 캐시에 저장하므로, 여기서 한 번 더 보면 방금 끝난 인식을 놓치지 않는다.
+            cached = transcript_cache.get(key)
+            if cached is not None:
+                return None, cached
+            shared = _inflight[key] = _SharedTranscription(key, document_store.path(handle), backend)
+            shared.start()
+        shared.subscribers += 1
+    return shared, None
+
+
+def _unsubscribe(shared: _SharedTranscription):
+    with _inflight_lock:
+        shared.subscribers -= 1
+
+
+def _iter_segment_entries(handle, backend, use_cache: bool):
+    """구간별 entry 리스트를 yield. 캐시에 있으면 전체를 한 번에 yield"""
+    if not use_cache:
+        yield from iter_transcribe_media(document_store.path(handle), backend=backend)
+        return
+    shared, cached = _subscribe(handle, backend)
+    if shared is None:
+        yield cached
+        return
+    try:
+        yield from shared.iter_segments()
+    finally:
+        _unsubscribe(shared)
+
+
+def iter_media_transcript(handle, backend=None, use_cache: bool = True):
+    """
+    업로드한 영상의 인식 결과를 구간 텍스트 단위로 yield. (텍스트에는 '[mm:ss]' 시간 표시가 들어 있다)
+    캐시에 있으면 캐시에서, 없으면 (다른 세션이 이미 시작한 인식이 있으면 거기에 붙어서)
+    인식이 끝난 구간부터 바로바로 내보낸다.
+    실패하면 TranscriptError
+    """
+    from transcript import Transcript
+
+    backend = backend or _default_backend
+    for segment_entries in _iter_segment_entries(handle, backend, use_cache):
+        if segment_entries:
+            yield Transcript.from_entries(segment_entries).timestamped_text()
+
+
+def load_media_transcript(handle, backend=None, use_cache: bool = True, on_progress=None,
+                          should_stop=None):
+    """
+    업로드한 영상의 인식 결과를 시간 정보가 살아 있는 Transcript로 반환.
+    성공: (Transcript, None)
+    실패: (None, error_msg)
+    같은 파일을 여러 세션(노트 / 챗봇 / 퀴즈)이 동시에 요청해도 인식은 한 번만 한다.
+    on_progress(끝난 구간 수, 전체 구간 수 또는 None): 구간이 끝날 때마다 호출 (진행 표시용)
+    should_stop(): True를 반환하면 기다리지 않고 취소한다. (다른 요청이 없으면 인식도 멈춘다)
+    """
+    backend = backend or _default_backend
+    entries = []
+    try:
+        if use_cache:
+            shared, cached = _subscribe(handle, backend)
+        else:
+            shared, cached = None, None
+        if cached is not None:
+            entries = cached
+        elif shared is not None:
+            try:
+                for segment_entries in shared.iter_segments(should_stop):
+                    entries.extend(segment_entries)
+                    if on_progress:
+                        on_progress(*shared.progress())
+            finally:
+                _unsubscribe(shared)
+        else:
+            for segment_entries in iter_transcribe_media(document_store.path(handle), backend=backend):
+                entries.extend(segment_entries)
+    except TranscriptError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"예상치 못한 오류: {e}"
+
+    from transcript import Transcript
+
+    transcript = Transcript.from_entries(entries)
+    if not transcript:
+        return None, "영상에서 인식된 음성이 없습니다."
+    return transcript, None
+
+
+def media_transcript_ready(handle, backend=None) -> bool:
+    """인식 결과가 캐시에 있어서 바로 불러올 수 있는지 (페이지에서 기다리지 않고 확인)"""
+    backend = backend or _default_backend
+    return transcript_cache.get(_cache_key(handle, backend)) is not None
+
+
+def get_media_transcript(handle, backend=None, use_cache: bool = True):
+    """
+    업로드한 영상의 인식 결과 텍스트.
+    성공: (text, None)
+    실패: (None, error_msg)
+    """
+    transcript, error_msg = load_media_transcript(handle, backend=backend, use_cache=use_cache)
+    if error_msg:
+        return None, error_msg
+    return transcript.text, None
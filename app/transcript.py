@@ -0,0 +1,203 @@
+# transcript.py
+"""
+시간 정보를 유지하는 자막(transcript) 모델.
+
+유튜브 자막/영상 음성 인식 결과는 {"text", "start", "duration"} entry 리스트인데,
+예전에는 " ".join()으로 텍스트만 남기고 시간 정보를 버렸다.
+Transcript는 entry들을 배열 몇 개로 압축해서 들고 있는다.
+
+- text: 모든 entry를 공백 하나로 이어 붙인 문자열 하나 (예전 get_youtube_transcript 결과와 같음)
+- starts / durations: entry별 시작 시간, 길이 (초, numpy 배열)
+- char_starts / char_ends: entry별 text 안의 위치 (numpy 배열)
+
+entry마다 dict/문자열을 따로 만들지 않으므로 긴 강의 자막도 가볍고,
+시간 구간 자르기(slice)나 청크 나누기(chunks)는 배열 검색(searchsorted)으로 경계만 찾은 뒤
+text를 한 번씩만 잘라서 만든다.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from retrieval import chunk_text
+
+# 자막 entry가 이 글자로 끝나면 문장이 끝난 것으로 본다. (한국어 자동 자막은 마침표가 없는 경우가 많음)
+SENTENCE_ENDINGS = (".", "?", "!", "…", "。", "다", "요", "죠")
+# timestamped_text()에서 시간 표시를 넣는 간격(초)
+TIMESTAMP_INTERVAL = 60.0
+
+
+def format_timestamp(seconds: float) -> str:
+    """초 → 'mm:ss' (1시간 이상이면 'h:mm:ss')"""
+    seconds = int(max(seconds, 0))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+@dataclass(frozen=True)
+class TranscriptChunk:
+    """시간 범위가 붙은 자막 청크"""
+    text: str
+    start: float
+    end: float
+
+    @property
+    def label(self) -> str:
+        return f"[{format_timestamp(self.start)}~{format_timestamp(self.end)}]"
+
+    @property
+    def labeled_text(self) -> str:
+        return f"{self.label} {self.text}"
+
+
+class Transcript:
+    """배열 기반 자막. Transcript.from_entries()로 만든다."""
+
+    def __init__(self, text: str, starts: np.ndarray, durations: np.ndarray,
+                 char_starts: np.ndarray, char_ends: np.ndarray):
+        self.text = text
+        self.starts = starts
+        self.durations = durations
+        self.char_starts = char_starts
+        self.char_ends = char_ends
+        self._sentence_ends = None
+
+    @classmethod
+    def from_entries(cls, entries: list) -> "Transcript":
+        texts = [entry["text"] for entry in entries]
+        starts = np.fromiter((entry.get("start", 0.0) for entry in entries), dtype=np.float64,
+                             count=len(entries))
+        durations = np.fromiter((entry.get("duration", 0.0) for entry in entries), dtype=np.float32,
+                                count=len(entries))
+        if len(starts) > 1 and np.any(np.diff(starts) < 0):
+            # 시간순이 아니면 정렬 (searchsorted가 정렬된 배열을 전제로 함)
+            order = np.argsort(starts, kind="stable")
+            texts = [texts[i] for i in order]
+            starts, durations = starts[order], durations[order]
+
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        char_starts = np.zeros(len(texts), dtype=np.int64)
+        if len(texts) > 1:
+            # entry 사이에는 공백 한 칸
+            np.cumsum(lengths[:-1] + 1, out=char_starts[1:])
+        return cls(" ".join(texts), starts, durations, char_starts, char_starts + lengths)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __bool__(self):
+        return bool(self.text.strip())
+
+    @property
+    def end(self) -> float:
+        """마지막 entry가 끝나는 시간(초)"""
+        if not len(self):
+            return 0.0
+        return float(np.max(self.starts + self.durations))
+
+    def entry_text(self, i: int) -> str:
+        return self.text[self.char_starts[i]:self.char_ends[i]]
+
+    def to_entries(self) -> list:
+        return [
+            {"text": self.entry_text(i), "start": float(self.starts[i]), "duration": float(self.durations[i])}
+            for i in range(len(self))
+        ]
+
+    # --- 시간 ↔ 위치 ---
+    def index_at(self, seconds: float) -> int:
+        """seconds 시점에 재생 중인(또는 직전에 시작한) entry 번호"""
+        i = int(np.searchsorted(self.starts, seconds, side="right")) - 1
+        return min(max(i, 0), max(len(self) - 1, 0))
+
+    def time_at(self, char_offset: int) -> float:
+        """text 안의 위치(글자 offset)가 속한 entry의 시작 시간"""
+        if not len(self):
+            return 0.0
+        i = int(np.searchsorted(self.char_starts, char_offset, side="right")) - 1
+        return float(self.starts[max(i, 0)])
+
+    def _chunk(self, first: int, last: int) -> TranscriptChunk:
+        """entry first..last-1 을 청크 하나로"""
+        return TranscriptChunk(
+            text=self.text[self.char_starts[first]:self.char_ends[last - 1]],
+            start=float(self.starts[first]),
+            end=float(self.starts[last - 1] + self.durations[last - 1]),
+        )
+
+    def slice(self, start: float, end: float) -> "Transcript":
+        """[start, end) 초 사이에 시작하는 entry들만 담은 Transcript (배열은 복사하지 않는 view)"""
+        first = int(np.searchsorted(self.starts, start, side="left"))
+        last = int(np.searchsorted(self.starts, end, side="left"))
+        if last <= first:
+            empty = np.zeros(0, dtype=np.int64)
+            return Transcript("", self.starts[:0], self.durations[:0], empty, empty)
+        base = self.char_starts[first]
+        return Transcript(
+            self.text[base:self.char_ends[last - 1]],
+            self.starts[first:last],
+            self.durations[first:last],
+            self.char_starts[first:last] - base,
+            self.char_ends[first:last] - base,
+        )
+
+    # --- 청크 ---
+    @property
+    def sentence_ends(self) -> np.ndarray:
+        """entry별로 문장이 끝나는지 (bool 배열, 처음 한 번만 계산)"""
+        if self._sentence_ends is None:
+            text = self.text
+            self._sentence_ends = np.fromiter(
+                (end > start and text[end - 1] in SENTENCE_ENDINGS
+                 for start, end in zip(self.char_starts.tolist(), self.char_ends.tolist())),
+                dtype=bool, count=len(self),
+            )
+        return self._sentence_ends
+
+    def chunks(self, max_chars: int = 1000, overlap: int = 200) -> list:
+        """
+        entry 경계에서 max_chars 글자 안팎으로 나눈 TranscriptChunk 리스트.
+        청크 뒷부분 절반 안에 문장 끝이 있으면 거기서 자르고, 앞 청크와 overlap 글자만큼 겹친다.
+        entry 하나가 max_chars보다 길면 그 entry만 글자 단위로 나눈다. (시간은 entry 시간을 그대로)
+        """
+        n = len(self)
+        chunks = []
+        first = 0
+        while first < n:
+            limit = self.char_starts[first] + max_chars
+            last = max(int(np.searchsorted(self.char_ends, limit, side="right")), first + 1)
+            if last < n:
+                half = self.char_starts[first] + max_chars // 2
+                candidates = np.nonzero(self.sentence_ends[first:last]
+                                        & (self.char_ends[first:last] >= half))[0]
+                if candidates.size:
+                    last = first + int(candidates[-1]) + 1
+
+            chunk = self._chunk(first, last)
+            if last == first + 1 and len(chunk.text) > max_chars:
+                chunks.extend(TranscriptChunk(piece, chunk.start, chunk.end)
+                              for piece in chunk_text(chunk.text, chunk_size=max_chars, overlap=overlap))
+            elif chunk.text.strip():
+                chunks.append(chunk)
+            if last >= n:
+                break
+            # 다음 청크는 이번 청크 끝에서 overlap 글자 앞의 entry부터
+            next_first = int(np.searchsorted(self.char_starts, self.char_ends[last - 1] - overlap,
+                                             side="left"))
+            first = max(next_first, first + 1)
+        return chunks
+
+    def timestamped_text(self, interval: float = TIMESTAMP_INTERVAL) -> str:
+        """interval 초마다 '[mm:ss]' 시간 표시를 끼워 넣은 텍스트 (모델이 시간을 인용할 수 있게)"""
+        if not len(self):
+            return self.text
+        buckets = np.floor(self.starts / interval).astype(np.int64)
+        marks = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        parts = []
+        for i, mark in enumerate(marks):
+            begin = self.char_starts[mark]
+            end = self.char_starts[marks[i + 1]] if i + 1 < len(marks) else len(self.text)
+            parts.append(f"[{format_timestamp(self.starts[mark])}] {self.text[begin:end].strip()}")
+        return "\n".join(parts)
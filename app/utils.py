@@ -1,54 +1,446 @@
 # utils.py
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from urllib.parse import urlparse, parse_qs
 
-def get_youtube_transcript(url):
+from cache import TieredCache
+from docstore import DocumentHandle, document_store
+from metrics import span
+
+# fitz(PyMuPDF) / pptx / youtube_transcript_api는 불러오는 데만 수백 ms가 걸린다.
+# 페이지 첫 로딩이 느려지지 않도록 모듈 맨 위가 아니라 실제로 쓰는 함수 안에서 import 한다.
+# (한 번 불러온 모듈은 sys.modules에 남으므로 두 번째 호출부터는 비용이 없다)
+
+# -------------------------------------------------
+# 문서 텍스트 추출 (PDF / PPTX)
+#  - 업로드 바이트의 해시를 key로 페이지(슬라이드)별 텍스트를 캐시한다.
+#  - 같은 문서는 배포(프로세스) 전체에서 한 번만 파싱되고,
+#    Chat / Note / Quiz 페이지가 같은 결과를 재사용한다.
+#  - source는 바이트 또는 문서 저장소의 DocumentHandle.
+#    핸들이면 이미 계산된 해시를 쓰고, 저장된 파일을 경로로 직접 읽는다.
+# -------------------------------------------------
+_page_text_cache = TieredCache("page_text", max_items=32, max_bytes=512 * 1024 * 1024)
+
+# 페이지 단위 텍스트 추출을 지원하는 파일 형식과 구분선 이름
+PAGE_LABELS = {"pdf": "Page", "pptx": "Slide"}
+
+
+def content_hash(file_bytes: bytes) -> str:
+    """업로드 바이트의 내용 기반 해시 (sha256)"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _source_hash(source) -> str:
+    if isinstance(source, DocumentHandle):
+        return source.digest
+    return content_hash(source)
+
+
+def _open_pdf(source):
+    """저장소 문서는 경로로 열어서 MuPDF가 필요한 부분만 읽게 한다."""
+    import fitz  # PyMuPDF
+
+    if isinstance(source, DocumentHandle):
+        return fitz.open(document_store.path(source), filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def iter_pdf_pages(source):
+    """PDF 페이지 텍스트를 한 페이지씩 yield"""
+    with _open_pdf(source) as pdf:
+        for page in pdf:
+            yield page.get_text()
+
+
+# -------------------------------------------------
+# 큰 PDF 병렬 추출 (선택)
+#  - 페이지 범위를 나눠 프로세스 풀에서 동시에 추출한다.
+#  - 바이트를 작업마다 넘기지 않도록 임시 파일에 한 번 쓰고,
+#    각 워커는 그 파일을 직접 열어서 자기 범위만 읽는다.
+#  - MuPDF 추출은 페이지당 1ms 안팎이라 워커를 띄우고 PyMuPDF를 다시 불러오는 비용이
+#    더 크다. (bench_pdf_extract.py: 200쪽 순차 0.10s vs 풀 1.1~2.3s, 1000쪽 0.47s vs 2.1~3.3s)
+#    그래서 기본값은 순차 추출이고, YOYAK_PDF_WORKERS로 켰을 때만 풀을 쓴다.
+#  - 풀은 처음 쓸 때 한 번 띄워서 프로세스가 끝날 때까지 재사용한다.
+#    (워커는 PyMuPDF를 한 번만 불러온다)
+#  - 병렬로 넘어가는 페이지 수는 배포할 머신에서
+#    `python benchmarks/bench_pdf_extract.py --pages 500 1000 2000 --workers 4`로
+#    순차와 풀(예열 후)이 갈리는 지점을 재서 YOYAK_PDF_PARALLEL_MIN_PAGES로 맞춘다.
+# -------------------------------------------------
+PDF_WORKERS = int(os.environ.get("YOYAK_PDF_WORKERS", "1"))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("YOYAK_PDF_PARALLEL_MIN_PAGES", "2000"))
+
+_pdf_pool = None
+_pdf_pool_workers = 0
+_pdf_pool_lock = threading.Lock()
+
+
+def _page_ranges(page_count: int, shards: int) -> list:
+    size, extra = divmod(page_count, shards)
+    ranges = []
+    start = 0
+    for i in range(shards):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def _get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """workers개짜리 공용 프로세스 풀 (크기가 바뀌었거나 깨졌으면 새로 띄운다)"""
+    global _pdf_pool, _pdf_pool_workers
+    with _pdf_pool_lock:
+        if _pdf_pool is not None and (_pdf_pool_workers != workers or getattr(_pdf_pool, "_broken", False)):
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+        if _pdf_pool is None:
+            # Streamlit은 멀티스레드 프로세스라 fork 대신 spawn으로 워커를 띄운다.
+            context = multiprocessing.get_context("spawn")
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pdf_pool_workers = workers
+        return _pdf_pool
+
+
+def _extract_pdf_ranges(path: str, ranges: list, workers: int) -> list:
+    from pdf_worker import extract_pdf_range
+
+    pool = _get_pdf_pool(workers)
+    futures = [pool.submit(extract_pdf_range, path, start, stop) for start, stop in ranges]
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def parse_pdf_pages_parallel(source, workers: int = None) -> list:
+    """PDF 페이지 범위를 workers개 프로세스에 나눠 추출하고 순서대로 합친다."""
+    workers = workers or PDF_WORKERS
+    with _open_pdf(source) as pdf:
+        page_count = pdf.page_count
+
+    # 워커 하나당 범위 2개씩: 페이지마다 무게가 달라도 일이 한쪽에 몰리지 않게
+    ranges = _page_ranges(page_count, workers * 2)
+
+    # 저장소 문서는 워커가 그 파일을 바로 연다.
+    if isinstance(source, DocumentHandle):
+        return _extract_pdf_ranges(document_store.path(source), ranges, workers)
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        return _extract_pdf_ranges(path, ranges, workers)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def parse_pdf_pages(source, workers: int = None) -> list:
+    """워커를 2개 이상으로 켰고 페이지가 PDF_PARALLEL_MIN_PAGES 이상이면 병렬로, 아니면 순서대로 추출"""
+    workers = workers or PDF_WORKERS
+    if workers > 1:
+        with _open_pdf(source) as pdf:
+            page_count = pdf.page_count
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            try:
+                return parse_pdf_pages_parallel(source, workers=workers)
+            except (OSError, BrokenProcessPool):
+                # 프로세스를 띄울 수 없는 환경이면 순차 추출로 대체
+                pass
+    return list(iter_pdf_pages(source))
+
+
+def _iter_shape_texts(shapes):
+    """도형 목록을 돌면서 텍스트를 yield (그룹 도형은 재귀, 표는 행 단위)"""
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _iter_shape_texts(shape.shapes)
+        elif shape.has_text_frame:
+            text = shape.text_frame.text.strip()
+            if text:
+                yield text
+        elif getattr(shape, "has_table", False) and shape.has_table:
+            for row in shape.table.rows:
+                cells = [cell.text.strip() for cell in row.cells]
+                if any(cells):
+                    yield " | ".join(cells)
+
+
+def iter_pptx_slides(source):
     """
-    유튜브 URL을 입력받아 자막 텍스트를 반환.
-    성공: (text, None)
-    실패: (None, error_msg)
+    PPTX 슬라이드 텍스트를 한 장씩 yield.
+    슬라이드마다 도형/표/발표자 노트를 그때그때 읽기 때문에
+    큰 덱도 모든 도형 객체를 한꺼번에 만들지 않는다.
+    저장소 문서는 파일 경로로 연다. (업로드 바이트를 BytesIO로 복사하지 않음)
     """
-    try:
-        # --- 1. 영상 ID 파싱 ---
-        parsed_url = urlparse(url)
-        if parsed_url.hostname == "youtu.be":
-            video_id = parsed_url.path[1:]
-        else:
-            video_id = parse_qs(parsed_url.query).get("v", [None])[0]
+    from pptx import Presentation
 
-        if not video_id:
-            return None, "유효하지 않은 YouTube URL입니다."
+    if isinstance(source, DocumentHandle):
+        presentation = Presentation(document_store.path(source))
+    else:
+        presentation = Presentation(io.BytesIO(source))
+    for slide in presentation.slides:
+        lines = list(_iter_shape_texts(slide.shapes))
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame.text.strip()
+            if notes:
+                lines.append(f"[발표자 노트] {notes}")
+        yield "\n".join(lines) + "\n"
+
+
+_PAGE_ITERATORS = {"pdf": iter_pdf_pages, "pptx": iter_pptx_slides}
+# 한 번에 전체를 추출할 때 쓰는 함수 (PDF는 큰 파일이면 병렬 추출)
+_PAGE_PARSERS = {
+    "pdf": parse_pdf_pages,
+    "pptx": lambda source: list(iter_pptx_slides(source)),
+}
 
-        # --- 2. 자막 목록 확인 ---
+
+def iter_document_pages(source, content_type: str):
+    """
+    페이지(슬라이드) 텍스트를 하나씩 yield.
+    캐시에 있으면 캐시에서, 없으면 파싱하면서 바로바로 내보내고
+    끝까지 읽었을 때 캐시에 저장한다.
+    """
+    if content_type not in _PAGE_ITERATORS:
+        raise ValueError(f"{content_type} 형식은 텍스트 추출을 지원하지 않습니다.")
+
+    key = f"{content_type}-{_source_hash(source)}"
+    cached = _page_text_cache.get(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    pages = []
+    for text in _PAGE_ITERATORS[content_type](source):
+        pages.append(text)
+        yield text
+    _page_text_cache.set(key, pages)
+
+
+def extract_document_pages(source, content_type: str) -> list:
+    """
+    PDF/PPTX 바이트(또는 DocumentHandle)를 받아 페이지(슬라이드)별 텍스트 리스트를 반환.
+    같은 내용의 문서는 캐시에서 바로 돌려준다.
+    """
+    if content_type not in _PAGE_ITERATORS:
+        raise ValueError(f"{content_type} 형식은 텍스트 추출을 지원하지 않습니다.")
+
+    key = f"{content_type}-{_source_hash(source)}"
+
+    def parse():
+        # 캐시에 없어서 실제로 파싱한 시간만 따로 잰다.
+        with span("document_parse", type=content_type):
+            return _PAGE_PARSERS[content_type](source)
+
+    return _page_text_cache.get_or_set(key, parse)
+
+
+def extract_document_text(source, content_type: str, page_headers: bool = False) -> str:
+    """
+    문서 전체 텍스트를 반환.
+    page_headers=True이면 각 페이지 앞에 '--- Page N ---' (PPTX는 '--- Slide N ---') 구분선을 넣는다.
+    """
+    with span("document_extract", type=content_type):
+        pages = extract_document_pages(source, content_type)
+    if not page_headers:
+        return "".join(pages)
+    label = PAGE_LABELS[content_type]
+    return "".join(
+        f"--- {label} {page_num} ---\n{text}\n"
+        for page_num, text in enumerate(pages, start=1)
+    )
+
+
+def extract_pdf_pages(file_bytes: bytes) -> list:
+    """PDF 페이지별 텍스트 리스트 (캐시 사용)"""
+    return extract_document_pages(file_bytes, "pdf")
+
+
+def extract_text_from_pdf(file_bytes: bytes, page_headers: bool = False) -> str:
+    """PDF 전체 텍스트 (캐시 사용)"""
+    return extract_document_text(file_bytes, "pdf", page_headers=page_headers)
+
+
+# -------------------------------------------------
+# 유튜브 자막
+#  - 영상 ID를 key로 자막을 캐시한다. (TTL + 디스크 저장)
+#  - 자막을 실제로 가져오는 부분(transport)은 교체할 수 있어서
+#    테스트/벤치마크에서는 네트워크 없이 StubTranscriptTransport를 쓴다.
+# -------------------------------------------------
+TRANSCRIPT_TTL = int(os.environ.get("YOYAK_TRANSCRIPT_TTL", str(7 * 24 * 3600)))
+TRANSCRIPT_FETCH_WORKERS = 4
+
+# 언어 우선순위: 한국어 → 영어 → 자동생성(en)
+PREFERRED_LANGS = ["ko", "ko-KR", "en", "en-US"]
+
+# 유튜브 자막과 영상 파일 음성 인식 결과(transcribe.py)가 함께 쓰는 캐시
+transcript_cache = TieredCache("transcripts", max_items=128, max_bytes=128 * 1024 * 1024,
+                               ttl=TRANSCRIPT_TTL)
+
+
+class TranscriptError(Exception):
+    """자막을 가져올 수 없을 때 사용자에게 보여줄 메시지를 담는 예외"""
+
+
+# 유튜브 영상 ID는 영문/숫자/-/_ 11자. (자막 캐시 key로 쓰이므로 다른 값은 받지 않는다)
+_VIDEO_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{11}")
+
+
+def extract_video_id(url):
+    """유튜브 URL에서 영상 ID를 꺼낸다. 없거나 영상 ID 형식이 아니면 None"""
+    parsed_url = urlparse(url)
+    if parsed_url.hostname == "youtu.be":
+        video_id = parsed_url.path[1:]
+    else:
+        video_id = parse_qs(parsed_url.query).get("v", [None])[0]
+    if not video_id or not _VIDEO_ID_PATTERN.fullmatch(video_id):
+        return None
+    return video_id
+
+
+class YouTubeTranscriptTransport:
+    """youtube_transcript_api로 실제 자막을 가져오는 기본 transport"""
+
+    def fetch(self, video_id: str) -> list:
+        """[{"text", "start", "duration"}, ...] 반환. 실패하면 TranscriptError"""
+        from youtube_transcript_api import YouTubeTranscriptApi
+
+        # --- 자막 목록 확인 ---
         try:
             transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
         except Exception:
-            return None, "해당 영상에서 이용 가능한 자막이 없습니다."
+            raise TranscriptError("해당 영상에서 이용 가능한 자막이 없습니다.")
 
-        # --- 3. 언어 우선순위: 한국어 → 영어 → 자동생성(en) ---
-        preferred_langs = ["ko", "ko-KR", "en", "en-US"]
-
-        transcript = None
-        for lang in preferred_langs:
-            try:
-                transcript = transcripts.find_transcript([lang])
-                break
-            except:
-                continue
-
-        # 자동생성(en) 시도
-        if transcript is None:
+        # --- 언어 우선순위대로 한 번에 검색 → 없으면 자동생성(en) ---
+        try:
+            transcript = transcripts.find_transcript(PREFERRED_LANGS)
+        except Exception:
             try:
                 transcript = transcripts.find_generated_transcript(["en"])
-            except:
-                return None, "해당 영상은 자막이 없거나 자동생성 자막도 지원되지 않습니다."
+            except Exception:
+                raise TranscriptError("해당 영상은 자막이 없거나 자동생성 자막도 지원되지 않습니다.")
+
+        # --- 자막 추출 ---
+        entries = transcript.fetch()
+        if hasattr(entries, "to_raw_data"):  # youtube-transcript-api 1.x
+            entries = entries.to_raw_data()
+        return [
+            {"text": entry["text"], "start": entry.get("start", 0.0), "duration": entry.get("duration", 0.0)}
+            for entry in entries
+        ]
+
+
+class StubTranscriptTransport:
+    """
+    네트워크 없이 정해 둔 자막을 돌려주는 transport (테스트/벤치마크용).
+    transcripts: {video_id: 텍스트 또는 entry 리스트}
+    delay: 호출마다 기다릴 시간(초). 네트워크 지연 흉내용
+    """
+
+    def __init__(self, transcripts: dict, delay: float = 0.0):
+        self.transcripts = transcripts
+        self.delay = delay
+        self.calls = 0
 
-        # --- 4. 자막 추출 ---
-        script_entries = transcript.fetch()
-        text = " ".join([entry["text"] for entry in script_entries])
+    def fetch(self, video_id: str) -> list:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if video_id not in self.transcripts:
+            raise TranscriptError("해당 영상에서 이용 가능한 자막이 없습니다.")
+        data = self.transcripts[video_id]
+        if isinstance(data, str):
+            return [{"text": data, "start": 0.0, "duration": 0.0}]
+        return list(data)
 
-        return text, None
+
+_default_transport = YouTubeTranscriptTransport()
+
+
+def fetch_transcript_entries(video_id: str, transport=None, use_cache: bool = True) -> list:
+    """영상 ID의 자막 entry 리스트를 반환 (캐시 사용). 실패하면 TranscriptError"""
+    transport = transport or _default_transport
+
+    def fetch():
+        with span("transcript_fetch", transport=type(transport).__name__):
+            return transport.fetch(video_id)
+
+    if not use_cache:
+        return fetch()
+    # transport별로 key를 나눠서 stub 결과가 실제 자막 캐시에 섞이지 않게 한다.
+    key = video_id if transport is _default_transport else f"{type(transport).__name__}-{video_id}"
+    return transcript_cache.get_or_set(key, fetch)
+
+
+def load_youtube_transcript(url, transport=None, use_cache: bool = True):
+    """
+    유튜브 URL의 자막을 시간 정보가 살아 있는 Transcript로 반환.
+    성공: (Transcript, None)
+    실패: (None, error_msg)
+    같은 영상은 TTL 동안 캐시에서 바로 돌려준다.
+    """
+    try:
+        # --- 1. 영상 ID 파싱 ---
+        video_id = extract_video_id(url)
+        if not video_id:
+            return None, "유효하지 않은 YouTube URL입니다."
+
+        # --- 2. 자막 가져오기 (캐시 → transport) ---
+        try:
+            entries = fetch_transcript_entries(video_id, transport=transport, use_cache=use_cache)
+        except TranscriptError as e:
+            return None, str(e)
+
+        from transcript import Transcript
+
+        return Transcript.from_entries(entries), None
 
     except Exception as e:
         return None, f"예상치 못한 오류: {e}"
+
+
+def get_youtube_transcript(url, transport=None, use_cache: bool = True):
+    """
+    유튜브 URL을 입력받아 자막 텍스트를 반환.
+    성공: (text, None)
+    실패: (None, error_msg)
+    """
+    transcript, error_msg = load_youtube_transcript(url, transport=transport, use_cache=use_cache)
+    if error_msg:
+        return None, error_msg
+    return transcript.text, None
+
+
+def get_youtube_transcripts(urls, max_workers: int = TRANSCRIPT_FETCH_WORKERS, transport=None,
+                            use_cache: bool = True) -> list:
+    """
+    여러 유튜브 URL(예: 강의 재생목록)의 자막을 동시에 가져온다.
+    최대 max_workers개씩 병렬로 요청하고, 결과는 urls 순서대로 [(text, error), ...]
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+
+    # 같은 URL은 한 번만 요청
+    unique_urls = list(dict.fromkeys(urls))
+    max_workers = max(1, min(max_workers, len(unique_urls)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(
+            lambda url: get_youtube_transcript(url, transport=transport, use_cache=use_cache),
+            unique_urls,
+        )
+        by_url = dict(zip(unique_urls, results))
+    return [by_url[url] for url in urls]
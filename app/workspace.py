@@ -0,0 +1,264 @@
+# workspace.py
+"""
+여러 강의자료를 함께 다루는 워크스페이스.
+
+세션마다 Workspace 하나를 st.session_state['workspace']에 두고,
+업로드 페이지에서 확정한 자료(파일 / 유튜브 링크 / 텍스트)를 차례로 쌓는다.
+
+- 자료 텍스트는 utils의 공용 캐시(문서 페이지 / 자막)를 거치므로 다시 파싱하지 않는다.
+- 검색 인덱스는 자료별 인덱스(retrieval의 캐시)를 이어 붙인 CombinedIndex이고,
+  새로 추가된 자료만 임베딩해서 뒤에 붙인다. (앞서 올린 자료는 다시 처리하지 않음)
+- 자막 자료(유튜브 / 영상)는 Transcript로 불러와서 텍스트에 '[mm:ss]' 시간 표시를 넣고,
+  검색 청크도 문장 경계 + 시간 범위 단위로 만든다.
+- 영상 음성 인식은 오래 걸리므로 페이지 스크립트에서 바로 하지 않는다.
+  pending_transcriptions()로 아직 인식되지 않은 영상을 찾아 run_transcription_job을 작업(jobs.py)으로 돌리고,
+  끝난 뒤에 load_texts()가 캐시에서 불러온다.
+"""
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from docstore import DocumentHandle
+from llm import DEFAULT_MODEL
+from prompting import count_tokens, pack_text
+from retrieval import EMBEDDING_MODEL, CombinedIndex, build_document_index, build_transcript_index
+from transcribe import MEDIA_TYPES, load_media_transcript, media_transcript_ready
+from utils import PAGE_LABELS, extract_document_text, load_youtube_transcript
+
+# 텍스트를 추출할 수 없는 형식
+UNSUPPORTED_TYPES = ("ppt",)
+# 시간 정보가 있는 자막 자료
+TRANSCRIPT_TYPES = ("youtube", *MEDIA_TYPES)
+
+
+@dataclass(frozen=True)
+class WorkspaceDocument:
+    """워크스페이스에 담긴 자료 하나. content는 DocumentHandle / 유튜브 URL / 텍스트"""
+    doc_id: str
+    name: str
+    content_type: str
+    content: object
+
+
+def document_id(content, content_type: str) -> str:
+    """같은 자료를 두 번 올리면 같은 id가 나오도록 내용 기반으로 만든다."""
+    if isinstance(content, DocumentHandle):
+        return f"{content_type}-{content.digest}"
+    digest = hashlib.sha256(str(content).encode("utf-8")).hexdigest()
+    return f"{content_type}-{digest}"
+
+
+def load_transcript(content, content_type: str) -> tuple:
+    """
+    자막 자료(유튜브 / 영상)의 Transcript.
+    반환: (Transcript_or_None, error_message_or_None)
+    """
+    if content_type == "youtube":
+        transcript, error_msg = load_youtube_transcript(content)
+        if error_msg:
+            return None, f"유튜브 자막을 가져오지 못했습니다: {error_msg}"
+        if not transcript:
+            return None, "유튜브 자막이 비어있습니다."
+        return transcript, None
+
+    if content_type in MEDIA_TYPES:  # mp4, mov, avi
+        transcript, error_msg = load_media_transcript(content)
+        if error_msg:
+            return None, f"영상 음성 인식 실패: {error_msg}"
+        return transcript, None
+
+    return None, "자막 자료가 아닙니다."
+
+
+def run_transcription_job(job, documents: list) -> list:
+    """
+    (백그라운드 작업) 영상 자료들을 차례로 음성 인식해서 캐시에 올려 둔다.
+    진행 상황은 job.meta["transcribing"] = {"name", "index", "count", "done", "total"},
+    맡은 자료는 job.meta["doc_ids"]
+    같은 영상을 노트 작업이 인식 중이면 그 인식 결과를 함께 기다린다. (transcribe.py)
+    반환: [(doc, error), ...] 인식에 실패한 자료
+    """
+    job.meta["doc_ids"] = [doc.doc_id for doc in documents]
+    errors = []
+    for index, doc in enumerate(documents, start=1):
+        if job.cancelled:
+            break
+        progress = {"name": doc.name, "index": index, "count": len(documents), "done": 0, "total": None}
+        job.meta["transcribing"] = progress
+
+        def on_progress(done, total, progress=progress):
+            progress.update(done=done, total=total)
+
+        _, error_msg = load_media_transcript(doc.content, on_progress=on_progress,
+                                             should_stop=lambda: job.cancelled)
+        if error_msg and not job.cancelled:
+            errors.append((doc, error_msg))
+    return errors
+
+
+def load_document_text(content, content_type: str, page_headers: bool = True) -> tuple:
+    """
+    자료 하나의 원문 텍스트.
+    반환: (text_or_None, error_message_or_None)
+    """
+    if content_type == "text":
+        if not content or str(content).strip() == "":
+            return None, "저장된 텍스트가 비어 있습니다."
+        return content, None
+
+    if content_type in TRANSCRIPT_TYPES:
+        transcript, error_msg = load_transcript(content, content_type)
+        if error_msg:
+            return None, error_msg
+        # page_headers와 같은 역할: 시간 표시를 넣어 두면 답변/퀴즈 근거에 시간을 인용할 수 있다.
+        return (transcript.timestamped_text() if page_headers else transcript.text), None
+
+    if content_type in PAGE_LABELS:  # pdf, pptx
+        name = content_type.upper()
+        try:
+            text = extract_document_text(content, content_type, page_headers=page_headers)
+        except Exception as e:
+            return None, f"{name} 텍스트 추출 오류: {e}"
+        if not text or text.strip() == "":
+            return None, f"{name}에서 텍스트를 추출할 수 없거나 내용이 비어 있습니다."
+        return text, None
+
+    if content_type in UNSUPPORTED_TYPES:
+        return None, (
+            f"{content_type} 파일은 현재 자동 텍스트 추출이 지원되지 않습니다. "
+            "텍스트를 직접 붙여넣거나 PDF/PPTX로 변환해 업로드해주세요."
+        )
+
+    return None, "알 수 없는 자료 형식입니다."
+
+
+class Workspace:
+    """세션별 자료 모음과 증분 검색 인덱스"""
+
+    def __init__(self):
+        self.documents = []
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __iter__(self):
+        return iter(list(self.documents))
+
+    def get(self, doc_id: str):
+        for doc in self.documents:
+            if doc.doc_id == doc_id:
+                return doc
+        return None
+
+    def add(self, content, content_type: str, name: str = None) -> WorkspaceDocument:
+        """자료를 추가한다. 이미 있는 자료면 기존 항목을 그대로 돌려준다."""
+        doc_id = document_id(content, content_type)
+        existing = self.get(doc_id)
+        if existing is not None:
+            return existing
+        if name is None:
+            if content_type == "text":
+                name = f"직접 입력한 텍스트 {len(self.documents) + 1}"
+            else:
+                name = getattr(content, "name", None) or str(content)
+        doc = WorkspaceDocument(doc_id=doc_id, name=name, content_type=content_type, content=content)
+        with self._lock:
+            self.documents.append(doc)
+        return doc
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self.documents = [doc for doc in self.documents if doc.doc_id != doc_id]
+
+    def pending_transcriptions(self, doc_ids: list = None) -> list:
+        """음성 인식 결과가 아직 캐시에 없는 영상 자료들 (load_texts 전에 작업으로 인식해 둔다)"""
+        return [
+            doc for doc in self
+            if (doc_ids is None or doc.doc_id in doc_ids)
+            and doc.content_type in MEDIA_TYPES and not media_transcript_ready(doc.content)
+        ]
+
+    def load_texts(self, doc_ids: list = None) -> tuple:
+        """
+        자료별 텍스트를 불러온다.
+        음성 인식이 끝나지 않은 영상은 여기서 인식하지 않고 오류로 돌려준다. (run_transcription_job 사용)
+        반환: ([(doc, text), ...], [(doc, error), ...])
+        """
+        loaded, errors = [], []
+        for doc in self:
+            if doc_ids is not None and doc.doc_id not in doc_ids:
+                continue
+            if doc.content_type in MEDIA_TYPES and not media_transcript_ready(doc.content):
+                errors.append((doc, "영상 음성 인식이 아직 끝나지 않았습니다."))
+                continue
+            text, error = load_document_text(doc.content, doc.content_type)
+            if text:
+                loaded.append((doc, text))
+            else:
+                errors.append((doc, error))
+        return loaded, errors
+
+    @staticmethod
+    def combine(loaded: list) -> str:
+        """자료들을 구분선과 함께 하나의 텍스트로 합친다."""
+        return "\n\n".join(f"=== [자료: {doc.name}] ===\n{text}" for doc, text in loaded)
+
+    @staticmethod
+    def pack(loaded: list, budget: int, model: str = DEFAULT_MODEL) -> str:
+        """
+        여러 자료를 budget 토큰 안에 담는다.
+        앞 자료가 예산을 다 쓰지 않도록 자료마다 고르게 나누고,
+        짧은 자료가 남긴 몫은 뒤 자료들에게 넘겨준다.
+        """
+        parts = []
+        remaining = budget
+        for i, (doc, text) in enumerate(loaded):
+            header = f"=== [자료: {doc.name}] ===\n"
+            share = remaining // (len(loaded) - i) - count_tokens(header, model)
+            packed = pack_text(text, share, model)
+            if packed:
+                parts.append(header + packed)
+                remaining -= count_tokens(header, model) + count_tokens(packed, model)
+        return "\n\n".join(parts)
+
+    def build_index(self, client, loaded: list, model: str = EMBEDDING_MODEL,
+                    chunk_size: int = 1000) -> CombinedIndex:
+        """
+        loaded 자료들의 검색 인덱스.
+        이미 인덱스에 들어 있는 자료는 건너뛰고 새 자료만 임베딩해서 뒤에 붙인다.
+        자료가 빠졌거나 순서가 바뀌면 처음부터 다시 이어 붙인다. (자료별 임베딩은 캐시에서 재사용)
+        """
+        doc_ids = [doc.doc_id for doc, _ in loaded]
+        with self._lock:
+            index = self._index
+            if (index is None or index.model != model or index.chunk_size != chunk_size
+                    or index.doc_ids != doc_ids[:len(index.doc_ids)]):
+                index = CombinedIndex(model=model, chunk_size=chunk_size)
+            for doc, text in loaded[len(index.doc_ids):]:
+                doc_index = None
+                if doc.content_type in TRANSCRIPT_TYPES:
+                    # 자막은 문자열을 다시 자르지 않고 entry 경계(문장 끝)에서 나눈다. (캐시에서 불러옴)
+                    transcript, _ = load_transcript(doc.content, doc.content_type)
+                    if transcript is not None:
+                        doc_index = build_transcript_index(client, transcript, model=model,
+                                                           chunk_size=chunk_size)
+                if doc_index is None:
+                    doc_index = build_document_index(client, text, model=model, chunk_size=chunk_size)
+                index.add(doc.doc_id, doc_index, label=doc.name)
+            self._index = index
+            return index
+
+
+def session_workspace(state) -> Workspace:
+    """
+    st.session_state에서 워크스페이스를 꺼낸다. (없으면 만든다)
+    예전 방식으로 저장된 단일 자료(uploaded_content)도 워크스페이스에 담아 준다.
+    """
+    workspace = state.get("workspace")
+    if workspace is None:
+        workspace = state["workspace"] = Workspace()
+    if state.get("uploaded_content") is not None and state.get("content_type"):
+        workspace.add(state["uploaded_content"], state["content_type"])
+    return workspace
@@ -0,0 +1,91 @@
+# bench_pdf_extract.py
+"""
+PDF 텍스트 추출 벤치마크: 예전 순차 루프 vs 프로세스 풀 병렬 추출.
+
+풀은 앱과 같이 한 번 띄워서 재사용하므로, 첫 호출(cold: 워커 spawn + PyMuPDF import 포함)과
+예열된 풀(warm)을 따로 잰다. 페이지 수를 여러 개 주면 warm 풀이 순차 추출보다
+빨라지는 첫 페이지 수를 찾아서 YOYAK_PDF_PARALLEL_MIN_PAGES 값으로 제안한다.
+
+사용법:
+    python benchmarks/bench_pdf_extract.py --pages 500 1000 2000 --workers 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+import fitz  # PyMuPDF
+
+from corpora import make_pdf
+import utils
+from utils import iter_pdf_pages, parse_pdf_pages_parallel
+
+
+def legacy_extract(file_bytes: bytes) -> str:
+    """기존 페이지들의 구현 (문자열 += 반복)"""
+    text = ""
+    with fitz.open(stream=file_bytes, filetype="pdf") as pdf:
+        for page_num, page in enumerate(pdf):
+            text += f"--- Page {page_num + 1} ---\n"
+            text += page.get_text()
+            text += "\n"
+    return text
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def shutdown_pool():
+    """다음 측정이 cold 풀부터 시작하도록 공용 풀을 내린다."""
+    if utils._pdf_pool is not None:
+        utils._pdf_pool.shutdown(wait=True)
+        utils._pdf_pool = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"CPU: {os.cpu_count()}")
+    crossover = {}
+    for pages in sorted(set(args.pages)):
+        file_bytes = make_pdf(pages)
+        print(f"\nPDF: {pages} pages, {len(file_bytes) / 1024 / 1024:.1f} MB")
+
+        baseline = timed(lambda: legacy_extract(file_bytes), args.repeat)
+        print(f"{'legacy loop':<16} {baseline:8.3f}s  x1.00")
+
+        serial = timed(lambda: "".join(iter_pdf_pages(file_bytes)), args.repeat)
+        print(f"{'serial join':<16} {serial:8.3f}s  x{baseline / serial:.2f}")
+
+        for workers in sorted(set(w for w in args.workers if w > 1)):
+            shutdown_pool()
+            cold = timed(lambda: "".join(parse_pdf_pages_parallel(file_bytes, workers=workers)), 1)
+            warm = timed(lambda: "".join(parse_pdf_pages_parallel(file_bytes, workers=workers)), args.repeat)
+            print(f"{f'parallel x{workers}':<16} {warm:8.3f}s  x{baseline / warm:.2f}  (cold {cold:.3f}s)")
+            if warm < serial and workers not in crossover:
+                crossover[workers] = pages
+    shutdown_pool()
+
+    print()
+    for workers in sorted(set(w for w in args.workers if w > 1)):
+        if workers in crossover:
+            print(f"x{workers}: warm 풀이 {crossover[workers]}쪽부터 순차보다 빠름 "
+                  f"-> YOYAK_PDF_WORKERS={workers} YOYAK_PDF_PARALLEL_MIN_PAGES={crossover[workers]}")
+        else:
+            print(f"x{workers}: 측정한 범위에서 순차보다 빠른 지점 없음 (병렬 추출을 켜지 않는 것이 낫다)")
+
+
+if __name__ == "__main__":
+    main()
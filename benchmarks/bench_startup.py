@@ -0,0 +1,239 @@
+# bench_startup.py
+"""
+페이지 콜드 스타트 / 재실행(rerun) 오버헤드 벤치마크 (API Key / 네트워크 불필요).
+
+1) 콜드 import: 페이지마다 새 파이썬 프로세스를 띄워, 그 페이지가 맨 위에서 불러오는
+   앱 모듈들(streamlit 제외)을 import 하는 데 걸린 시간과 프로세스 전체 시간을 잰다.
+   오토스케일로 새 컨테이너가 뜬 뒤 첫 페이지 로딩에 더해지는 비용이다.
+   그때 함께 올라온 무거운 의존성(openai, numpy 등)도 보여주고, 하나라도 있으면 종료 코드 1로 끝난다.
+   (무거운 의존성은 쓰는 함수 안에서 불러와야 한다)
+2) 재실행: streamlit.testing의 AppTest로 페이지 스크립트를 실제로 실행하고,
+   같은 세션에서 다시 실행(버튼 클릭 등 상호작용 한 번)하는 데 걸리는 시간을 잰다.
+   streamlit을 불러올 수 없는 환경이면 건너뛴다.
+
+사용법:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --only Chat Quiz --repeat 10
+    python benchmarks/bench_startup.py --save startup.json
+    python benchmarks/bench_startup.py --baseline startup.json   # 느려지면 종료 코드 1
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from stats import percentile
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+PAGE_DIR = os.path.join(APP_DIR, "pages")
+
+# 페이지 첫 로딩에서 불러오면 안 되는 의존성
+HEAVY_MODULES = ["openai", "httpx", "fitz", "pptx", "youtube_transcript_api", "faster_whisper",
+                 "tiktoken", "numpy"]
+
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+for name in sys.argv[3:]:
+    __import__(name)
+seconds = time.perf_counter() - start
+heavy = [name for name in sys.argv[2].split(",") if name in sys.modules]
+print(json.dumps({"seconds": seconds, "heavy": heavy}))
+"""
+
+
+def page_paths() -> list:
+    pages = [os.path.join(PAGE_DIR, name) for name in sorted(os.listdir(PAGE_DIR)) if name.endswith(".py")]
+    return [os.path.join(APP_DIR, "main.py")] + pages
+
+
+def page_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def page_imports(path: str) -> list:
+    """페이지 스크립트가 실행될 때 곧바로 불러오는 앱 모듈 (함수 안의 import는 제외)"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    modules = []
+
+    def visit(statements):
+        for node in statements:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            if isinstance(node, ast.Import):
+                names = [alias.name.split(".")[0] for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module.split(".")[0]]
+            else:
+                names = []
+            for name in names:
+                if os.path.exists(os.path.join(APP_DIR, f"{name}.py")) and name not in modules:
+                    modules.append(name)
+            for field in ("body", "orelse", "finalbody", "handlers"):
+                visit(getattr(node, field, []) or [])
+
+    visit(tree.body)
+    return modules
+
+
+def measure_cold_import(modules: list, repeat: int, env: dict) -> dict:
+    """새 프로세스에서 modules를 import 하는 시간 (repeat번)"""
+    import_seconds, process_seconds = [], []
+    heavy = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT, APP_DIR, ",".join(HEAVY_MODULES), *modules],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        process_seconds.append(time.perf_counter() - start)
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        import_seconds.append(data["seconds"])
+        heavy = data["heavy"]
+    return {
+        "import_p50": statistics.median(import_seconds),
+        "import_p95": percentile(import_seconds, 0.95),
+        "process_p50": statistics.median(process_seconds),
+        "heavy": heavy,
+    }
+
+
+def measure_reruns(path: str, repeat: int, session: dict) -> dict:
+    """AppTest로 페이지를 한 번 실행한 뒤 같은 세션에서 repeat번 다시 실행"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(path, default_timeout=120)
+    for key, value in session.items():
+        app.session_state[key] = value
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+
+    reruns = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app.run()
+        reruns.append(time.perf_counter() - start)
+    return {
+        "first_run": first_run,
+        "rerun_p50": statistics.median(reruns),
+        "rerun_p95": percentile(reruns, 0.95),
+        "error": str(app.exception[0].message) if app.exception else None,
+    }
+
+
+def print_report(results: list, baseline: dict = None):
+    header = (f"{'page':<16} {'import p50':>10} {'p95':>8} {'process':>8} {'1st run':>8} "
+              f"{'rerun p50':>9} {'p95':>8}  heavy modules loaded")
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        rerun = row.get("rerun") or {}
+
+        def seconds(value):
+            return f"{value:.3f}s" if value is not None else "-"
+
+        line = (f"{row['name']:<16} {seconds(row['import_p50']):>10} {seconds(row['import_p95']):>8} "
+                f"{seconds(row['process_p50']):>8} {seconds(rerun.get('first_run')):>8} "
+                f"{seconds(rerun.get('rerun_p50')):>9} {seconds(rerun.get('rerun_p95')):>8}  "
+                f"{', '.join(row['heavy']) or '-'}")
+        base = (baseline or {}).get(row["name"])
+        if base:
+            line += f"  (import {row['import_p50'] / base['import_p50'] - 1:+.0%} vs base)"
+        print(line)
+        if rerun.get("error"):
+            print(f"    ⚠ 페이지 실행 중 예외: {rerun['error']}")
+
+
+def find_regressions(results: list, baseline: dict, tolerance: float) -> list:
+    """콜드 import / 재실행 p50이 기준보다 tolerance 이상 늘어난 페이지"""
+    regressions = []
+    for row in results:
+        base = baseline.get(row["name"])
+        if not base:
+            continue
+        if row["import_p50"] > base["import_p50"] * (1 + tolerance):
+            regressions.append(f"{row['name']}: import {base['import_p50']:.3f}s → {row['import_p50']:.3f}s")
+        rerun, base_rerun = row.get("rerun"), base.get("rerun")
+        if rerun and base_rerun and rerun["rerun_p50"] > base_rerun["rerun_p50"] * (1 + tolerance):
+            regressions.append(
+                f"{row['name']}: rerun {base_rerun['rerun_p50']:.3f}s → {rerun['rerun_p50']:.3f}s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="페이지별 반복 횟수")
+    parser.add_argument("--only", nargs="+", default=None, help="이름에 이 문자열이 들어간 페이지만 실행")
+    parser.add_argument("--material-chars", type=int, default=200000,
+                        help="재실행 측정 때 세션에 넣어 둘 자료 길이(글자)")
+    parser.add_argument("--no-rerun", action="store_true", help="AppTest 재실행 측정 생략")
+    parser.add_argument("--save", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="회귀로 볼 증가 비율 (기본 25%%)")
+    args = parser.parse_args()
+
+    # 사용자 캐시를 건드리지 않도록 격리 (자식 프로세스와 AppTest 모두)
+    os.environ["YOYAK_CACHE_DIR"] = tempfile.mkdtemp(prefix="yoyak-startup-")
+    env = dict(os.environ)
+
+    pages = page_paths()
+    if args.only:
+        pages = [p for p in pages if any(pattern in page_name(p) for pattern in args.only)]
+
+    run_pages = not args.no_rerun
+    session = {}
+    if run_pages:
+        try:
+            import streamlit.testing.v1  # noqa: F401
+        except Exception as e:
+            print(f"streamlit을 불러올 수 없어 재실행 측정을 건너뜁니다. ({e})")
+            run_pages = False
+        else:
+            from corpora import make_lecture_text
+
+            session = {"user_api_key": "bench-key", "uploaded_content": make_lecture_text(args.material_chars),
+                       "content_type": "text"}
+
+    print(f"repeat={args.repeat} python={sys.version.split()[0]}")
+    results = []
+    for path in pages:
+        row = {"name": page_name(path), "modules": page_imports(path)}
+        row.update(measure_cold_import(row["modules"], args.repeat, env))
+        if run_pages:
+            row["rerun"] = measure_reruns(path, args.repeat, session)
+        results.append(row)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {row["name"]: row for row in json.load(f)["results"]}
+
+    print_report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, ensure_ascii=False, indent=2)
+
+    failures = [f"{row['name']}: 페이지를 불러올 때 무거운 모듈 {', '.join(row['heavy'])}"
+                for row in results if row["heavy"]]
+    if baseline:
+        failures += find_regressions(results, baseline, args.tolerance)
+    if failures:
+        print("\n⚠ 성능 회귀:")
+        for line in failures:
+            print(f"  - {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# bench_suite.py
+"""
+오프라인 성능 벤치마크 모음 (API Key / 네트워크 불필요).
+
+합성 강의자료(corpora.py)와 로컬 모의 OpenAI 서버(mock_openai.py)로
+텍스트 추출 · 자막 처리 · 노트 / 챗봇 / 퀴즈 생성 흐름과 계정 한도(429)를 넘는 동시 요청을
+실제 앱 코드 그대로 돌리고, 시나리오별 p50 / p95 지연, 처리량, 최대 메모리(tracemalloc)를 표로 보여준다.
+캐시는 모두 끄거나 임시 디렉터리를 써서 매번 실제 경로를 측정한다.
+
+사용법:
+    python benchmarks/bench_suite.py                         # small 크기, 전체 시나리오
+    python benchmarks/bench_suite.py --size medium --only pdf note
+    python benchmarks/bench_suite.py --save bench.json       # 결과 저장
+    python benchmarks/bench_suite.py --baseline bench.json   # 저장된 결과와 비교 (느려지면 종료 코드 1)
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+# 앱 모듈을 불러오기 전에 캐시를 격리한다. (사용자 캐시를 건드리지 않고, 응답 캐시는 끔)
+os.environ["YOYAK_CACHE_DIR"] = tempfile.mkdtemp(prefix="yoyak-bench-")
+os.environ["YOYAK_COMPLETION_CACHE"] = "off"
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from answers import ANSWER_CACHE_MAX_ENTRIES, answer_key, lookup_answer, store_answer  # noqa: E402
+from corpora import make_lecture_text, make_pdf, make_pptx, make_transcript_entries  # noqa: E402
+from mock_openai import MockConfig, MockOpenAIServer  # noqa: E402
+from stats import percentile  # noqa: E402
+
+from llm import DEFAULT_MODEL, create_chat_completion, get_openai_client, stream_chat_completion  # noqa: E402
+from notes import NOTE_SYSTEM_PROMPT, generate_notes_map_reduce  # noqa: E402
+from prompting import CHAT_PROMPT_TOKENS, build_chat_messages, pack_chunks  # noqa: E402
+from quiz import DIFFICULTIES, QUIZ_TYPES, generate_quiz_batch, generate_structured_quiz  # noqa: E402
+from retrieval import DocumentIndex, chunk_text, embed_texts  # noqa: E402
+from transcript import Transcript  # noqa: E402
+from utils import iter_pptx_slides, parse_pdf_pages  # noqa: E402
+
+SIZES = {
+    "small": dict(pdf_pages=20, pptx_slides=20, transcript_minutes=30, note_chars=4000,
+                  long_note_chars=40000, burst_requests=30, burst_threads=15, answer_questions=100, repeat=5),
+    "medium": dict(pdf_pages=200, pptx_slides=100, transcript_minutes=90, note_chars=8000,
+                   long_note_chars=120000, burst_requests=60, burst_threads=30, answer_questions=400, repeat=5),
+    "large": dict(pdf_pages=1000, pptx_slides=400, transcript_minutes=180, note_chars=12000,
+                  long_note_chars=400000, burst_requests=120, burst_threads=60, answer_questions=1000, repeat=3),
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: object  # run(i) -> 이번 실행에서 처리한 단위 수
+    unit: str
+
+
+def build_scenarios(size: dict, client, limited_client=None) -> list:
+    pdf_bytes = make_pdf(size["pdf_pages"])
+    pptx_bytes = make_pptx(size["pptx_slides"])
+    entries = make_transcript_entries(size["transcript_minutes"])
+    note_text = make_lecture_text(size["note_chars"], seed=1)
+    long_text = make_lecture_text(size["long_note_chars"], seed=2)
+    chat_text = make_lecture_text(size["long_note_chars"], seed=3)
+    chat_chunks = chunk_text(chat_text)
+    quiz_material = make_lecture_text(size["note_chars"], seed=4)
+    state = {}
+
+    def pdf_extract(i):
+        return len(parse_pdf_pages(pdf_bytes))
+
+    def pptx_extract(i):
+        return sum(1 for _ in iter_pptx_slides(pptx_bytes))
+
+    def transcript_model(i):
+        transcript = Transcript.from_entries(entries)
+        transcript.chunks(max_chars=1000, overlap=200)
+        transcript.timestamped_text()
+        return len(transcript)
+
+    def note_single(i):
+        # 반복마다 요청이 달라지도록 번호를 붙인다. (모의 서버 응답도 매번 새로 생성)
+        messages = [{"role": "system", "content": NOTE_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"[{i}]\n{note_text}"}]
+        "".join(stream_chat_completion(client, use_cache=False, model=DEFAULT_MODEL, messages=messages))
+        return 1
+
+    def note_map_reduce(i):
+        "".join(generate_notes_map_reduce(client, f"[{i}]\n{long_text}", stream=True, use_cache=False))
+        return 1
+
+    def chat_index(i):
+        vectors = embed_texts(client, chat_chunks)
+        state["index"] = DocumentIndex(chat_chunks, vectors)
+        return len(chat_chunks)
+
+    def chat_answer(i):
+        index = state.get("index") or DocumentIndex(chat_chunks, embed_texts(client, chat_chunks))
+        state["index"] = index
+        context = pack_chunks(index.retrieve(client, f"질문 {i}: 핵심 개념은?", k=4), 3000, DEFAULT_MODEL)
+        messages, _ = build_chat_messages(f"자료:\n{context}", [{"role": "user", "content": f"질문 {i}"}],
+                                          DEFAULT_MODEL, max_tokens=800, prompt_budget=CHAT_PROMPT_TOKENS)
+        "".join(stream_chat_completion(client, use_cache=False, model=DEFAULT_MODEL, messages=messages))
+        return 1
+
+    def chat_first_token(i):
+        messages = [{"role": "user", "content": f"첫 토큰 {i}"}]
+        chunks = stream_chat_completion(client, use_cache=False, model=DEFAULT_MODEL, messages=messages)
+        next(chunks)
+        chunks.close()
+        return 1
+
+    def answer_cache(i):
+        # 여러 학생이 같은 자료에 질문하는 상황: 질문 임베딩 → 답변 캐시 검색, 못 찾으면 저장.
+        # 질문 종류가 캐시 한도보다 많아서 캐시는 늘 가득 찬 상태(검색 최악)로 돈다.
+        key = answer_key(["bench"], DEFAULT_MODEL, "bench", "bench")
+        questions = [f"질문 {(i * 7 + n) % (ANSWER_CACHE_MAX_ENTRIES * 2)}" for n in range(size["answer_questions"])]
+        vectors = embed_texts(client, questions)
+        for question, vector in zip(questions, vectors):
+            score, cached = lookup_answer(key, vector)
+            if cached is None:
+                store_answer(key, question, vector, f"{question}에 대한 답변", 1.0)
+        return len(questions)
+
+    def quiz_structured(i):
+        items, _ = generate_structured_quiz(client, f"[{i}]\n{quiz_material}", QUIZ_TYPES[0], DIFFICULTIES[0],
+                                            use_cache=False)
+        return len(items)
+
+    def quiz_batch(i):
+        combos = [(quiz_type, difficulty) for quiz_type in QUIZ_TYPES[:2] for difficulty in DIFFICULTIES[:2]]
+        report = generate_quiz_batch(client, f"[{i}]\n{quiz_material}", combos, use_cache=False)
+        return len(report["items"])
+
+    def ratelimit_burst(i):
+        # 한 반이 동시에 버튼을 누른 상황: 계정 한도(모의 서버 rpm)보다 많은 요청을 한꺼번에 보낸다.
+        def ask(n):
+            return create_chat_completion(limited_client, use_cache=False, model=DEFAULT_MODEL, max_tokens=100,
+                                          messages=[{"role": "user", "content": f"[{i}-{n}] {note_text[:200]}"}])
+
+        with ThreadPoolExecutor(max_workers=size["burst_threads"]) as pool:
+            return sum(1 for _ in pool.map(ask, range(size["burst_requests"])))
+
+    scenarios = [
+        Scenario("pdf_extract", pdf_extract, "pages"),
+        Scenario("pptx_extract", pptx_extract, "slides"),
+        Scenario("transcript_model", transcript_model, "entries"),
+        Scenario("note_single", note_single, "notes"),
+        Scenario("note_map_reduce", note_map_reduce, "notes"),
+        Scenario("chat_index", chat_index, "chunks"),
+        Scenario("chat_answer", chat_answer, "answers"),
+        Scenario("chat_first_token", chat_first_token, "answers"),
+        Scenario("answer_cache", answer_cache, "questions"),
+        Scenario("quiz_structured", quiz_structured, "questions"),
+        Scenario("quiz_batch", quiz_batch, "questions"),
+    ]
+    if limited_client is not None:
+        scenarios.append(Scenario("ratelimit_burst", ratelimit_burst, "requests"))
+    return scenarios
+
+
+def run_scenario(scenario: Scenario, repeat: int, measure_memory: bool = True) -> dict:
+    """한 번 워밍업 후 repeat번 시간을 재고, 마지막에 한 번 더 돌려서 최대 메모리를 잰다."""
+    scenario.run(-1)
+    latencies = []
+    units = 0
+    for i in range(repeat):
+        start = time.perf_counter()
+        units += scenario.run(i)
+        latencies.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            scenario.run(repeat)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "name": scenario.name,
+        "runs": repeat,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "throughput": units / sum(latencies) if sum(latencies) else 0.0,
+        "unit": scenario.unit,
+        "peak_mb": peak_mb,
+    }
+
+
+def print_report(results: list, baseline: dict = None):
+    header = f"{'scenario':<18} {'runs':>4} {'p50':>9} {'p95':>9} {'throughput':>20} {'peak MB':>8}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        peak = f"{row['peak_mb']:.1f}" if row["peak_mb"] is not None else "-"
+        line = (f"{row['name']:<18} {row['runs']:>4} {row['p50']:>8.3f}s {row['p95']:>8.3f}s "
+                f"{row['throughput']:>12.1f} {row['unit'] + '/s':<7} {peak:>8}")
+        base = (baseline or {}).get(row["name"])
+        if base:
+            line += f" {row['p50'] / base['p50'] - 1:>+7.0%}"
+        print(line)
+
+
+def find_regressions(results: list, baseline: dict, tolerance: float) -> list:
+    """p50 지연이나 최대 메모리가 기준보다 tolerance 이상 늘어난 시나리오"""
+    regressions = []
+    for row in results:
+        base = baseline.get(row["name"])
+        if not base:
+            continue
+        if row["p50"] > base["p50"] * (1 + tolerance):
+            regressions.append(f"{row['name']}: p50 {base['p50']:.3f}s → {row['p50']:.3f}s")
+        if row["peak_mb"] and base.get("peak_mb") and row["peak_mb"] > base["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{row['name']}: peak {base['peak_mb']:.1f}MB → {row['peak_mb']:.1f}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--repeat", type=int, default=None, help="시나리오별 반복 횟수 (기본: 크기별 설정)")
+    parser.add_argument("--only", nargs="+", default=None, help="이름에 이 문자열이 들어간 시나리오만 실행")
+    parser.add_argument("--latency", type=float, default=0.05, help="모의 서버 응답 지연(초)")
+    parser.add_argument("--token-delay", type=float, default=0.001, help="모의 서버 토큰당 지연(초)")
+    parser.add_argument("--output-tokens", type=int, default=300, help="모의 서버 응답 길이(토큰)")
+    parser.add_argument("--limit-rpm", type=float, default=1200,
+                        help="ratelimit_burst 시나리오의 모의 계정 분당 요청 한도")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 메모리 측정 생략")
+    parser.add_argument("--save", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="회귀로 볼 증가 비율 (기본 25%%)")
+    args = parser.parse_args()
+
+    size = SIZES[args.size]
+    repeat = args.repeat or size["repeat"]
+    config = MockConfig(latency=args.latency, token_delay=args.token_delay, output_tokens=args.output_tokens)
+
+    limited_config = MockConfig(latency=args.latency, token_delay=args.token_delay, output_tokens=args.output_tokens,
+                                rpm=args.limit_rpm)
+    with MockOpenAIServer(config) as server, MockOpenAIServer(limited_config) as limited_server:
+        client = get_openai_client("bench-key", base_url=server.base_url)
+        limited_client = get_openai_client("bench-key", base_url=limited_server.base_url)
+        scenarios = build_scenarios(size, client, limited_client)
+        if args.only:
+            scenarios = [s for s in scenarios if any(pattern in s.name for pattern in args.only)]
+
+        print(f"size={args.size} repeat={repeat} mock latency={args.latency}s token_delay={args.token_delay}s")
+        results = []
+        for scenario in scenarios:
+            target = limited_server if scenario.name == "ratelimit_burst" else server
+            target.reset_stats()
+            result = run_scenario(scenario, repeat, measure_memory=not args.no_memory)
+            result["api_requests"] = dict(target.requests)
+            result["max_concurrent_requests"] = target.max_in_flight
+            results.append(result)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = {row["name"]: row for row in saved["results"]}
+
+    print_report(results, baseline)
+    # ru_maxrss: 리눅스는 KB, macOS는 바이트
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"\nprocess max RSS: {maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024):.0f} MB")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"size": args.size, "repeat": repeat, "results": results}, f, ensure_ascii=False, indent=2)
+
+    if baseline:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\n⚠ 성능 회귀:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
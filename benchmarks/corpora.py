@@ -0,0 +1,92 @@
+# corpora.py
+"""
+벤치마크용 합성 강의자료. 같은 seed면 항상 같은 내용이 나온다.
+
+- make_lecture_text(): 문단으로 된 강의 텍스트
+- make_pdf() / make_pptx(): 텍스트가 가득 찬 PDF / PPTX 바이트
+- make_transcript_entries(): 유튜브 자막 형식 entry 리스트 ({"text", "start", "duration"})
+"""
+import io
+import random
+
+import fitz  # PyMuPDF
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+TOPICS = ["정렬 알고리즘", "해시 테이블", "신경망", "확률 분포", "운영체제 스케줄링", "데이터베이스 인덱스",
+          "컴파일러 구조", "네트워크 계층", "선형 회귀", "그래프 탐색"]
+PHRASES = [
+    "{topic}의 정의는 다음과 같습니다",
+    "이 부분은 시험에 자주 나옵니다",
+    "예를 들어 {topic}를 실제 서비스에 적용하면",
+    "시간 복잡도를 비교해 보면",
+    "앞에서 설명한 개념과 연결해서 생각해 보세요",
+    "핵심은 입력이 커질 때의 동작입니다",
+    "Lecture note sample sentence about {topic}",
+    "그래서 {topic}에서는 경계 조건을 주의해야 합니다",
+]
+SENTENCE_ENDINGS = ["다.", "요.", "니다.", "죠?", "다"]
+
+
+def _sentence(rng: random.Random) -> str:
+    topic = rng.choice(TOPICS)
+    return rng.choice(PHRASES).format(topic=topic) + rng.choice(SENTENCE_ENDINGS)
+
+
+def make_lecture_text(chars: int, seed: int = 0) -> str:
+    """약 chars 글자의 강의 텍스트 (문단 사이 빈 줄)"""
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < chars:
+        paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(3, 8)))
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:chars]
+
+
+def make_pdf(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """텍스트가 가득 찬 합성 PDF"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        text = "\n".join(f"{page_num}-{i} {_sentence(rng)}" for i in range(lines_per_page))
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_pptx(slides: int, bullets_per_slide: int = 6, seed: int = 0) -> bytes:
+    """제목 + bullet 텍스트 상자로 된 합성 PPTX"""
+    rng = random.Random(seed)
+    presentation = Presentation()
+    layout = presentation.slide_layouts[5]  # 제목만 있는 레이아웃
+    for slide_num in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"{slide_num + 1}. {rng.choice(TOPICS)}"
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(5))
+        frame = box.text_frame
+        for i in range(bullets_per_slide):
+            paragraph = frame.paragraphs[0] if i == 0 else frame.add_paragraph()
+            paragraph.text = _sentence(rng)
+            paragraph.font.size = Pt(14)
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
+
+def make_transcript_entries(minutes: float, seconds_per_entry: float = 3.0, seed: int = 0) -> list:
+    """자동 생성 자막처럼 짧은 entry가 이어지는 자막"""
+    rng = random.Random(seed)
+    entries = []
+    start = 0.0
+    end = minutes * 60
+    while start < end:
+        duration = seconds_per_entry * rng.uniform(0.7, 1.3)
+        words = _sentence(rng).split()
+        cut = rng.randint(2, max(2, len(words)))
+        entries.append({"text": " ".join(words[:cut]), "start": round(start, 2), "duration": round(duration, 2)})
+        start += duration
+    return entries
@@ -0,0 +1,360 @@
+# mock_openai.py
+"""
+벤치마크용 OpenAI 호환 로컬 서버 (API Key / 네트워크 없이 실행).
+
+- POST /v1/chat/completions : 일반 응답과 stream=True(SSE) 모두 지원
+    · response_format이 json_schema면 퀴즈 JSON({"questions": [...]})을 돌려준다.
+    · 프롬프트에 '//정답:' 형식 규칙이 있으면 텍스트 퀴즈를 돌려준다.
+    · 그 밖에는 output_tokens 단어 길이의 강의노트 비슷한 텍스트
+- POST /v1/embeddings : 입력 문자열 해시로 만든 결정적(deterministic) 단위 벡터
+
+지연은 latency(첫 바이트까지) + token_delay(토큰마다)로 흉내 낸다.
+
+rpm / tpm을 주면 계정 한도도 흉내 낸다. 한도는 초당 rpm/60씩 채워지고 burst초 분량까지만 쌓이며,
+넘친 요청은 429(retry-after-ms 포함)로 거절한다. 모든 응답에 x-ratelimit-* 헤더를 붙인다.
+
+단독 실행 (앱 전체를 모의 서버에 붙여 볼 때):
+    python benchmarks/mock_openai.py --port 8900 --latency 0.3 --token-delay 0.01
+    YOYAK_OPENAI_BASE_URL=http://127.0.0.1:8900/v1 streamlit run app/main.py
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+NOTE_WORDS = (
+    "강의 핵심 개념 정의 예시 응용 복습 질문 요약 정리 알고리즘 데이터 구조 모델 "
+    "학습 평가 방법 결과 분석 비교 원리 과정 단계 특징 장점 한계"
+).split()
+
+
+class MockConfig:
+    def __init__(self, latency: float = 0.2, token_delay: float = 0.005, output_tokens: int = 300,
+                 embedding_dim: int = 256, quiz_questions: int = 5, rpm: float = None, tpm: float = None,
+                 burst: float = 1.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst = burst
+        self.latency = latency
+        self.token_delay = token_delay
+        self.output_tokens = output_tokens
+        self.embedding_dim = embedding_dim
+        self.quiz_questions = quiz_questions
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def _request_text(messages: list) -> str:
+    return "\n".join(str(m.get("content") or "") for m in messages)
+
+
+def _question_count(messages: list, default: int) -> int:
+    last = str(messages[-1].get("content") or "") if messages else ""
+    match = re.search(r"(\d+)\s*(?:개|문항)", last)
+    return int(match.group(1)) if match else default
+
+
+def make_quiz_json(messages: list, count: int) -> str:
+    """요청 유형에 맞춘 퀴즈 JSON (객관식은 보기 4개, 단답형/서술형은 보기 없음, 혼합형은 번갈아)"""
+    seed = _seed(_request_text(messages)) % 100000
+    last = str(messages[-1].get("content") or "") if messages else ""
+    questions = []
+    for i in range(count):
+        if "객관식" in last or ("혼합형" in last and i % 2 == 0):
+            questions.append({
+                "question": f"모의 문제 {seed}-{i}: 다음 중 강의에서 설명한 개념 {i}의 정의로 옳은 것은?",
+                "options": [f"보기 {letter} ({seed}-{i})" for letter in "ABCD"],
+                "answer": "ABCD"[i % 4],
+                "source": f"강의자료 문장 {i}",
+            })
+        else:
+            questions.append({
+                "question": f"모의 문제 {seed}-{i}: 강의에서 설명한 개념 {i}를 설명하시오.",
+                "options": [],
+                "answer": f"개념 {i}의 정의",
+                "source": f"강의자료 문장 {i}",
+            })
+    return json.dumps({"questions": questions}, ensure_ascii=False)
+
+
+def make_quiz_text(messages: list, count: int) -> str:
+    seed = _seed(_request_text(messages)) % 100000
+    return "\n\n".join(
+        f"모의 문제 {seed}-{i}: 개념 {i}를 설명하시오.\n//정답: 개념 {i}의 정의" for i in range(count)
+    )
+
+
+def make_note_text(messages: list, tokens: int) -> str:
+    rng = np.random.default_rng(_seed(_request_text(messages)))
+    words = rng.choice(NOTE_WORDS, size=tokens)
+    lines = [" ".join(words[i:i + 12]) for i in range(0, tokens, 12)]
+    return "\n".join(f"- {line}" for line in lines)
+
+
+class _Bucket:
+    """모의 계정 한도 (초당 per_minute/60씩, burst초 분량까지)"""
+
+    def __init__(self, per_minute: float, burst: float):
+        self.limit = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+def make_embedding(text: str, dim: int) -> list:
+    rng = np.random.default_rng(_seed(text))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: dict, status: int = 200, headers: dict = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        server.track(+1)
+        try:
+            path = self.path.split("?")[0].rstrip("/")
+            if path.endswith("/chat/completions"):
+                self._chat(self._read_json())
+            elif path.endswith("/embeddings"):
+                self._embeddings(self._read_json())
+            else:
+                self._send_json({"error": {"message": f"unknown path {path}"}}, status=404)
+        finally:
+            server.track(-1)
+
+    def _reject(self, headers: dict):
+        self.server.count("rate_limited")
+        self._send_json({"error": {"message": "Rate limit reached (mock)", "type": "requests",
+                                   "code": "rate_limit_exceeded"}}, status=429, headers=headers)
+
+    def _chat(self, request: dict):
+        config = self.server.config
+        messages = request.get("messages") or []
+        admitted, limit_headers = self.server.admit(
+            len(_request_text(messages)) // 2 + (request.get("max_tokens") or 1000)
+        )
+        if not admitted:
+            self._reject(limit_headers)
+            return
+        response_format = request.get("response_format") or {}
+        count = _question_count(messages, config.quiz_questions)
+        if response_format.get("type") == "json_schema":
+            content = make_quiz_json(messages, count)
+        elif "//정답:" in _request_text(messages):
+            content = make_quiz_text(messages, count)
+        else:
+            content = make_note_text(messages, config.output_tokens)
+        # 토큰 단위로 흘려보낼 조각 (공백 포함 단어 단위)
+        tokens = re.findall(r"\S+\s*|\s+", content)
+        prompt_tokens = len(_request_text(messages)) // 2
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        model = request.get("model", "mock")
+        created = int(time.time())
+        self.server.count("chat")
+
+        time.sleep(config.latency)
+        if not request.get("stream"):
+            time.sleep(config.token_delay * len(tokens))
+            self._send_json({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": usage,
+            }, headers=limit_headers)
+            return
+
+        self.send_response(200)
+        for name, value in limit_headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: dict, finish_reason=None, extra: dict = None):
+            chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created,
+                     "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            event({"role": "assistant", "content": ""})
+            for token in tokens:
+                if config.token_delay:
+                    time.sleep(config.token_delay)
+                event({"content": token})
+            event({}, finish_reason="stop", extra={"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 중간에 스트림을 끊은 경우 (취소)
+            pass
+
+    def _embeddings(self, request: dict):
+        config = self.server.config
+        inputs = request.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        admitted, limit_headers = self.server.admit(sum(len(t) // 2 for t in inputs))
+        if not admitted:
+            self._reject(limit_headers)
+            return
+        self.server.count("embeddings")
+        time.sleep(config.latency)
+        self._send_json({
+            "object": "list",
+            "model": request.get("model", "mock"),
+            "data": [{"object": "embedding", "index": i, "embedding": make_embedding(text, config.embedding_dim)}
+                     for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": sum(len(t) // 2 for t in inputs),
+                      "total_tokens": sum(len(t) // 2 for t in inputs)},
+        }, headers=limit_headers)
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """
+    with MockOpenAIServer(MockConfig(latency=0.1)) as server:
+        client = OpenAI(base_url=server.base_url, api_key="mock")
+    """
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.config = config or MockConfig()
+        self.requests = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._limits = {}
+        if self.config.rpm:
+            self._limits["requests"] = _Bucket(self.config.rpm, self.config.burst)
+        if self.config.tpm:
+            self._limits["tokens"] = _Bucket(self.config.tpm, self.config.burst)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, endpoint: str):
+        with self._stats_lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def track(self, delta: int):
+        with self._stats_lock:
+            self.in_flight += delta
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def admit(self, tokens: int) -> tuple:
+        """
+        모의 한도 안이면 차감하고 (True, 헤더), 넘치면 (False, retry-after 포함 헤더).
+        한도를 주지 않았으면 항상 통과 (헤더 없음)
+        """
+        if not self._limits:
+            return True, {}
+        amounts = {"requests": 1, "tokens": tokens}
+        with self._stats_lock:
+            for bucket in self._limits.values():
+                bucket.refill()
+            wait = max(bucket.wait_for(amounts[kind]) for kind, bucket in self._limits.items())
+            if wait <= 0:
+                for kind, bucket in self._limits.items():
+                    bucket.level -= min(amounts[kind], bucket.capacity)
+            headers = {}
+            for kind, bucket in self._limits.items():
+                headers[f"x-ratelimit-limit-{kind}"] = str(int(bucket.limit))
+                headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, int(bucket.level)))
+                headers[f"x-ratelimit-reset-{kind}"] = f"{(bucket.capacity - bucket.level) / bucket.rate:.3f}s"
+            if wait > 0:
+                headers["retry-after-ms"] = str(int(wait * 1000) + 1)
+            return wait <= 0, headers
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.requests = {}
+            self.max_in_flight = self.in_flight
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--output-tokens", type=int, default=300)
+    parser.add_argument("--rpm", type=float, default=None, help="모의 분당 요청 한도")
+    parser.add_argument("--tpm", type=float, default=None, help="모의 분당 토큰 한도")
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, token_delay=args.token_delay, output_tokens=args.output_tokens,
+                        rpm=args.rpm, tpm=args.tpm)
+    server = MockOpenAIServer(config, host=args.host, port=args.port)
+    print(f"mock OpenAI server: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# stats.py
+"""벤치마크 스크립트들이 함께 쓰는 통계 도우미."""
+
+
+def percentile(values: list, q: float) -> float:
+    """values의 q 분위수 (0 <= q <= 1, 이웃한 두 값 사이는 선형 보간)"""
+    values = sorted(values)
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
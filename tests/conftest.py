@@ -0,0 +1,13 @@
+# conftest.py
+"""
+테스트 공용 설정.
+app/ 모듈을 바로 import 할 수 있게 하고, 캐시/문서 저장소는 사용자 캐시 대신 임시 디렉터리를 쓴다.
+(CACHE_ROOT는 cache.py를 import 할 때 정해지므로 앱 모듈보다 먼저 설정한다)
+"""
+import os
+import sys
+import tempfile
+
+os.environ["YOYAK_CACHE_DIR"] = tempfile.mkdtemp(prefix="yoyak-test-")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
@@ -0,0 +1,40 @@
+import numpy as np
+
+import answers
+
+
+def _unit(seed, dim=32):
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_key_ignores_document_order():
+    assert answers.answer_key(["a", "b"], "m", "p", "e") == answers.answer_key(["b", "a"], "m", "p", "e")
+    assert answers.answer_key(["a"], "m", "p", "e") != answers.answer_key(["a"], "m", "p2", "e")
+
+
+def test_similar_question_hits_and_different_one_misses():
+    key = answers.answer_key(["hit"], "m", "p", "e")
+    question = _unit(1)
+    assert answers.lookup_answer(key, question)[1] is None
+    assert answers.store_answer(key, "개념이 뭐예요?", question, "답변", seconds=3.0)
+    # 거의 같은 질문은 이미 있으므로 다시 저장하지 않는다.
+    assert not answers.store_answer(key, "개념이 뭔가요?", question, "다른 답변", seconds=3.0)
+
+    score, cached = answers.lookup_answer(key, question * 2)  # 길이와 상관없이 방향만 본다.
+    assert cached is not None and cached.answer == "답변" and score > 0.99
+    assert cached.hits == 1
+    assert answers.lookup_answer(key, _unit(2))[1] is None
+
+
+def test_book_evicts_expired_then_least_recently_used():
+    book = answers.AnswerBook()
+    for i in range(4):
+        entry = answers.CachedAnswer(f"q{i}", f"a{i}", created=100.0 + i, last_used=100.0 + i)
+        book.add(entry, _unit(i))
+    book.entries[0].last_used = 200.0  # 가장 최근에 쓴 답변
+    assert book.evict(now=110.0, ttl=9.5, max_entries=2) == 2
+    # q0은 만료(생성 후 10초)되고, 남은 q1~q3 중 가장 오래 안 쓴 q1이 빠진다.
+    assert [entry.question for entry in book.entries] == ["q2", "q3"]
+    assert book.vectors.shape == (2, 32)
+    assert book.search(_unit(3))[1] == 1
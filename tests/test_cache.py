@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+from cache import DiskCache, LRUCache, TieredCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_items=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a를 최근에 씀 → b가 가장 오래됨
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_disk_cache_roundtrip_and_corrupt_file(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set("key", {"x": [1, 2]})
+    assert cache.get("key") == {"x": [1, 2]}
+
+    broken = cache._path("broken")
+    with open(broken, "wb") as f:
+        f.write(b"not a pickle")
+    assert cache.get("broken", "missing") == "missing"
+    assert not os.path.exists(broken)
+
+
+def test_disk_cache_keys_cannot_leave_the_directory(tmp_path):
+    cache_dir = tmp_path / "cache"
+    outside = tmp_path / "outside.pkl"
+    outside.write_bytes(b"not a pickle")
+    cache = DiskCache(str(cache_dir))
+    for key in ["../outside", "../../../etc/passwd", "/abs/path", "a/b"]:
+        assert os.path.dirname(cache._path(key)) == str(cache_dir)
+    assert cache.get("../outside") is None
+    assert outside.exists()  # 캐시 밖 파일은 열지도, 지우지도 않는다.
+
+
+def test_disk_cache_evicts_oldest_over_max_bytes(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=2500)
+    for i, key in enumerate(["old", "mid", "new"]):
+        cache.set(key, b"x" * 1000)
+        path = cache._path(key)
+        # mtime 순서를 확실히 하기 위해 직접 맞춘다.
+        stamp = time.time() - 100 + i
+        os.utime(path, (stamp, stamp))
+    cache.set("newest", b"x" * 1000)
+    assert cache.get("old") is None
+    assert cache.get("newest") == b"x" * 1000
+
+
+def test_tiered_cache_falls_back_to_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr("cache.CACHE_ROOT", str(tmp_path))
+    cache = TieredCache("tiered", max_items=4)
+    cache.set("k", "v")
+    cache.memory.clear()
+    assert cache.get("k") == "v"
+    assert "k" in cache.memory  # 디스크에서 읽으면 메모리에도 올린다.
+
+
+def test_tiered_cache_ttl_expires(tmp_path, monkeypatch):
+    monkeypatch.setattr("cache.CACHE_ROOT", str(tmp_path))
+    cache = TieredCache("ttl", ttl=10)
+    cache.set("k", "v")
+    now = time.time()
+    monkeypatch.setattr("cache.time.time", lambda: now + 11)
+    assert cache.get("k", "expired") == "expired"
+    # 만료된 항목은 디스크에서도 지운다.
+    assert cache.disk.get("k") is None
+
+
+def test_get_or_set_runs_factory_once_for_concurrent_callers(tmp_path, monkeypatch):
+    monkeypatch.setattr("cache.CACHE_ROOT", str(tmp_path))
+    cache = TieredCache("once")
+    calls = []
+    gate = threading.Event()
+
+    def factory():
+        calls.append(1)
+        gate.wait(1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", factory)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 5
+    assert len(calls) == 1
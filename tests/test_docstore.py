@@ -0,0 +1,28 @@
+import io
+import os
+
+import pytest
+
+from docstore import DocumentMissingError, DocumentStore
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = DocumentStore(str(tmp_path))
+    first = store.put(io.BytesIO(b"lecture slides"), "week1.pdf", "pdf")
+    second = store.put(io.BytesIO(b"lecture slides"), "week1-copy.pdf", "pdf")
+    assert first.digest == second.digest
+    assert first.size == len(b"lecture slides")
+    assert second.name == "week1-copy.pdf"
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(".tmp")] == [first.digest]
+
+
+def test_evicts_least_recently_used_but_keeps_new_file(tmp_path):
+    store = DocumentStore(str(tmp_path), max_bytes=250)
+    old = store.put(io.BytesIO(b"a" * 100), "old.pdf", "pdf")
+    os.utime(store.path(old), (1, 1))
+    kept = store.put(io.BytesIO(b"b" * 100), "kept.pdf", "pdf")
+    new = store.put(io.BytesIO(b"c" * 100), "new.pdf", "pdf")
+    assert not store.exists(old)
+    assert store.exists(kept) and store.exists(new)
+    with pytest.raises(DocumentMissingError):
+        store.path(old)
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from jobs import CANCELLED, DONE, FAILED, QUEUED, JobManager
+
+
+def _wait(manager, job_id, timeout=2.0):
+    deadline = time.time() + timeout
+    while not manager.get(job_id).finished:
+        assert time.time() < deadline, "작업이 끝나지 않았습니다."
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_result_error_and_finished_at():
+    manager = JobManager(max_workers=2)
+    ok = manager.submit("test", "key", lambda job, x: x * 2, 21)
+
+    def fail(job):
+        raise ValueError("boom")
+
+    bad = manager.submit("test", "key", fail)
+    assert _wait(manager, ok).result == 42
+    failed = _wait(manager, bad)
+    assert failed.status == FAILED and str(failed.error) == "boom"
+    assert failed.finished_at is not None
+
+
+def test_per_key_limit_does_not_block_other_keys():
+    manager = JobManager(max_workers=2, per_key_limit=1)
+    release = threading.Event()
+    busy = [manager.submit("test", "busy", lambda job: release.wait(2)) for _ in range(3)]
+    other = manager.submit("test", "other", lambda job: "done")
+    # 같은 키의 대기 작업이 워커를 잡고 있지 않으므로 다른 키의 작업이 바로 끝난다.
+    assert _wait(manager, other, timeout=1.0).status == DONE
+    assert [manager.get(job_id).status for job_id in busy[1:]] == [QUEUED, QUEUED]
+    release.set()
+    assert all(_wait(manager, job_id).status == DONE for job_id in busy)
+
+
+def test_cancelled_queued_job_finishes_without_running():
+    manager = JobManager(max_workers=2, per_key_limit=1)
+    release = threading.Event()
+    ran = []
+    first = manager.submit("test", "key", lambda job: release.wait(2))
+    queued = manager.submit("test", "key", lambda job: ran.append(1))
+    manager.get(queued).cancel()
+    job = manager.get(queued)
+    assert job.status == CANCELLED and job.finished_at is not None
+    release.set()
+    _wait(manager, first)
+    time.sleep(0.05)
+    assert ran == []
@@ -0,0 +1,41 @@
+import json
+
+from pipeline import DONE, FAILED, Manifest, discover_sources
+
+
+def test_discover_sources_skips_unsupported_and_duplicates(tmp_path, capsys):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+    (tmp_path / "sub" / "b.pptx").write_bytes(b"pptx")
+    (tmp_path / "c.ppt").write_bytes(b"ppt")
+    (tmp_path / "notes.docx").write_bytes(b"docx")
+    url = "https://www.youtube.com/watch?v=abcdefghijk"
+    sources = discover_sources([str(tmp_path), str(tmp_path / "a.pdf"), url, url])
+    assert [(s.name, s.content_type) for s in sources] == [("a.pdf", "pdf"), ("b.pptx", "pptx"), (url, "youtube")]
+    assert "c.ppt" in capsys.readouterr().err
+
+
+def test_manifest_resume_checks_status_fingerprint_and_outputs(tmp_path):
+    lecture = tmp_path / "week1.pdf"
+    lecture.write_bytes(b"%PDF v1")
+    notes = tmp_path / "notes.md"
+    notes.write_text("노트", encoding="utf-8")
+    source = discover_sources([str(lecture)])[0]
+
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    assert not manifest.is_done(source)
+    manifest.record(source, {"status": DONE, "fingerprint": source.fingerprint(), "outputs": {"notes": str(notes)}})
+
+    # 다시 열어도 기록이 남아 있고, 끝난 자료로 본다.
+    reopened = Manifest(str(tmp_path / "manifest.json"))
+    assert reopened.is_done(source)
+    assert json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))["sources"][source.key]["status"] == DONE
+
+    notes.unlink()
+    assert not reopened.is_done(source)  # 결과물이 지워졌으면 다시 처리
+    notes.write_text("노트", encoding="utf-8")
+    lecture.write_bytes(b"%PDF v2 (edited)")
+    assert not reopened.is_done(source)  # 파일이 바뀌었으면 다시 처리
+
+    reopened.record(source, {"status": FAILED, "error": "오류"})
+    assert not reopened.is_done(source)
@@ -0,0 +1,112 @@
+import json
+
+from quiz import (
+    QuizItem,
+    QuizJsonStreamParser,
+    QuizStreamParser,
+    complete_quiz_check,
+    dedupe_questions,
+    parse_quiz,
+    parse_quiz_json,
+    validate_quiz_item,
+)
+
+
+def _item(question, answer="A", options=("가", "나", "다", "라")):
+    return {"question": question, "options": list(options), "answer": answer, "explanation": "해설"}
+
+
+def _questions(*items):
+    return json.dumps({"questions": list(items)}, ensure_ascii=False)
+
+
+def test_text_parser_emits_block_when_answer_line_completes():
+    parser = QuizStreamParser()
+    assert parser.feed("1. 첫 문제\n보기") == []
+    assert parser.feed("\n//정답: A\n2. 둘째") == [("1. 첫 문제\n보기", "A")]
+    assert parser.close() == []
+    assert parse_quiz("1. 문제\n//정답: B") == [("1. 문제", "B")]
+    # 생성 중에는 줄바꿈이 오지 않은 마지막 줄을 버린다.
+    assert parse_quiz("1. 문제\n//정답: B", complete=False) == []
+
+
+def test_json_parser_accepts_items_as_soon_as_they_close():
+    text = _questions(_item("첫 문제"), _item("둘째 {괄호} \"따옴표\" 문제", answer="나"))
+    parser = QuizJsonStreamParser()
+    accepted = []
+    for i in range(0, len(text), 7):
+        accepted.extend(parser.feed(text[i:i + 7]))
+    parser.close()
+    assert [item.question for item in accepted] == ["첫 문제", "둘째 {괄호} \"따옴표\" 문제"]
+    # 정답을 보기 내용으로 쓴 경우 문자로 바꾼다.
+    assert accepted[1].answer == "B"
+    assert parser.invalid == []
+
+
+def test_json_parser_reports_truncated_and_invalid_items():
+    text = _questions(_item("정상"), _item("보기 부족", options=("가", "나")))[:-2] + ', {"question": "잘린'
+    items, invalid = parse_quiz_json(text)
+    assert [item.question for item in items] == ["정상"]
+    assert len(invalid) == 2
+    assert "보기" in invalid[0][1]
+    assert "끊겼" in invalid[1][1]
+    # 생성 중인 텍스트에서는 닫히지 않은 문항을 오류로 치지 않는다.
+    assert len(parse_quiz_json(text, complete=False)[1]) == 1
+
+
+def test_validate_quiz_item_rejects_missing_fields():
+    assert validate_quiz_item("문자열")[1]
+    assert validate_quiz_item({"question": " ", "answer": "A"})[1]
+    assert validate_quiz_item(_item("정답 없음", answer="E"))[1]
+    item, error = validate_quiz_item({"question": "단답형", "answer": "답"})
+    assert error is None and item.options == []
+
+
+def test_validate_quiz_item_checks_options_for_quiz_type():
+    # 객관식은 서로 다른 보기 4개가 있어야 하고, 정답은 그중 하나여야 한다.
+    assert validate_quiz_item({"question": "보기 없음", "answer": "A", "options": []}, "객관식 5문항")[1]
+    assert validate_quiz_item(_item("보기 중복", options=("가", "가", "나", "다")), "객관식 5문항")[1]
+    assert validate_quiz_item(_item("정답이 보기에 없음", answer="마"), "객관식 5문항")[1]
+    item, error = validate_quiz_item(_item("정상", answer="다"), "객관식 5문항")
+    assert error is None and item.answer == "C"
+    # 단답형/서술형은 보기가 없어야 한다.
+    assert validate_quiz_item(_item("보기 있는 단답형"), "단답형 5문항")[1]
+    assert validate_quiz_item({"question": "서술형", "answer": "답", "options": []}, "서술형 3문항")[1] is None
+    # 혼합형은 문항마다 보기가 없거나 4개
+    assert validate_quiz_item({"question": "단답", "answer": "답", "options": []}, "혼합형 5문항")[1] is None
+    assert validate_quiz_item(_item("보기 셋", options=("가", "나", "다")), "혼합형 5문항")[1]
+
+
+def test_complete_quiz_check_rejects_multiple_choice_without_options():
+    check = complete_quiz_check("객관식 2문항")
+    assert not check(_questions(_item("하나"), {"question": "보기 없음", "answer": "A", "options": []}))
+    items, invalid = parse_quiz_json(_questions({"question": "보기 없음", "answer": "A", "options": []}),
+                                     quiz_type="객관식 1문항")
+    assert items == [] and "보기" in invalid[0][1]
+
+
+def test_complete_quiz_check_requires_full_valid_set():
+    check = complete_quiz_check("객관식 2문항")
+    assert check(_questions(_item("하나"), _item("둘")))
+    assert not check(_questions(_item("하나")))
+    assert not check(_questions(_item("하나"), _item("둘"), {"question": ""}))
+    assert not check(_questions(_item("하나"), _item("둘"))[:-3])
+
+
+def test_dedupe_questions_drops_near_duplicates():
+    items = [QuizItem(question=q, answer="A") for q in [
+        "운영체제에서 스케줄링이란 무엇인가?",
+        "운영체제에서 스케줄링이란 무엇인가요?",
+        "해시 테이블의 충돌 해결 방법은?",
+        "해시 테이블의 충돌 해결 방법은?",
+    ]]
+    kept, removed, empty = dedupe_questions(items)
+    assert [item.question for item in kept] == [items[0].question, items[2].question]
+    assert (removed, empty) == (2, 0)
+
+
+def test_dedupe_questions_rejects_empty_questions_instead_of_merging_them():
+    items = [QuizItem(question=q, answer="A") for q in ["???", "   ", "...!", "스택과 큐의 차이는?"]]
+    kept, removed, empty = dedupe_questions(items)
+    assert [item.question for item in kept] == ["스택과 큐의 차이는?"]
+    assert (removed, empty) == (0, 3)
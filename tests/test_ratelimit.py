@@ -0,0 +1,58 @@
+import pytest
+
+from ratelimit import BACKOFF_BASE, BACKOFF_MAX, TokenBucket, backoff_delay, parse_duration, retry_after
+
+
+def test_bucket_refills_at_capacity_per_minute():
+    bucket = TokenBucket(60, now=0.0)  # 초당 1
+    assert bucket.wait_time(60, now=0.0) == 0.0
+    bucket.take(60, now=0.0)
+    assert bucket.wait_time(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now=0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now=1.0) == 0.0
+
+
+def test_bucket_never_overfills_and_caps_large_requests():
+    bucket = TokenBucket(60, now=0.0)
+    bucket.take(30, now=0.0)
+    bucket.wait_time(0, now=1000.0)
+    assert bucket.level == 60
+    # 한도보다 큰 요청은 가득 찰 때까지만 기다린다.
+    bucket.take(60, now=1000.0)
+    assert bucket.wait_time(500, now=1000.0) == pytest.approx(60.0)
+
+
+def test_bucket_give_back_and_sync_with_headers():
+    bucket = TokenBucket(100, now=0.0)
+    bucket.take(80, now=0.0)
+    bucket.give_back(30)
+    assert bucket.level == pytest.approx(50)
+    bucket.sync(limit=200, remaining=10, now=0.0)
+    assert bucket.capacity == 200
+    assert bucket.level == pytest.approx(10)
+    bucket.drain()
+    assert bucket.wait_time(1, now=0.0) > 0
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("1s", 1.0), ("20ms", 0.02), ("6m0s", 360.0), ("1m30.5s", 90.5), ("2.5", 2.5),
+    (None, None), ("soon", None),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_retry_after_prefers_milliseconds_header():
+    assert retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == pytest.approx(1.5)
+    assert retry_after({"retry-after": "2"}) == pytest.approx(2.0)
+    assert retry_after({}) is None
+
+
+def test_backoff_delay_bounds():
+    for attempt in range(5):
+        delay = backoff_delay(attempt, server_delay=2.0)
+        assert 2.0 <= delay <= 2.4
+    # 서버가 시간을 알려 주지 않으면 지수 backoff 상한의 절반~전부
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** 3)
+    assert all(ceiling / 2 <= backoff_delay(3) <= ceiling for _ in range(50))
+    assert all(backoff_delay(30) <= BACKOFF_MAX for _ in range(50))
@@ -0,0 +1,103 @@
+from revisions import NoteRecord, NoteSection, group_pages, page_fingerprint, plan_sections, record_key, \
+    section_text
+
+LABEL = "Page"
+
+
+def _pages(count, prefix="본문"):
+    return [f"{prefix} {i} " + "내용 " * 30 for i in range(count)]
+
+
+def _summarized(pages, section_chars=400):
+    """처음 올린 버전: 모든 구간을 요약했다고 치고 summary를 채운다."""
+    sections, removed = plan_sections(pages, [page_fingerprint(p) for p in pages], LABEL,
+                                      section_chars=section_chars)
+    assert removed == []
+    for i, section in enumerate(sections):
+        section.summary = f"요약 {i}"
+    return sections
+
+
+def _record(pages, sections):
+    return NoteRecord(digest="previous", fingerprints=[page_fingerprint(p) for p in pages], sections=sections)
+
+
+def test_fingerprint_ignores_whitespace():
+    assert page_fingerprint("a  b\n c") == page_fingerprint("a b c")
+    assert page_fingerprint("a b c") != page_fingerprint("a b d")
+
+
+def test_group_pages_covers_every_page_once():
+    pages = _pages(10)
+    sections = group_pages(pages, 0, len(pages), LABEL, section_chars=400)
+    covered = [i for section in sections for i in range(section.start, section.end)]
+    assert covered == list(range(10))
+    assert all(len(section_text(pages, s, LABEL, 400)) <= 400 for s in sections if s.end - s.start > 1)
+
+
+def test_oversized_page_is_split_into_parts():
+    pages = ["짧은 페이지", "긴 페이지 " * 200, "짧은 페이지 2"]
+    sections = group_pages(pages, 0, len(pages), LABEL, section_chars=300)
+    parts = [s for s in sections if s.start == 1]
+    assert len(parts) > 1
+    assert [s.part for s in parts] == list(range(len(parts)))
+    assert section_text(pages, parts[0], LABEL, 300) != section_text(pages, parts[1], LABEL, 300)
+
+
+def test_unchanged_pages_reuse_all_sections():
+    pages = _pages(12)
+    previous = _summarized(pages)
+    sections, removed = plan_sections(pages, [page_fingerprint(p) for p in pages], LABEL,
+                                      _record(pages, previous), section_chars=400)
+    assert removed == []
+    assert [s.summary for s in sections] == [s.summary for s in previous]
+
+
+def test_edited_page_only_resummarizes_its_section():
+    pages = _pages(12)
+    previous = _summarized(pages)
+    edited = list(pages)
+    edited[5] = "완전히 새로 쓴 페이지 " * 5
+    sections, removed = plan_sections(edited, [page_fingerprint(p) for p in edited], LABEL,
+                                      _record(pages, previous), section_chars=400)
+    touched = [s for s in previous if s.start <= 5 < s.end]
+    assert removed == touched
+    pending = [s for s in sections if not s.summary]
+    touched_pages = {i for s in touched for i in range(s.start, s.end)}
+    assert pending and all(set(range(s.start, s.end)) <= touched_pages for s in pending)
+    assert len(sections) - len(pending) == len(previous) - len(touched)
+
+
+def test_inserted_page_shifts_reused_sections():
+    pages = _pages(12)
+    previous = _summarized(pages)
+    inserted = pages[:6] + ["새로 넣은 페이지"] + pages[6:]
+    sections, _ = plan_sections(inserted, [page_fingerprint(p) for p in inserted], LABEL,
+                                _record(pages, previous), section_chars=400)
+    covered = [i for s in sections if s.part == 0 for i in range(s.start, s.end)]
+    assert covered == list(range(len(inserted)))
+    # 삽입 위치 뒤에서 그대로 쓰는 구간은 한 페이지씩 밀린다.
+    after = [s for s in previous if s.start >= 6]
+    shifted = {(s.start, s.end): s.summary for s in sections if s.summary}
+    assert all(shifted.get((s.start + 1, s.end + 1)) == s.summary for s in after)
+
+
+def test_plan_without_previous_record():
+    pages = _pages(3)
+    sections, removed = plan_sections(pages, [page_fingerprint(p) for p in pages], LABEL, None)
+    assert removed == [] and sections == [NoteSection(0, 3)]
+
+
+def test_record_key_is_scoped_to_owner_and_name():
+    class Upload(bytes):
+        name = "lecture.pdf"
+
+    upload = Upload(b"%PDF")
+    mine = record_key(upload, "pdf", "model", owner="sk-student-a")
+    assert mine == record_key(upload, "pdf", "model", owner="sk-student-a")
+    # 같은 이름을 다른 사람이 올리면 다른 기록
+    assert mine != record_key(upload, "pdf", "model", owner="sk-student-b")
+    assert "sk-student-a" not in mine
+    # 소유자나 이름을 모르면 이전 버전과 비교하지 않는다.
+    assert record_key(upload, "pdf", "model", owner="") is None
+    assert record_key(b"%PDF", "pdf", "model", owner="sk-student-a") is None
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import transcribe
+from docstore import DocumentHandle
+from transcribe import _owned_window, plan_segments
+
+
+def test_segments_overlap_and_cover_duration():
+    segments = plan_segments(700.0, segment_seconds=300.0, overlap_seconds=10.0)
+    assert segments == [(0.0, 300.0), (290.0, 590.0), (580.0, 700.0)]
+
+
+def test_owned_windows_split_overlap_in_the_middle():
+    segments = plan_segments(700.0, segment_seconds=300.0, overlap_seconds=10.0)
+    windows = [_owned_window(i, segments, 10.0) for i in range(len(segments))]
+    assert windows[0] == (float("-inf"), 295.0)
+    assert windows[1] == (295.0, 585.0)
+    assert windows[2] == (585.0, float("inf"))
+    # 겹친 구간의 문장은 정확히 한 구간만 가진다. (중복 제거)
+    for middle in (292.0, 295.0, 298.0, 584.9, 585.0):
+        owners = [i for i, (low, high) in enumerate(windows) if low <= middle < high]
+        assert len(owners) == 1
+
+
+def _fake_transcription(monkeypatch, segment_count=3):
+    """iter_transcribe_media 대신 release가 set될 때마다 구간 하나씩 내보내는 가짜 인식"""
+    state = {"runs": 0, "closed": False}
+    releases = [threading.Event() for _ in range(segment_count)]
+
+    def fake_iter(media_path, backend=None, on_plan=None, **kwargs):
+        state["runs"] += 1
+        if on_plan:
+            on_plan(segment_count)
+        try:
+            for i, release in enumerate(releases):
+                release.wait(5)
+                yield [{"text": f"구간 {i}", "start": i * 10.0, "duration": 10.0}]
+        finally:
+            state["closed"] = True
+
+    monkeypatch.setattr(transcribe, "iter_transcribe_media", fake_iter)
+    monkeypatch.setattr(transcribe.document_store, "path", lambda handle: "/dev/null")
+    return state, releases
+
+
+def _handle(digest):
+    return DocumentHandle(digest=digest, name="lecture.mp4", content_type="mp4", size=0)
+
+
+def test_concurrent_requests_share_one_transcription(monkeypatch):
+    state, releases = _fake_transcription(monkeypatch)
+    handle = _handle("shared-video")
+    backend = transcribe.StubTranscriptionBackend()
+
+    streamed = []
+    note = threading.Thread(target=lambda: streamed.extend(transcribe.iter_media_transcript(handle, backend)))
+    note.start()
+    progress = []
+    loaded = {}
+    chat = threading.Thread(target=lambda: loaded.update(result=transcribe.load_media_transcript(
+        handle, backend, on_progress=lambda done, total: progress.append((done, total)))))
+    chat.start()
+    # 두 요청이 모두 같은 인식에 붙은 뒤에 구간을 내보낸다.
+    key = transcribe._cache_key(handle, backend)
+    deadline = time.time() + 5
+    while time.time() < deadline and getattr(transcribe._inflight.get(key), "subscribers", 0) < 2:
+        time.sleep(0.01)
+    for release in releases:
+        release.set()
+    note.join(5)
+    chat.join(5)
+
+    assert state["runs"] == 1
+    assert len(streamed) == 3
+    transcript, error = loaded["result"]
+    assert error is None and len(transcript) == 3
+    assert progress[-1] == (3, 3)
+    assert transcribe.media_transcript_ready(handle, backend)
+    # 끝난 뒤의 요청은 캐시에서 바로 받는다.
+    assert transcribe.load_media_transcript(handle, backend)[1] is None
+    assert state["runs"] == 1
+
+
+def test_transcription_stops_when_every_waiter_cancels(monkeypatch):
+    state, releases = _fake_transcription(monkeypatch)
+    handle = _handle("cancelled-video")
+    backend = transcribe.StubTranscriptionBackend()
+    monkeypatch.setattr(transcribe, "STOP_POLL_INTERVAL", 0.01)
+
+    transcript, error = transcribe.load_media_transcript(handle, backend, should_stop=lambda: True)
+    assert transcript is None and "취소" in error
+    # 진행 중인 구간이 끝나면 인식을 멈추고, 결과는 캐시에 남기지 않는다.
+    releases[0].set()
+    deadline = time.time() + 5
+    while not state["closed"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert state["closed"]
+    assert not transcribe.media_transcript_ready(handle, backend)
@@ -0,0 +1,49 @@
+from transcript import Transcript, format_timestamp
+
+
+def _entries(count, seconds=3.0, text="문장입니다"):
+    return [{"text": f"{text} {i}.", "start": i * seconds, "duration": seconds} for i in range(count)]
+
+
+def test_from_entries_sorts_and_keeps_entry_text():
+    entries = [{"text": "둘째", "start": 5.0, "duration": 1.0}, {"text": "첫째", "start": 1.0, "duration": 2.0}]
+    transcript = Transcript.from_entries(entries)
+    assert transcript.text == "첫째 둘째"
+    assert [entry["text"] for entry in transcript.to_entries()] == ["첫째", "둘째"]
+    assert transcript.end == 6.0
+    assert transcript.time_at(transcript.text.index("둘째")) == 5.0
+
+
+def test_slice_keeps_entries_starting_in_range():
+    transcript = Transcript.from_entries(_entries(10))
+    part = transcript.slice(6.0, 15.0)
+    assert [entry["start"] for entry in part.to_entries()] == [6.0, 9.0, 12.0]
+    assert part.text == "문장입니다 2. 문장입니다 3. 문장입니다 4."
+    assert not transcript.slice(100.0, 200.0)
+
+
+def test_chunks_respect_size_and_overlap():
+    transcript = Transcript.from_entries(_entries(60))
+    chunks = transcript.chunks(max_chars=100, overlap=20)
+    assert all(len(chunk.text) <= 100 for chunk in chunks)
+    # 청크는 문장 경계(entry 끝)에서 끝나고, 다음 청크는 앞 청크 끝부분과 겹친다.
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.text.endswith(".")
+        assert chunk.start < previous.end
+        assert chunk.text.split(". ")[0] + "." in previous.text
+        assert chunk.start > previous.start
+    assert chunks[0].start == 0.0 and chunks[-1].end == transcript.end
+    assert chunks[0].labeled_text.startswith("[00:00~")
+
+
+def test_long_entry_is_split_by_characters():
+    transcript = Transcript.from_entries([{"text": "가" * 250, "start": 0.0, "duration": 10.0}])
+    chunks = transcript.chunks(max_chars=100, overlap=10)
+    assert len(chunks) >= 3
+    assert all(chunk.start == 0.0 and chunk.end == 10.0 for chunk in chunks)
+
+
+def test_format_timestamp():
+    assert format_timestamp(65) == "01:05"
+    assert format_timestamp(3725) == "1:02:05"
+    assert format_timestamp(-3) == "00:00"
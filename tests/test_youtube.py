@@ -0,0 +1,39 @@
+import pytest
+
+from utils import StubTranscriptTransport, extract_video_id, load_youtube_transcript
+
+
+@pytest.mark.parametrize("url, video_id", [
+    ("https://www.youtube.com/watch?v=abcdefghijk", "abcdefghijk"),
+    ("https://www.youtube.com/watch?v=A1_b-C2d3E4&t=30s", "A1_b-C2d3E4"),
+    ("https://youtu.be/abcdefghijk", "abcdefghijk"),
+    ("https://www.youtube.com/watch?v=../../../some/dir/file", None),
+    ("https://www.youtube.com/watch?v=abc", None),
+    ("https://www.youtube.com/watch?v=abcdefghijkl", None),
+    ("https://youtu.be/../../etc/passw", None),
+    ("https://youtu.be/", None),
+    ("https://example.com/video", None),
+])
+def test_extract_video_id_accepts_only_youtube_ids(url, video_id):
+    assert extract_video_id(url) == video_id
+
+
+def test_youtube_transcript_is_cached_per_video():
+    entries = [{"text": f"문장입니다 {i}.", "start": i * 3.0, "duration": 3.0} for i in range(3)]
+    transport = StubTranscriptTransport({"abcdefghijk": entries})
+    url = "https://youtu.be/abcdefghijk"
+    transcript, error = load_youtube_transcript(url, transport=transport)
+    assert error is None and len(transcript) == 3
+    load_youtube_transcript(url, transport=transport)
+    assert transport.calls == 1
+
+    transcript, error = load_youtube_transcript("https://youtu.be/zzzzzzzzzzz", transport=transport)
+    assert transcript is None and "자막" in error
+    assert load_youtube_transcript("https://example.com/video", transport=transport)[1]
+
+
+def test_invalid_video_id_never_reaches_the_transport():
+    transport = StubTranscriptTransport({})
+    transcript, error = load_youtube_transcript("https://www.youtube.com/watch?v=../../x", transport=transport)
+    assert transcript is None and error == "유효하지 않은 YouTube URL입니다."
+    assert transport.calls == 0